@@ -0,0 +1,263 @@
+"""Build the parts of a command (extensions, libraries) in worker processes.
+
+With ``--process-pool``, build_ext and build_clib hand each part to a
+worker process rather than a thread, so the Python-side work of building
+it (SWIG, assembling arguments, logging) runs in parallel, and nothing,
+not the compiler nor the directories 'mkpath()' knows to exist, is shared.
+
+A worker gets a pickled copy of the command (see 'detach()') and of the
+configuration of its compiler: the worker sets up a compiler of its own as
+the command's 'run()' would (with its caches and build state), then gives
+it the executables, directories, macros and options of the parent's,
+including any changes a subclass made to them. The worker's log records,
+command output, and command usage are sent back with its outcome, and
+shown by the parent in the order the parts were submitted (see
+'collect()'), along with what the command learned that outlasts the build
+(e.g. its build state), which the parent alone writes.
+
+A command taking part has three hooks: '_setup_process()' sets up a copy
+in the worker, '_finish_process()' returns what the copy learned, and the
+parent's '_merge_process()' takes that in.
+
+Workers are started from a fork server where the platform has one, and
+spawned elsewhere, never forked from the parent itself, whose compile and
+scheduler threads may hold locks a forked copy would wait on forever. So,
+as for any use of ``multiprocessing``, a setup script defining commands
+must guard the rest of its code with ``if __name__ == '__main__':``.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import contextlib
+import copy
+import dataclasses
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import subprocess
+from collections.abc import Callable, Hashable, Iterable
+from typing import TypeVar
+
+from ..compilers.C import usage
+from ..compilers.C.base import _buffered_output, _replay
+from ..core import Command
+from ..errors import DistutilsExecError
+
+_T = TypeVar('_T')
+
+
+@dataclasses.dataclass
+class Outcome:
+    """What building one part in a worker produced."""
+
+    records: list[logging.LogRecord]
+    """the records logged, formatted"""
+
+    results: list[subprocess.CompletedProcess]
+    """the commands run through 'Compiler.call()', with their output"""
+
+    usages: list[usage.Usage]
+    """what those commands used, if anyone was asking"""
+
+    error: Exception | None = None
+    """the exception building the part raised, if any"""
+
+    learned: object = None
+    """what the command learned, from its '_finish_process()'"""
+
+    def check(self) -> None:
+        """Raise 'error', if any."""
+        if self.error is not None:
+            raise self.error
+
+
+class _Collector(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # format now, as the arguments may not pickle
+        record.msg, record.args = record.getMessage(), None
+        record.exc_info = record.exc_text = None
+        self.records.append(record)
+
+
+def pool(workers: int) -> concurrent.futures.ProcessPoolExecutor:
+    """Return a pool of 'workers' processes, not forked from this one."""
+    methods = multiprocessing.get_all_start_methods()
+    method = 'forkserver' if 'forkserver' in methods else 'spawn'
+    context = multiprocessing.get_context(method)
+    return concurrent.futures.ProcessPoolExecutor(workers, mp_context=context)
+
+
+def detach(command: Command, local: Iterable[str] = ()) -> dict:
+    """
+    Return the state of 'command' to send to a worker: its attributes,
+    except those named in 'local' (state of this process, which the worker
+    sets up afresh), with a copy of its distribution that doesn't hold the
+    commands, and the type of its compiler in place of the compiler, whose
+    configuration goes along (see '_configuration()').
+    """
+    local = set(local)
+    state = {name: value for name, value in vars(command).items() if name not in local}
+    distribution = copy.copy(command.distribution)
+    distribution.command_obj = {}
+    distribution.have_run = {}
+    state['distribution'] = distribution
+    state['compiler'] = command.compiler.compiler_type
+    state['_compiler_configuration'] = _configuration(command.compiler)
+    return state
+
+
+def _configuration(compiler) -> dict:
+    """
+    Return the attributes of 'compiler' that are plain data: its
+    executables, directories, macros and options, but not the caches or
+    build state tied to this process, nor 'parallel', which is the
+    command's to set in the worker.
+    """
+    configuration = {}
+    for name, value in vars(compiler).items():
+        if name == 'parallel':
+            continue
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        configuration[name] = value
+    return configuration
+
+
+def submit(
+    executor: concurrent.futures.Executor,
+    command: Command,
+    state: dict,
+    method: str,
+    *args,
+) -> concurrent.futures.Future[Outcome]:
+    """
+    Have a worker of 'executor' call 'method' of a copy of 'command' made
+    from 'state' (see 'detach()') with 'args', logging as this process
+    does, and measuring commands if this process is.
+    """
+    return executor.submit(
+        _build,
+        type(command),
+        state,
+        method,
+        args,
+        level=logging.getLogger().level,
+        measure=usage.active(),
+    )
+
+
+def _build(
+    cls: type[Command], state: dict, method: str, args: tuple, level: int, measure: bool
+) -> Outcome:
+    """
+    In a worker: rebuild the command of class 'cls' from 'state', let it
+    set itself up for this process with its '_setup_process()', configure
+    its compiler as the parent's was, and call its 'method' with 'args',
+    collecting what that logs at 'level' and runs (and, if 'measure', the
+    usage of the commands).
+    """
+    state = dict(state)
+    configuration = state.pop('_compiler_configuration')
+    command = cls.__new__(cls)
+    command.__dict__.update(state)
+    root = logging.getLogger()
+    collector = _Collector()
+    handlers, root.handlers = root.handlers, [collector]
+    outer_level = root.level
+    root.setLevel(level)
+    error = learned = None
+    try:
+        with (
+            usage.collect() if measure else contextlib.nullcontext([]) as usages,
+            _buffered_output(replay=False) as results,
+        ):
+            try:
+                command._setup_process()
+                command.compiler.__dict__.update(configuration)
+                try:
+                    getattr(command, method)(*args)
+                finally:
+                    learned = command._finish_process()
+            except Exception as exc:  # noqa: BLE001 # handed to the parent
+                error = _portable(exc)
+            finally:
+                cache = getattr(command.compiler, 'object_cache', None)
+                if cache is not None:
+                    cache.close()
+    finally:
+        root.handlers = handlers
+        root.setLevel(outer_level)
+    return Outcome(collector.records, results, usages, error, learned)
+
+
+def _portable(error: Exception) -> Exception:
+    """Return 'error', or if it can't be sent to the parent, one saying what
+    it was."""
+    try:
+        pickle.loads(pickle.dumps(error))
+    except Exception:  # noqa: BLE001 # anything may fail to round-trip
+        return DistutilsExecError(f"{type(error).__name__}: {error}")
+    return error
+
+
+def collect(command: Command, future: concurrent.futures.Future[Outcome]) -> Outcome:
+    """
+    Wait for 'future', show what its worker logged and ran, hand what it
+    learned to the '_merge_process()' of 'command', and return its outcome.
+    A worker that died, or whose outcome couldn't be sent back, gives an
+    outcome failing with a DistutilsExecError, as a part that failed to
+    build would.
+    """
+    try:
+        outcome = future.result()
+    except Exception as exc:  # noqa: BLE001 # the part's failure
+        return Outcome([], [], [], DistutilsExecError(f"worker process failed: {exc}"))
+    for record in outcome.records:
+        logger = logging.getLogger(record.name)
+        if logger.isEnabledFor(record.levelno):
+            logger.handle(record)
+    _replay(outcome.results)
+    for record in outcome.usages:
+        usage.report(record)
+    command._merge_process(outcome.learned)
+    return outcome
+
+
+def waves(
+    items: Iterable[_T], slots: Callable[[_T], Iterable[Hashable]], workers: int
+) -> list[tuple[list[_T], int]]:
+    """
+    Split 'items' into waves, built one after the other, the items of a
+    wave all at once. An item sharing any of its 'slots' (say, an object
+    file) with an earlier item goes in a later wave, so the two never build
+    it at the same time. Each wave comes with the 'parallel' setting for
+    building each of its items: what's left of 'workers' spread over them.
+
+    >>> waves('abcd', {'a': [1], 'b': [2], 'c': [1, 2], 'd': [3]}.get, 4)
+    [(['a', 'b', 'd'], 1), (['c'], 4)]
+    """
+    result: list[list[_T]] = []
+    last: dict[Hashable, int] = {}
+    for item in items:
+        item_slots = list(slots(item))
+        wave = max((last[slot] + 1 for slot in item_slots if slot in last), default=0)
+        for slot in item_slots:
+            last[slot] = wave
+        if wave == len(result):
+            result.append([])
+        result[wave].append(item)
+    return [(wave, max(1, workers // len(wave))) for wave in result]
+
+
+def workers(parallel: int | bool | None) -> int:
+    """Return how many workers a command's 'parallel' option asks for."""
+    return max(1, (os.cpu_count() if parallel is True else parallel) or 1)
@@ -20,23 +20,43 @@ from distutils._log import log
 from typing import ClassVar
 
 from ..ccompiler import new_compiler, show_compilers
+from ..compilers.C.state import BuildState
 from ..core import Command
-from ..errors import DistutilsSetupError
+from ..errors import DistutilsOptionError, DistutilsSetupError
 from ..sysconfig import customize_compiler
+from . import _processes
 
 
 class build_clib(Command):
     description = "build C/C++ libraries used by Python extensions"
 
-    user_options: ClassVar[list[tuple[str, str, str]]] = [
+    user_options: ClassVar[list[tuple[str, str | None, str]]] = [
         ('build-clib=', 'b', "directory to build C/C++ libraries to"),
         ('build-temp=', 't', "directory to put temporary build by-products"),
         ('debug', 'g', "compile with debugging information"),
         ('force', 'f', "forcibly build everything (ignore file timestamps)"),
         ('compiler=', 'c', "specify the compiler type"),
+        (
+            'incremental-archives',
+            None,
+            "update libraries with just the objects that changed",
+        ),
+        ('thin-archives', None, "reference objects from libraries instead of copying"),
+        ('parallel=', 'j', "number of parallel build jobs"),
+        (
+            'process-pool',
+            None,
+            "build libraries in processes, not one by one (with --parallel)",
+        ),
     ]
 
-    boolean_options: ClassVar = ['debug', 'force']
+    boolean_options: ClassVar = [
+        'debug',
+        'force',
+        'incremental-archives',
+        'thin-archives',
+        'process-pool',
+    ]
 
     help_options: ClassVar[list[tuple[str, str | None, str, Callable[[], object]]]] = [
         ('help-compiler', None, "list available compilers", show_compilers),
@@ -56,6 +76,10 @@ class build_clib(Command):
         self.debug = None
         self.force = False
         self.compiler = None
+        self.incremental_archives = False
+        self.thin_archives = False
+        self.parallel = None
+        self.process_pool = False
 
     def finalize_options(self) -> None:
         # This might be confusing: both build-clib and build-temp default
@@ -70,6 +94,7 @@ class build_clib(Command):
             ('compiler', 'compiler'),
             ('debug', 'debug'),
             ('force', 'force'),
+            ('parallel', 'parallel'),
         )
 
         self.libraries = self.distribution.libraries
@@ -84,12 +109,33 @@ class build_clib(Command):
         # XXX same as for build_ext -- what about 'self.define' and
         # 'self.undef' ?
 
+        if isinstance(self.parallel, str):
+            try:
+                self.parallel = int(self.parallel)
+            except ValueError:
+                raise DistutilsOptionError("parallel should be an integer")
+
     def run(self) -> None:
         if not self.libraries:
             return
 
-        self.compiler = new_compiler(compiler=self.compiler, force=self.force)
-        customize_compiler(self.compiler)
+        self._setup_compiler()
+        self.build_libraries(self.libraries)
+
+    def _setup_compiler(self) -> None:
+        """Set up the compiler that 'run()' builds the libraries with."""
+        self.compiler = new_compiler(
+            compiler=self.compiler,
+            force=self.force,
+            configure=customize_compiler,
+            snapshot_dir=None if self.force else self.build_temp,
+        )
+        self.compiler.build_state = BuildState(
+            os.path.join(self.build_temp, 'build-state.json')
+        )
+        self.compiler.incremental_archives = self.incremental_archives
+        self.compiler.thin_archives = self.thin_archives
+        self.compiler.parallel = self.parallel
 
         if self.include_dirs is not None:
             self.compiler.set_include_dirs(self.include_dirs)
@@ -101,7 +147,24 @@ class build_clib(Command):
             for macro in self.undef:
                 self.compiler.undefine_macro(macro)
 
-        self.build_libraries(self.libraries)
+    def _setup_process(self) -> None:
+        """
+        Set this copy of the command up to build libraries in a worker
+        process (see '_build_libraries_processes()').
+        """
+        self._setup_compiler()
+        self.compiler.build_state.defer = True
+
+    def _finish_process(self) -> dict:
+        """Return the outputs this copy of the command built in a worker
+        process, for the parent to record (see '_merge_process()').
+        """
+        return self.compiler.build_state.take()
+
+    def _merge_process(self, built: dict | None) -> None:
+        """Record the outputs a worker process built."""
+        if built is not None:
+            self.compiler.build_state.merge(built)
 
     def check_library_list(self, libraries) -> None:
         """Ensure that the list of libraries is valid.
@@ -166,34 +229,65 @@ class build_clib(Command):
         return filenames
 
     def build_libraries(self, libraries) -> None:
+        workers = _processes.workers(self.parallel)
+        if self.process_pool and workers > 1:
+            self._build_libraries_processes(libraries, workers)
+            return
         for lib_name, build_info in libraries:
-            sources = build_info.get('sources')
-            if sources is None or not isinstance(sources, (list, tuple)):
-                raise DistutilsSetupError(
-                    f"in 'libraries' option (library '{lib_name}'), "
-                    "'sources' must be present and must be "
-                    "a list of source filenames"
-                )
-            sources = list(sources)
-
-            log.info("building '%s' library", lib_name)
-
-            # First, compile the source code to object files in the library
-            # directory.  (This should probably change to putting object
-            # files in a temporary build directory.)
-            macros = build_info.get('macros')
-            include_dirs = build_info.get('include_dirs')
-            objects = self.compiler.compile(
-                sources,
-                output_dir=self.build_temp,
-                macros=macros,
-                include_dirs=include_dirs,
-                debug=self.debug,
-            )
+            self._build_library(lib_name, build_info)
 
-            # Now "link" the object files together into a static library.
-            # (On Unix at least, this isn't really linking -- it just
-            # builds an archive.  Whatever.)
-            self.compiler.create_static_lib(
-                objects, lib_name, output_dir=self.build_clib, debug=self.debug
+    def _build_libraries_processes(self, libraries, workers: int) -> None:
+        """
+        Build each of 'libraries' in a worker process (see
+        'command._processes'), up to 'workers' at a time, showing what each
+        did in order. Libraries sharing a source, whose objects go to the
+        same place, build in different waves.
+        """
+        state = _processes.detach(self)
+
+        def slots(lib):
+            _lib_name, build_info = lib
+            return map(os.path.abspath, build_info.get('sources') or ())
+
+        with _processes.pool(workers) as pool:
+            for wave, parallel in _processes.waves(libraries, slots, workers):
+                state['parallel'] = parallel
+                futures = [
+                    _processes.submit(pool, self, state, '_build_library', *lib)
+                    for lib in wave
+                ]
+                outcomes = [_processes.collect(self, future) for future in futures]
+                for outcome in outcomes:
+                    outcome.check()
+
+    def _build_library(self, lib_name, build_info) -> None:
+        sources = build_info.get('sources')
+        if sources is None or not isinstance(sources, (list, tuple)):
+            raise DistutilsSetupError(
+                f"in 'libraries' option (library '{lib_name}'), "
+                "'sources' must be present and must be "
+                "a list of source filenames"
             )
+        sources = list(sources)
+
+        log.info("building '%s' library", lib_name)
+
+        # First, compile the source code to object files in the library
+        # directory.  (This should probably change to putting object
+        # files in a temporary build directory.)
+        macros = build_info.get('macros')
+        include_dirs = build_info.get('include_dirs')
+        objects = self.compiler.compile(
+            sources,
+            output_dir=self.build_temp,
+            macros=macros,
+            include_dirs=include_dirs,
+            debug=self.debug,
+        )
+
+        # Now "link" the object files together into a static library.
+        # (On Unix at least, this isn't really linking -- it just
+        # builds an archive.  Whatever.)
+        self.compiler.create_static_lib(
+            objects, lib_name, output_dir=self.build_clib, debug=self.debug
+        )
@@ -6,10 +6,15 @@ extensions ASAP)."""
 
 from __future__ import annotations
 
+import concurrent.futures
 import contextlib
+import dataclasses
+import fnmatch
+import json
 import os
 import re
 import sys
+import threading
 from collections.abc import Callable
 from distutils._log import log
 from site import USER_BASE
@@ -17,6 +22,10 @@ from typing import ClassVar
 
 from .._modified import newer_group
 from ..ccompiler import CCompiler, new_compiler, show_compilers
+from ..compilers.C import cache, includes, jobs, usage
+from ..compilers.C.cache import HTTPBackend, ObjectCache, ProbeCache
+from ..compilers.C.distributed import Workers
+from ..compilers.C.state import BuildState
 from ..core import Command
 from ..errors import (
     CCompilerError,
@@ -28,7 +37,8 @@ from ..errors import (
 )
 from ..extension import Extension
 from ..sysconfig import customize_compiler, get_config_h_filename, get_python_version
-from ..util import get_platform, is_freethreaded, is_mingw
+from ..util import get_platform, is_freethreaded, is_mingw, split_quoted
+from . import _processes
 
 # An extension name is just a dot-separated list of Python NAMEs (ie.
 # the same as a fully-qualified module name).
@@ -95,6 +105,58 @@ class build_ext(Command):
         ('force', 'f', "forcibly build everything (ignore file timestamps)"),
         ('compiler=', 'c', "specify the compiler type"),
         ('parallel=', 'j', "number of parallel build jobs"),
+        (
+            'process-pool',
+            None,
+            "build extensions in processes, not threads (with --parallel)",
+        ),
+        (
+            'object-cache=',
+            None,
+            "directory of compiled objects to reuse across builds",
+        ),
+        (
+            'object-cache-url=',
+            None,
+            "URL of a shared remote object cache (see compilers.C.cache_server)",
+        ),
+        (
+            'ext-cache=',
+            None,
+            "directory of built extensions to reuse across builds",
+        ),
+        (
+            'compiler-launcher=',
+            None,
+            "command to run compiles through, e.g. ccache [default: $CC_LAUNCHER]",
+        ),
+        ('launch-link', None, "also run links through the compiler launcher"),
+        (
+            'usage-report=',
+            None,
+            "write the time and memory each compiler command used to this file",
+        ),
+        (
+            'compile-workers=',
+            None,
+            "host:port addresses of compile workers (see compilers.C.distributed)",
+        ),
+        (
+            'linker=',
+            None,
+            "linker to link with (e.g. lld, mold, gold), or 'auto' for the fastest",
+        ),
+        (
+            'compile-batch-size=',
+            None,
+            "compile up to this many sources per compiler process",
+        ),
+        ('unity', None, "compile the sources of every extension in unity batches"),
+        (
+            'unity-batch-size=',
+            None,
+            "sources per unity batch [default: each extension's unity_batch_size]",
+        ),
         ('swig-cpp', None, "make SWIG create C++ files (default is C)"),
         ('swig-opts=', None, "list of SWIG command line options"),
         ('swig=', None, "path to the SWIG executable"),
@@ -105,8 +167,11 @@ class build_ext(Command):
         'inplace',
         'debug',
         'force',
+        'launch-link',
+        'unity',
         'swig-cpp',
         'user',
+        'process-pool',
     ]
 
     help_options: ClassVar[list[tuple[str, str | None, str, Callable[[], object]]]] = [
@@ -143,6 +208,18 @@ class build_ext(Command):
         self.swig_opts: list[str] = None  # type: ignore[assignment] # Should always be set in finalize_options
         self.user = None
         self.parallel: int | None = None
+        self.process_pool = False
+        self.object_cache: str | None = None
+        self.object_cache_url: str | None = None
+        self.ext_cache: str | None = None
+        self.compiler_launcher: str | list[str] | None = None
+        self.launch_link = False
+        self.usage_report: str | None = None
+        self.compile_workers: str | list[str] | None = None
+        self.linker: str | None = None
+        self.compile_batch_size: int | None = None
+        self.unity = False
+        self.unity_batch_size: int | None = None
 
     @staticmethod
     def _python_lib_dir(sysconfig):
@@ -308,7 +385,37 @@ class build_ext(Command):
             except ValueError:
                 raise DistutilsOptionError("parallel should be an integer")
 
-    def run(self) -> None:  # noqa: C901
+        if isinstance(self.compile_workers, str):
+            self.compile_workers = self.compile_workers.replace(',', ' ').split()
+
+        if isinstance(self.compile_batch_size, str):
+            try:
+                self.compile_batch_size = int(self.compile_batch_size)
+            except ValueError:
+                raise DistutilsOptionError("compile-batch-size should be an integer")
+
+        if isinstance(self.unity_batch_size, str):
+            try:
+                self.unity_batch_size = int(self.unity_batch_size)
+            except ValueError:
+                raise DistutilsOptionError("unity-batch-size should be an integer")
+
+        if isinstance(self.compiler_launcher, str):
+            self.compiler_launcher = split_quoted(self.compiler_launcher)
+
+        self._include_scanner = includes.Scanner(
+            os.path.join(self.build_temp, 'includes.json')
+        )
+        # objects compiled this run, by source and compile key (see
+        # '_compile_sources()'), and the sources compiled with several keys
+        self._shared_objects: dict[tuple[str, str], concurrent.futures.Future] = {}
+        self._shared_objects_lock = threading.Lock()
+        self._object_variants: set[str] = set()
+        # the cache of whole extensions in 'ext_cache', once the compiler is
+        # set up (see '_setup_compiler()')
+        self._extension_cache: ObjectCache | None = None
+
+    def run(self) -> None:
         # 'self.extensions', as supplied by setup.py, is a list of
         # Extension instances.  See the documentation for Extension (in
         # distutils.extension) for details.
@@ -334,12 +441,38 @@ class build_ext(Command):
 
         # Setup the CCompiler object that we'll use to do all the
         # compiling and linking
+        self._setup_compiler()
+
+        # Now actually compile and link everything.
+        with contextlib.ExitStack() as stack:
+            if self.usage_report:
+                records = stack.enter_context(usage.collect())
+                stack.callback(self._write_usage_report, records)
+            self.build_extensions()
+        self._include_scanner.save()
+
+        if self.compiler.object_cache is not None:
+            self.compiler.object_cache.close()
+            log.info(
+                "object cache: %(hits)d hits (%(remote_hits)d remote), "
+                "%(misses)d misses",
+                self.compiler.object_cache.stats(),
+            )
+        if self._extension_cache is not None:
+            log.info(
+                "extension cache: %(hits)d hits, %(misses)d misses",
+                self._extension_cache.stats(),
+            )
+
+    def _setup_compiler(self) -> None:  # noqa: C901
+        """Set up the compiler that 'run()' compiles and links with."""
         self.compiler = new_compiler(
             compiler=self.compiler,
             verbose=self.verbose,
             force=self.force,
+            configure=customize_compiler,
+            snapshot_dir=None if self.force else self.build_temp,
         )
-        customize_compiler(self.compiler)
         # When cross-compiling, initialize the compiler now so it targets
         # plat_name rather than the host platform. For a native build,
         # initialization is left lazy, since some builds may rely on it
@@ -375,9 +508,63 @@ class build_ext(Command):
             self.compiler.set_runtime_library_dirs(self.rpath)
         if self.link_objects is not None:
             self.compiler.set_link_objects(self.link_objects)
+        # Also spread the sources of each extension across the jobs, so a
+        # single large extension doesn't build on one core.
+        self.compiler.parallel = self.parallel
+        if self.compiler_launcher is not None:
+            self.compiler.launcher = self.compiler_launcher
+        self.compiler.launch_link = self.launch_link
+        if self.linker is not None:
+            self.compiler.use_linker = self.linker
+        self.compiler.batch_size = self.compile_batch_size
+        self.compiler.build_state = BuildState(
+            os.path.join(self.build_temp, 'build-state.json')
+        )
+        if not self.force:
+            self.compiler.probe_cache = ProbeCache(
+                os.path.join(self.build_temp, 'probes.json')
+            )
+        if self.compile_workers:
+            self.compiler.compile_workers = Workers(self.compile_workers)
+        if self.object_cache or self.object_cache_url:
+            remote = (
+                HTTPBackend(self.object_cache_url) if self.object_cache_url else None
+            )
+            self.compiler.object_cache = ObjectCache(
+                self.object_cache or os.path.join(self.build_temp, 'object-cache'),
+                remote=remote,
+            )
+        self._extension_cache = ObjectCache(self.ext_cache) if self.ext_cache else None
 
-        # Now actually compile and link everything.
-        self.build_extensions()
+    def _setup_process(self) -> None:
+        """
+        Set this copy of the command up to build extensions in a worker
+        process (see '_build_extensions_processes()'): with state of its own
+        in place of the parent's, and a compiler of its own.
+        """
+        self._include_scanner = includes.Scanner(
+            os.path.join(self.build_temp, 'includes.json')
+        )
+        self._shared_objects = {}
+        self._shared_objects_lock = threading.Lock()
+        self._setup_compiler()
+        self.compiler.build_state.defer = True
+
+    def _finish_process(self) -> tuple[dict, dict]:
+        """
+        Return what this copy of the command, in a worker process, learned
+        for the parent to keep (see '_merge_process()'): the includes it
+        scanned and the outputs it built.
+        """
+        return self._include_scanner.take(), self.compiler.build_state.take()
+
+    def _merge_process(self, learned: tuple[dict, dict] | None) -> None:
+        """Keep what a worker process learned (see '_finish_process()')."""
+        if learned is None:
+            return
+        includes, built = learned
+        self._include_scanner.merge(includes)
+        self.compiler.build_state.merge(built)
 
     def check_extensions_list(self, extensions) -> None:  # noqa: C901
         """Ensure that the list of extensions (presumably provided as a
@@ -467,15 +654,41 @@ class build_ext(Command):
 
             extensions[i] = ext
 
+    def _write_usage_report(self, records: list[usage.Usage]) -> None:
+        """Write what the commands run used to 'usage_report', as JSON."""
+        log.info(
+            "writing resource usage of %d commands to %s",
+            len(records),
+            self.usage_report,
+        )
+        self.mkpath(os.path.dirname(self.usage_report) or os.curdir)
+        with open(self.usage_report, 'w', encoding='utf-8') as f:
+            json.dump([dataclasses.asdict(record) for record in records], f, indent=1)
+
     def get_source_files(self):
         self.check_extensions_list(self.extensions)
         filenames = []
 
-        # Wouldn't it be neat if we knew the names of header files too...
+        # Include the headers the sources use from within the project too
         for ext in self.extensions:
             filenames.extend(ext.sources)
+            filenames.extend(
+                header
+                for header in self._headers(ext, ext.sources)
+                if not os.path.isabs(header) and not header.startswith(os.pardir)
+            )
         return filenames
 
+    def _headers(self, ext: Extension, sources: list[str]) -> list[str]:
+        """
+        Return the headers 'sources' include, directly or not, as found
+        on the include path of 'ext'.
+        """
+        include_dirs = [*ext.include_dirs, *(self.include_dirs or [])]
+        if isinstance(self.compiler, CCompiler):
+            include_dirs.extend(self.compiler.include_dirs)
+        return self._include_scanner.headers(sources, include_dirs)
+
     def get_outputs(self):
         # Sanity check the 'extensions' list -- can't assume this is being
         # done in the same run as a 'build_extensions()' call (in fact, we
@@ -490,6 +703,8 @@ class build_ext(Command):
     def build_extensions(self) -> None:
         # First, sanity-check the 'extensions' list
         self.check_extensions_list(self.extensions)
+        self._shared_objects = {}
+        self._object_variants = self._find_object_variants(self.extensions)
         if self.parallel:
             self._build_extensions_parallel()
         else:
@@ -508,6 +723,18 @@ class build_ext(Command):
             self._build_extensions_serial()
             return
 
+        if self.process_pool:
+            self._build_extensions_processes(workers)
+            return
+
+        if self._schedulable():
+            try:
+                self._build_extensions_scheduled(workers)
+            except NotImplementedError:
+                pass
+            else:
+                return
+
         with ThreadPoolExecutor(max_workers=workers) as executor:
             futures = [
                 executor.submit(self.build_extension, ext) for ext in self.extensions
@@ -516,6 +743,127 @@ class build_ext(Command):
                 with self._filter_build_errors(ext):
                     fut.result()
 
+    def _build_extensions_processes(self, workers: int) -> None:
+        """
+        Build each extension in a worker process (see 'command._processes'),
+        up to 'workers' at a time, and report the outcomes in the order of
+        'self.extensions'. Extensions sharing a source compiled with the same
+        settings build in different waves, as the processes can't share the
+        object the way threads do (see '_compile_sources()').
+        """
+        state = _processes.detach(
+            self,
+            (
+                '_include_scanner',
+                '_shared_objects',
+                '_shared_objects_lock',
+                '_extension_cache',
+            ),
+        )
+        with _processes.pool(workers) as pool:
+            for wave, parallel in _processes.waves(
+                self.extensions, self._compile_slots, workers
+            ):
+                state['parallel'] = parallel
+                futures = [
+                    _processes.submit(pool, self, state, 'build_extension', ext)
+                    for ext in wave
+                ]
+                for ext, future in zip(wave, futures, strict=True):
+                    with self._filter_build_errors(ext):
+                        _processes.collect(self, future).check()
+
+    def _schedulable(self) -> bool:
+        """
+        Return whether '_build_extensions_scheduled()' builds what
+        'build_extension()' would: not if a subclass overrides that, nor if
+        the compiler uses what planned compiles leave out (an object cache,
+        compile workers, batches, or precompiled headers).
+        """
+        compiler = self.compiler
+        assert isinstance(compiler, CCompiler)
+        return (
+            type(self).build_extension is build_ext.build_extension
+            and compiler.object_cache is None
+            and compiler.compile_workers is None
+            and not compiler.batch_size
+            and not any(ext.precompiled_header for ext in self.extensions)
+        )
+
+    def _build_extensions_scheduled(self, workers: int) -> None:
+        """
+        Build the extensions as one graph of jobs (see 'compilers.C.jobs'):
+        the compiles of every extension, and a link for each, which waits
+        for its compiles only, run up to 'workers' at a time.  Unlike a
+        thread per extension, this spreads the compiles of a large
+        extension over all the workers, and links one extension while
+        others still compile.
+
+        Raises NotImplementedError, before compiling anything, if the
+        compiler can't plan its compiles and links.
+        """
+        planned: list[tuple[Extension, list[jobs.Job], str]] = []
+        for ext in self.extensions:
+            with self._filter_build_errors(ext):
+                prepared = self._prepare_extension(ext)
+                if prepared is not None:
+                    sources, fingerprint = prepared
+                    planned.append((
+                        ext,
+                        self._plan_extension(ext, sources),
+                        fingerprint,
+                    ))
+
+        everything = [job for _, ext_jobs, _ in planned for job in ext_jobs]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            results = jobs.run(everything, executor, keep_going=True)
+        outcomes = dict(zip(dict.fromkeys(everything), results, strict=True))
+
+        for ext, ext_jobs, fingerprint in planned:
+            with self._filter_build_errors(ext):
+                for job in ext_jobs:
+                    if isinstance(outcomes[job], Exception):
+                        raise outcomes[job]
+                self.compiler.commit_jobs(ext_jobs)
+                self._store_extension(ext, fingerprint)
+
+    def _plan_extension(self, ext: Extension, sources: list[str]) -> list[jobs.Job]:
+        """
+        Return the jobs compiling 'sources' for 'ext' and linking it, as
+        'build_extension()' would.
+        """
+        compiler = self.compiler
+        assert isinstance(compiler, CCompiler)
+        macros, extra_args = self._compile_settings(ext)
+        key = self._compile_key(ext)
+        groups: dict[str, list[str]] = {}
+        for source in sources:
+            groups.setdefault(self._object_dir(source, key), []).append(source)
+        objects: dict[str, str] = {}
+        planned = []
+        for output_dir, group in groups.items():
+            planned += compiler.plan_compile(
+                group,
+                output_dir=output_dir,
+                macros=macros,
+                include_dirs=ext.include_dirs,
+                debug=self.debug,
+                extra_postargs=extra_args,
+                depends=ext.depends,
+            )
+            found = compiler.object_filenames(group, output_dir=output_dir)
+            objects.update(zip(group, found, strict=True))
+
+        planned += compiler.plan_link(
+            compiler.SHARED_OBJECT,
+            [objects[source] for source in sources] + (ext.extra_objects or []),
+            self.get_ext_fullpath(ext.name),
+            build_temp=self.build_temp,
+            after=planned,
+            **self._link_settings(ext, sources),
+        )
+        return planned
+
     def _build_extensions_serial(self):
         for ext in self.extensions:
             with self._filter_build_errors(ext):
@@ -531,6 +879,48 @@ class build_ext(Command):
             self.warn(f'building extension "{ext.name}" failed: {e}')
 
     def build_extension(self, ext) -> None:
+        prepared = self._prepare_extension(ext)
+        if prepared is None:
+            return
+        sources, fingerprint = prepared
+
+        # Next, compile the source code to object files.
+
+        # XXX not honouring 'define_macros' or 'undef_macros' -- the
+        # CCompiler API needs to change to accommodate this, and I
+        # want to do one thing at a time!
+
+        # Two possible sources for extra compiler arguments:
+        #   - 'extra_compile_args' in Extension object
+        #   - CFLAGS environment variable (not particularly
+        #     elegant, but people seem to expect it and I
+        #     guess it's useful)
+        # The environment variable should take precedence, and
+        # any sensible compiler will give precedence to later
+        # command line args.  Hence we combine them in order:
+        objects = self._compile_sources(ext, sources)
+
+        # XXX outdated variable, kept here in case third-part code
+        # needs it.
+        self._built_objects = objects[:]
+
+        # Now link the object files together into a "shared object" --
+        # of course, first we have to figure out all the other things
+        # that go into the mix.
+        self.compiler.link_shared_object(
+            objects + (ext.extra_objects or []),
+            self.get_ext_fullpath(ext.name),
+            build_temp=self.build_temp,
+            **self._link_settings(ext, sources),
+        )
+        self._store_extension(ext, fingerprint)
+
+    def _prepare_extension(self, ext: Extension) -> tuple[list[str], str] | None:
+        """
+        Get 'ext' ready to compile: return its sources, once SWIG and unity
+        builds had their say, and its fingerprint for 'ext_cache' (if set);
+        or None if it's up to date or was restored from 'ext_cache'.
+        """
         sources = ext.sources
         if sources is None or not isinstance(sources, (list, tuple)):
             raise DistutilsSetupError(
@@ -541,81 +931,288 @@ class build_ext(Command):
         # sort to make the resulting .so file build reproducible
         sources = sorted(sources)
 
+        # run() replaces the compiler name with a CCompiler instance before
+        # extensions are built.
+        # https://github.com/pypa/distutils/pull/368#discussion_r3559726265
+        assert isinstance(self.compiler, CCompiler), (
+            "run() must precede build_extension()"
+        )
+
         ext_path = self.get_ext_fullpath(ext.name)
-        depends = sources + ext.depends
-        if not (self.force or newer_group(depends, ext_path, 'newer')):
+        headers = self._headers(ext, sources)
+        depends = sources + ext.depends + headers
+        # also rebuild what was built with other settings (or a compiler
+        # configured differently), even if newer than its sources
+        state = self.compiler.build_state
+        changed = state is not None and state.changed(
+            self._settings_key(ext), self._ext_signature(ext)
+        )
+        if not (self.force or changed or newer_group(depends, ext_path, 'newer')):
             log.debug("skipping '%s' extension (up-to-date)", ext.name)
-            return
+            return None
         else:
             log.info("building '%s' extension", ext.name)
 
+        fingerprint = ''
+        if self._extension_cache is not None:
+            fingerprint = self._ext_fingerprint(ext, sources + headers)
+            self.mkpath(os.path.dirname(ext_path))
+            if self._extension_cache.restore(fingerprint, [ext_path]) is not None:
+                log.info("restored '%s' extension from cache", ext.name)
+                if state is not None:
+                    state.commit([self._settings_key(ext)])
+                return None
+
         # First, scan the sources for SWIG definition files (.i), run
         # SWIG on 'em to create .c files, and modify the sources list
         # accordingly.
         sources = self.swig_sources(sources, ext)
+        sources = self.unity_sources(sources, ext)
+        return sources, fingerprint
 
-        # Next, compile the source code to object files.
+    def _settings_key(self, ext: Extension) -> str:
+        """
+        Return the name the settings 'ext' was built with are recorded
+        under in 'build_state' (its link command is recorded under its
+        path).
+        """
+        return self.get_ext_fullpath(ext.name) + '.settings'
 
-        # XXX not honouring 'define_macros' or 'undef_macros' -- the
-        # CCompiler API needs to change to accommodate this, and I
-        # want to do one thing at a time!
+    def _store_extension(self, ext: Extension, fingerprint: str) -> None:
+        """
+        Record the freshly built 'ext' in the compiler's 'build_state', and
+        keep it in 'ext_cache', if set.
+        """
+        assert isinstance(self.compiler, CCompiler)
+        ext_path = self.get_ext_fullpath(ext.name)
+        if self.compiler.build_state is not None:
+            self.compiler.build_state.commit([self._settings_key(ext)])
+        if self._extension_cache is not None:
+            self._extension_cache.store(fingerprint, [ext_path], b'')
+
+    def _link_settings(self, ext: Extension, sources: list[str]) -> dict:
+        """Return the arguments, besides the objects and output, to link
+        'ext' (compiled from 'sources') with.
+        """
+        assert isinstance(self.compiler, CCompiler)
+        return dict(
+            libraries=self.get_libraries(ext),
+            library_dirs=ext.library_dirs,
+            runtime_library_dirs=ext.runtime_library_dirs,
+            extra_postargs=ext.extra_link_args or [],
+            export_symbols=self.get_export_symbols(ext),
+            debug=self.debug,
+            # Detect target language, if not provided
+            target_lang=ext.language or self.compiler.detect_language(sources),
+        )
 
-        # Two possible sources for extra compiler arguments:
-        #   - 'extra_compile_args' in Extension object
-        #   - CFLAGS environment variable (not particularly
-        #     elegant, but people seem to expect it and I
-        #     guess it's useful)
-        # The environment variable should take precedence, and
-        # any sensible compiler will give precedence to later
-        # command line args.  Hence we combine them in order:
+    def _compile_settings(self, ext: Extension) -> tuple[list, list[str]]:
+        """Return the macros and extra arguments to compile 'ext' with."""
         extra_args = ext.extra_compile_args or []
 
         macros = ext.define_macros[:]
         for undef in ext.undef_macros:
             macros.append((undef,))
+        return macros, extra_args
 
-        # run() replaces the compiler name with a CCompiler instance before
-        # extensions are built.
-        # https://github.com/pypa/distutils/pull/368#discussion_r3559726265
-        assert isinstance(self.compiler, CCompiler), (
-            "run() must precede build_extension()"
-        )
-        objects = self.compiler.compile(
-            sources,
-            output_dir=self.build_temp,
-            macros=macros,
-            include_dirs=ext.include_dirs,
-            debug=self.debug,
-            extra_postargs=extra_args,
-            depends=ext.depends,
+    def _compile_key(self, ext: Extension) -> str:
+        """Digest the settings the sources of 'ext' are compiled with."""
+        macros, extra_args = self._compile_settings(ext)
+        return cache.digest(
+            repr((macros, ext.include_dirs, extra_args, ext.precompiled_header))
         )
 
-        # XXX outdated variable, kept here in case third-part code
-        # needs it.
-        self._built_objects = objects[:]
-
-        # Now link the object files together into a "shared object" --
-        # of course, first we have to figure out all the other things
-        # that go into the mix.
-        if ext.extra_objects:
-            objects.extend(ext.extra_objects)
-        extra_args = ext.extra_link_args or []
+    def _compile_slots(self, ext: Extension) -> list[tuple[str, str]]:
+        """Return the objects 'ext' compiles, by source and compile key."""
+        key = self._compile_key(ext)
+        return [(os.path.abspath(source), key) for source in ext.sources]
+
+    def _find_object_variants(self, extensions: list[Extension]) -> set[str]:
+        """Find the sources that 'extensions' compile with different settings."""
+        keys: dict[str, set[str]] = {}
+        for ext in extensions:
+            key = self._compile_key(ext)
+            for source in ext.sources:
+                keys.setdefault(os.path.abspath(source), set()).add(key)
+        return {source for source, found in keys.items() if len(found) > 1}
+
+    def _object_dir(self, source: str, key: str) -> str:
+        """
+        Return the directory to put the object of 'source' in, when
+        compiled with the settings digested as 'key' (see '_compile_key()').
+        """
+        if os.path.abspath(source) in self._object_variants:
+            return os.path.join(self.build_temp, 'variants', key[:12])
+        return self.build_temp
 
-        # Detect target language, if not provided
-        language = ext.language or self.compiler.detect_language(sources)
+    def _compile_sources(self, ext: Extension, sources: list[str]) -> list[str]:
+        """
+        Compile 'sources' for 'ext' and return their objects.
+
+        A source that several extensions list with the same settings is
+        compiled once per run, by the first of them to get to it; the others
+        wait for it and share its object. A source listed with different
+        settings gets an object for each, under a directory of 'build_temp'
+        named after the settings, rather than one that's overwritten (or
+        wrongly taken to be up to date) by the next extension.
+        """
+        assert isinstance(self.compiler, CCompiler)
+        macros, extra_args = self._compile_settings(ext)
+        key = self._compile_key(ext)
+        owned: dict[str, list[str]] = {}
+        futures = {}
+        with self._shared_objects_lock:
+            for source in sources:
+                slot = (os.path.abspath(source), key)
+                if slot not in self._shared_objects:
+                    self._shared_objects[slot] = concurrent.futures.Future()
+                    owned.setdefault(self._object_dir(source, key), []).append(source)
+                futures[source] = self._shared_objects[slot]
+
+        # only pass 'precompiled_header' when it's used, so compiler classes
+        # that predate it keep working
+        pch = (
+            dict(precompiled_header=ext.precompiled_header)
+            if ext.precompiled_header
+            else {}
+        )
+        try:
+            for output_dir, group in owned.items():
+                objects = self.compiler.compile(
+                    group,
+                    output_dir=output_dir,
+                    macros=macros,
+                    include_dirs=ext.include_dirs,
+                    debug=self.debug,
+                    extra_postargs=extra_args,
+                    depends=ext.depends,
+                    **pch,
+                )
+                for source, obj in zip(group, objects, strict=True):
+                    futures[source].set_result(obj)
+        except BaseException as exc:
+            for group in owned.values():
+                for source in group:
+                    if not futures[source].done():
+                        futures[source].set_exception(exc)
+            raise
+        return [futures[source].result() for source in sources]
+
+    def _ext_fingerprint(self, ext: Extension, sources: list[str]) -> str:
+        """
+        Digest everything that determines the shared object built for
+        'ext': the contents of its sources and 'depends', and its settings
+        (see '_ext_signature()').
 
-        self.compiler.link_shared_object(
-            objects,
-            ext_path,
-            libraries=self.get_libraries(ext),
+        'sources' should also list the headers found by '_headers()';
+        headers found neither that way nor in 'depends' aren't covered.
+        """
+        inputs = [
+            f'{name}\0{cache.file_digest(name)}'
+            for name in [*sources, *ext.depends, *ext.extra_objects]
+            if os.path.exists(name)
+        ]
+        return cache.digest(self._ext_signature(ext), *inputs)
+
+    def _ext_signature(self, ext: Extension) -> str:
+        """
+        Digest how 'ext' is built, apart from the files it's built from:
+        its compile and link settings, the compiler's configuration and
+        binaries, and the filename (hence ABI) suffix.
+        """
+        compiler = self.compiler
+        assert isinstance(compiler, CCompiler)
+        executables = {
+            name: getattr(compiler, name, None) for name in compiler.executables
+        }
+        settings = dict(
+            define_macros=ext.define_macros,
+            undef_macros=ext.undef_macros,
+            include_dirs=ext.include_dirs,
             library_dirs=ext.library_dirs,
+            libraries=self.get_libraries(ext),
             runtime_library_dirs=ext.runtime_library_dirs,
-            extra_postargs=extra_args,
-            export_symbols=self.get_export_symbols(ext),
+            extra_objects=ext.extra_objects,
+            extra_compile_args=ext.extra_compile_args,
+            extra_link_args=ext.extra_link_args,
+            export_symbols=ext.export_symbols,
+            swig_opts=ext.swig_opts,
+            language=ext.language,
+            precompiled_header=ext.precompiled_header,
+            unity=[
+                self.unity or ext.unity_build,
+                self.unity_batch_size or ext.unity_batch_size,
+                ext.unity_exclude,
+            ],
             debug=self.debug,
-            build_temp=self.build_temp,
-            target_lang=language,
+            compiler_type=compiler.compiler_type,
+            executables=executables,
+            macros=compiler.macros,
+            compiler_include_dirs=compiler.include_dirs,
+            compiler_libraries=compiler.libraries,
+            compiler_library_dirs=compiler.library_dirs,
+            runtime_dirs=compiler.runtime_library_dirs,
+            link_objects=compiler.objects,
+            filename=self.get_ext_filename(self.get_ext_fullname(ext.name)),
         )
+        identities = sorted({
+            cache.compiler_identity(cmd[0])
+            for cmd in executables.values()
+            if isinstance(cmd, list) and cmd
+        })
+        return cache.digest(repr(settings), *identities)
+
+    def unity_sources(self, sources, extension):
+        """Return 'sources' with the C and C++ files replaced by unity
+        batches, if 'extension' (or this command) asks for a unity build.
+
+        Each batch is a file in the temporary directory that #includes up
+        to the batch size of the sources in one language. A batch is only
+        rewritten when its contents change, so unchanged batches are not
+        recompiled. Sources matching 'unity_exclude', and those in other
+        languages, are kept as they are.
+        """
+        if not (self.unity or extension.unity_build):
+            return sources
+        size = max(1, self.unity_batch_size or extension.unity_batch_size)
+        suffixes = {'c': '.c', 'c++': '.cpp'}
+
+        batched: dict[str, list[str]] = {}
+        new_sources = []
+        for source in sources:
+            lang = self.compiler.detect_language(source)
+            excluded = any(
+                fnmatch.fnmatch(source, pattern) for pattern in extension.unity_exclude
+            )
+            if lang in suffixes and not excluded:
+                batched.setdefault(lang, []).append(source)
+            else:
+                new_sources.append(source)
+
+        unity_dir = os.path.join(self.build_temp, 'unity')
+        self.mkpath(unity_dir)
+        batches = [
+            (members[start : start + size], suffixes[lang])
+            for lang, members in batched.items()
+            for start in range(0, len(members), size)
+        ]
+        for index, (members, suffix) in enumerate(batches):
+            batch = os.path.join(unity_dir, f'{extension.name}.unity{index}{suffix}')
+            contents = ''.join(
+                f'#include "{os.path.abspath(source).replace(os.sep, "/")}"\n'
+                for source in members
+            )
+            try:
+                with open(batch, encoding='utf-8') as f:
+                    current = f.read()
+            except OSError:
+                current = None
+            if current != contents:
+                with open(batch, 'w', encoding='utf-8') as f:
+                    f.write(contents)
+            new_sources.append(batch)
+
+        return new_sources
 
     def swig_sources(self, sources, extension):
         """Walk the list of source files in 'sources', looking for SWIG
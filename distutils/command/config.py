@@ -91,8 +91,9 @@ class config(Command):
         if not, make it one.
         """
         if not isinstance(self.compiler, CCompiler):
-            self.compiler = new_compiler(compiler=self.compiler, force=True)
-            customize_compiler(self.compiler)
+            self.compiler = new_compiler(
+                compiler=self.compiler, force=True, configure=customize_compiler
+            )
             if self.include_dirs:
                 self.compiler.set_include_dirs(self.include_dirs)
             if self.libraries:
@@ -5,13 +5,21 @@ for the Distutils compiler abstraction model."""
 
 from __future__ import annotations
 
+import asyncio
+import concurrent.futures
+import contextlib
+import copy
+import json
 import os
 import pathlib
 import re
 import shutil
 import subprocess
 import sys
+import sysconfig
+import threading
 import warnings
+import weakref
 from collections.abc import Callable, Iterable, MutableSequence, Sequence
 from typing import (
     TYPE_CHECKING,
@@ -23,12 +31,14 @@ from typing import (
 
 from more_itertools import always_iterable
 
+from .. import _depfile
 from .._modified import newer_group
 from .._util import split_quoted
 from ..errors import PlatformError, UnknownFileType
 from ..logging import get_logger
 from ..platform import macos
 from ..platform.detect import is_mingw
+from . import cache, jobs, usage
 from .errors import CompileError, LinkError
 
 log = get_logger(__name__)
@@ -37,7 +47,12 @@ if TYPE_CHECKING:
     from subprocess import _ENV
     from typing import TypeAlias
 
-    from typing_extensions import TypeVarTuple, Unpack
+    from typing_extensions import Self, TypeVarTuple, Unpack
+
+    from .cache import ObjectCache, ProbeCache
+    from .distributed import Workers
+    from .jobs import Job
+    from .state import BuildState
 
     _Ts = TypeVarTuple("_Ts")
 
@@ -45,6 +60,47 @@ _Macro: TypeAlias = tuple[str] | tuple[str, str | None]
 _StrPathT = TypeVar("_StrPathT", bound="str | os.PathLike[str]")
 _BytesPathT = TypeVar("_BytesPathT", bound="bytes | os.PathLike[bytes]")
 
+# Commands run by 'Compiler.call' on a thread inside '_buffered_output()'
+# collect their output here instead of writing it straight to the console.
+_captured = threading.local()
+_replay_lock = threading.Lock()
+_slots_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _buffered_output(replay: bool = True):
+    """
+    Hold back the output of the commands this thread runs via
+    'Compiler.call', then replay it in one piece, so diagnostics from
+    concurrent compiles aren't interleaved.
+
+    Yields the list of ``CompletedProcess`` results collected so far.
+    Nested uses hand their results to the enclosing one.  Without
+    'replay', the results are left to the caller instead.
+    """
+    outer = getattr(_captured, 'results', None)
+    results = _captured.results = []
+    try:
+        yield results
+    finally:
+        _captured.results = outer
+        if replay:
+            _replay(results)
+
+
+def _replay(results):
+    """Write out the output of 'results', or hold it back if buffering."""
+    pending = getattr(_captured, 'results', None)
+    if pending is not None:
+        pending.extend(results)
+        return
+    with _replay_lock:
+        for result in results:
+            sys.stdout.write(result.stdout.decode(errors='replace'))
+            sys.stderr.write(result.stderr.decode(errors='replace'))
+        sys.stdout.flush()
+        sys.stderr.flush()
+
 
 class Compiler:
     """Abstract base class to define the interface that must be implemented
@@ -96,6 +152,15 @@ class Compiler:
 
     executables: ClassVar[dict]
 
+    # The sysconfig variables and environment variables 'configure_system()'
+    # (and '__init__()', for the launcher) reads, so a configuration recorded
+    # for the same values can be reused (see 'new_compiler()').
+    _config_var_names: ClassVar[tuple[str, ...]] = ()
+    _config_environ: ClassVar[tuple[str, ...]] = ('CC_LAUNCHER',)
+    # the configuration key 'configure_system()' last configured a compiler
+    # for, if any; a class-level default, as some subclasses skip __init__
+    _configured_key: str | None = None
+
     # Subclasses that rely on the standard filename generation methods
     # implemented below should override these; see the comment near
     # those methods ('object_filenames()' et. al.) for details:
@@ -161,6 +226,56 @@ class Compiler:
         # named library files) to include on any link
         self.objects: list[str] = []
 
+        # 'parallel': how many sources 'compile()' may build at once (True
+        # for one per CPU); None or 1 compiles them one after another
+        self.parallel: int | bool | None = None
+
+        # '_slots': the limit and semaphore that concurrent 'compile()' calls
+        # share to stay within 'parallel', and '_loop_slots' the same for
+        # each running event loop; both are made when first needed, and
+        # again once 'parallel' changes
+        self._slots: tuple[int, threading.Semaphore] | None = None
+        self._loop_slots: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, tuple[int, asyncio.Semaphore]
+        ] = weakref.WeakKeyDictionary()
+
+        # 'object_cache': an ObjectCache (see compilers.C.cache) consulted
+        # before compiling each source, or None to always compile
+        self.object_cache: ObjectCache | None = None
+
+        # 'launcher': a command (e.g. ["ccache"] or ["sccache"]) to run
+        # compile commands through, from $CC_LAUNCHER by default; kept apart
+        # from the compiler executables so it doesn't confuse detection of
+        # the compiler itself.  'launch_link' also applies it to links,
+        # which caching launchers typically can't speed up.
+        self.launcher: list[str] = split_quoted(os.environ.get('CC_LAUNCHER', ''))
+        self.launch_link = False
+
+        # 'batch_size': if set, compile up to this many sources sharing a
+        # language and options in one compiler process (where supported;
+        # see '_compile_batch()'); ignored when 'object_cache' or
+        # 'compile_workers' is set
+        self.batch_size: int | None = None
+
+        # 'probe_cache': a ProbeCache (see compilers.C.cache) remembering
+        # the outcomes of 'has_functions()' across builds, or None
+        self.probe_cache: ProbeCache | None = None
+
+        # 'executor': if set, a concurrent.futures executor that 'compile()'
+        # runs the planned compiles on (see 'plan_compile()') instead of
+        # compiling 'parallel' at a time itself
+        self.executor: concurrent.futures.Executor | None = None
+
+        # 'compile_workers': if set, Workers (see compilers.C.distributed)
+        # to compile the preprocessed sources on, where supported, falling
+        # back to compiling here; not used for planned compiles
+        self.compile_workers: Workers | None = None
+
+        # 'build_state': a BuildState (see compilers.C.state) recording the
+        # commands behind each object and link, so changing them rebuilds
+        # what they built; None judges outputs by timestamps alone
+        self.build_state: BuildState | None = None
+
         for key in self.executables:
             self.set_executable(key, self.executables[key])
 
@@ -183,6 +298,53 @@ class Compiler:
         interpreter.
         """
 
+    @classmethod
+    def _config_key(cls) -> str:
+        """Hash everything the outcome of 'configure_system()' depends on
+        but the compiler binaries: the interpreter, its build configuration,
+        and the environment.
+        """
+        return cache.digest(
+            'config',
+            f'{cls.__module__}.{cls.__qualname__}',
+            cache.python_abi(),
+            sys.executable,
+            repr(sysconfig.get_config_vars(*cls._config_var_names)),
+            repr([os.environ.get(name) for name in cls._config_environ]),
+        )
+
+    def _configure(self, snapshot_dir: str | None = None) -> None:
+        """Run 'configure_system()', or restore what it did from a snapshot
+        in 'snapshot_dir' taken for the same configuration key, provided the
+        compilers it named haven't changed since; otherwise take one.
+        """
+        path = None
+        if snapshot_dir is not None:
+            key = self._config_key()
+            path = os.path.join(snapshot_dir, f'compiler-{key[:16]}.json')
+            state = _read_snapshot(path, key)
+            if state is not None:
+                self.__dict__.update(state)
+                return
+        before = dict(self.__dict__)
+        self.configure_system()
+        if path is None:
+            return
+        missing = object()
+        state = {
+            name: value
+            for name, value in self.__dict__.items()
+            if before.get(name, missing) != value
+        }
+        try:
+            json.dumps(state)
+        except (TypeError, ValueError):
+            # something other than plain data; configure afresh next time
+            return
+        cache.dump_json(
+            path, {'key': key, 'state': state, 'binaries': _binary_stamps(state)}
+        )
+
     def set_executables(self, **kwargs: str) -> None:
         """Define the executables (and options for them) that will be run
         to perform the various stages of compilation.  The exact set of
@@ -408,11 +570,256 @@ class Compiler:
             src = sources[i]
             obj = objects[i]
             ext = os.path.splitext(src)[1]
+            if (
+                not self.force
+                and self.build_state is not None
+                and self._object_up_to_date(obj, src, depends)
+            ):
+                log.debug("skipping %s (%s up-to-date)", src, obj)
+                continue
             self.mkpath(os.path.dirname(obj))
             build[obj] = (src, ext)
 
         return macros, objects, extra, pp_opts, build
 
+    def _check_build_state(self, sources, objects, build, cc_args, extra_postargs):
+        """
+        Add to 'build' (see '_setup_compile()') the objects 'build_state'
+        doesn't know to have been built with the compile command they'd be
+        built with now, and expect each to be built that way.
+        """
+        if self.build_state is None:
+            return
+        for src, obj in zip(sources, objects, strict=True):
+            signature = self._compile_signature(src, cc_args, extra_postargs)
+            if self.build_state.changed(obj, signature) and obj not in build:
+                log.debug("compiling %s (%s built differently)", src, obj)
+                self.mkpath(os.path.dirname(obj))
+                build[obj] = (src, os.path.splitext(src)[1])
+
+    def _compile_signature(self, src, cc_args, extra_postargs) -> str:
+        """
+        Digest what compiling 'src' with 'cc_args' and 'extra_postargs'
+        involves besides the files it reads: those arguments, and the
+        compiler's executables and binaries.
+        """
+        executables = [getattr(self, name, None) for name in sorted(self.executables)]
+        identities = sorted({
+            cache.compiler_identity(cmd[0])
+            for cmd in executables
+            if isinstance(cmd, list) and cmd
+        })
+        return cache.digest(
+            os.path.abspath(src),
+            repr((cc_args, extra_postargs, executables)),
+            *identities,
+        )
+
+    def commit_jobs(self, planned: Iterable[Job]) -> None:
+        """
+        Record in 'build_state' that the jobs 'planned' (by 'plan_compile()'
+        and 'plan_link()') have run successfully; until then, their
+        outputs are rebuilt.
+        """
+        planned = list(planned)
+        for job in planned:
+            if job.kind == 'link' and job.build_temp is not None:
+                command = job.argv
+                if self.launch_link and self.launcher:
+                    command = command[len(self.launcher) :]
+                self._record_link(job.inputs, job.outputs[0], command, job.build_temp)
+        if self.build_state is not None:
+            self.build_state.commit(output for job in planned for output in job.outputs)
+
+    def _depfile_name(self, obj: str) -> str:
+        """Return the dependency file recorded alongside object 'obj'."""
+        return os.path.splitext(obj)[0] + '.d'
+
+    def _object_up_to_date(self, obj, src, depends) -> bool:
+        """
+        Is 'obj' newer than 'src', everything in 'depends', and every
+        header recorded in its dependency file?
+
+        Objects without a dependency file (because the compiler doesn't
+        write one) are never considered up-to-date.
+        """
+        headers = _depfile.read(self._depfile_name(obj))
+        if headers is None:
+            return False
+        inputs = [src, *(depends or ()), *headers]
+        return not newer_group(inputs, obj, missing='newer')
+
+    def _parallel_limit(self) -> int:
+        """Return how many compiler processes may run at once."""
+        workers = os.cpu_count() if self.parallel is True else self.parallel
+        return max(1, workers or 1)
+
+    def _build_objects(
+        self, objects, build, cc_args, extra_postargs, pp_opts, lang_args=None
+    ):
+        """
+        Call '_compile()' for each of 'objects' listed in 'build' (as
+        returned by '_setup_compile()'), using up to 'parallel' threads.
+        'lang_args' optionally maps a language to extra 'cc_args' for the
+        sources in that language.
+
+        With a 'batch_size', sources are compiled in batches instead (see
+        '_batches()'); a batch that fails is compiled again one source at a
+        time, so the error is reported against the source that caused it.
+
+        In parallel, each source's compiler output is replayed once it
+        finishes, and the first failing source (in 'objects' order) raises.
+        """
+        lang_args = lang_args or {}
+        jobs = [
+            (obj, src, ext, cc_args + lang_args.get(self.detect_language(src), []))
+            for obj in objects
+            if obj in build
+            for src, ext in [build[obj]]
+        ]
+        limit = self._parallel_limit()
+        if (
+            self.batch_size
+            and self.object_cache is None
+            and self.compile_workers is None
+        ):
+            units = self._batches(jobs, limit)
+        else:
+            units = [[job] for job in jobs]
+
+        def build_unit(unit):
+            if len(unit) > 1 and self._compile_batch(unit, extra_postargs, pp_opts):
+                return
+            for obj, src, ext, args in unit:
+                self._compile_cached(obj, src, ext, args, extra_postargs, pp_opts)
+
+        workers = min(limit, len(units))
+        if workers <= 1:
+            for unit in units:
+                build_unit(unit)
+            return
+
+        # Share the slots across concurrent 'compile()' calls (as made by
+        # build_ext --parallel), so together they stay within 'parallel'.
+        slots = self._thread_slots()
+        # and hand the output on to this thread's '_buffered_output()', if any
+        outer = getattr(_captured, 'results', None)
+
+        def build_one(unit):
+            _captured.results = outer
+            try:
+                with slots, _buffered_output():
+                    build_unit(unit)
+            finally:
+                _captured.results = None
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(build_one, unit) for unit in units]
+            try:
+                for future in futures:
+                    future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def _batches(self, jobs, workers):
+        """
+        Group 'jobs' (as built by '_build_objects()') into batches of
+        sources with the same language and arguments, and distinct base
+        names (as a batch's objects are named after them), no larger than
+        'batch_size' or than needed to keep 'workers' busy.
+        """
+        groups: dict[tuple, list[list]] = {}
+        for job in jobs:
+            _, src, _, args = job
+            key = (self.detect_language(src), tuple(args))
+            batches = groups.setdefault(key, [[]])
+            name = os.path.basename(src)
+            if any(os.path.basename(other[1]) == name for other in batches[-1]):
+                batches.append([])
+            batches[-1].append(job)
+        size = max(1, min(self.batch_size or 1, -(-len(jobs) // workers)))
+        return [
+            batch[start : start + size]
+            for batches in groups.values()
+            for batch in batches
+            for start in range(0, len(batch), size)
+        ]
+
+    def _compile_batch(self, jobs, extra_postargs, pp_opts) -> bool:
+        """
+        Compile the sources of 'jobs' (tuples of object, source, extension
+        and arguments, all sharing a language and arguments) in a single
+        compiler process, and return whether that succeeded.
+
+        On failure nothing should be left behind and no output shown, as
+        '_build_objects()' then compiles each source on its own.  Compilers
+        that can't batch return False.
+        """
+        return False
+
+    def _compile_cached(self, obj, src, ext, cc_args, extra_postargs, pp_opts):
+        """
+        Produce 'obj' from 'src' as '_compile()' does, but restore it from
+        'object_cache' if an identical translation unit was compiled before,
+        and record it there otherwise.
+        """
+        cache = self.object_cache
+        key = cache and self._cache_key(obj, src, ext, cc_args, extra_postargs)
+        if not key:
+            self._compile_anywhere(obj, src, ext, cc_args, extra_postargs, pp_opts)
+            return
+        assert cache is not None
+        files = self._cache_files(obj)
+        output = cache.restore(key, files)
+        if output is not None:
+            _replay([subprocess.CompletedProcess((), 0, b'', output)])
+            return
+        if os.path.exists(obj):
+            # never write through a hard link into the cache
+            os.remove(obj)
+        with _buffered_output() as results:
+            self._compile_anywhere(obj, src, ext, cc_args, extra_postargs, pp_opts)
+            cache.store(key, files, b''.join(result.stderr for result in results))
+
+    def _compile_anywhere(self, obj, src, ext, cc_args, extra_postargs, pp_opts):
+        """
+        Produce 'obj' from 'src' on one of 'compile_workers' if possible,
+        and with '_compile()' otherwise.
+        """
+        if self.compile_workers is not None and self._compile_remote(
+            obj, src, cc_args, extra_postargs
+        ):
+            return
+        self._compile(obj, src, ext, cc_args, extra_postargs, pp_opts)
+
+    def _compile_remote(self, obj, src, cc_args, extra_postargs) -> bool:
+        """
+        Produce 'obj' from 'src' on one of 'compile_workers', and return
+        whether that worked; if not, nothing should be left behind and no
+        output shown, as the source is then compiled here.
+
+        Compilers that can hand out compiles override this.
+        """
+        return False
+
+    def _cache_key(self, obj, src, ext, cc_args, extra_postargs) -> str | None:
+        """
+        Return the 'object_cache' key for compiling 'src' with these
+        arguments, or None if it can't be cached.
+
+        Compilers that support caching override this; the key should hash
+        the preprocessed source, the full command line, the compiler binary
+        (see 'cache.compiler_identity()'), and the Python ABI.
+        """
+        return None
+
+    def _cache_files(self, obj: str) -> list[str]:
+        """Return the files compiling 'obj' produces, 'obj' first."""
+        return [obj]
+
     def _get_cc_args(self, pp_opts, debug, before):
         # works for unixccompiler, cygwinccompiler
         cc_args = pp_opts + ['-c']
@@ -538,14 +945,81 @@ class Compiler:
 
         return (libraries, library_dirs, runtime_library_dirs)
 
-    def _need_link(self, objects, output_file):
+    def _need_link(
+        self, objects, output_file, command=None, build_temp=None, pending=False
+    ):
         """Return true if we need to relink the files listed in 'objects'
-        to recreate 'output_file'.
+        to recreate 'output_file'.  Missing objects, or 'pending' ones (to
+        be built by planned jobs), always do.
+
+        Given the link 'command', and a 'build_temp' directory to keep
+        signatures in, objects newer than 'output_file' only count if their
+        contents or the command differ from the last link recorded by
+        '_record_link()'.  If not (e.g. the objects were restored from the
+        object cache, or rebuilt identically), 'output_file' is touched
+        instead of relinked.
         """
-        if self.force:
+        changed = (
+            command is not None
+            and self.build_state is not None
+            and self.build_state.changed(output_file, self._command_signature(command))
+        )
+        if self.force or changed or pending:
+            return True
+        if not newer_group(objects, output_file, missing='newer'):
+            return False
+        if command is None or build_temp is None or not os.path.exists(output_file):
+            return True
+        try:
+            signature_file = self._link_signature_file(output_file, build_temp)
+            with open(signature_file, encoding='utf-8') as f:
+                recorded = f.read()
+        except OSError:
             return True
-        newer = newer_group(objects, output_file)
-        return newer
+        if recorded != self._link_signature(objects, command):
+            return True
+        log.info("skipping %s (objects unchanged)", output_file)
+        os.utime(output_file)
+        return False
+
+    def _command_signature(self, command) -> str:
+        """Digest 'command' and the binary it runs, for 'build_state'."""
+        return cache.digest(
+            '\0'.join(map(os.fspath, command)),
+            cache.compiler_identity(os.fspath(command[0])),
+        )
+
+    def _link_signature_file(self, output_file, build_temp) -> str:
+        name = os.path.basename(output_file)
+        key = cache.digest(os.path.abspath(output_file))[:8]
+        return os.path.join(build_temp, 'link', f'{name}-{key}.sig')
+
+    def _link_signature(self, objects, command) -> str:
+        """Digest the link 'command' and the contents of what it links."""
+        inputs = [
+            f'{name}\0{cache.file_digest(name)}'
+            for name in [*objects, *self.objects]
+            if os.path.isfile(name)
+        ]
+        return cache.digest(
+            '\0'.join(map(os.fspath, command)),
+            cache.compiler_identity(os.fspath(command[0])),
+            *inputs,
+        )
+
+    def _record_link(self, objects, output_file, command, build_temp) -> None:
+        """Record the signature of a link for '_need_link()'."""
+        if self.build_state is not None:
+            self.build_state.commit([output_file])
+        if build_temp is None:
+            return
+        signature_file = self._link_signature_file(output_file, build_temp)
+        try:
+            os.makedirs(os.path.dirname(signature_file), exist_ok=True)
+            with open(signature_file, 'w', encoding='utf-8') as f:
+                f.write(self._link_signature(objects, command))
+        except OSError:
+            pass
 
     def detect_language(self, sources: str | list[str]) -> str | None:
         """Detect the language of a given file, or list of files. Uses
@@ -599,6 +1073,7 @@ class Compiler:
         extra_preargs: list[str] | None = None,
         extra_postargs: list[str] | None = None,
         depends: list[str] | tuple[str, ...] | None = None,
+        precompiled_header: str | None = None,
     ) -> list[str]:
         """Compile one or more source files.
 
@@ -644,7 +1119,21 @@ class Compiler:
         depend on.  If a source file is older than any file in
         depends, then the source file will be recompiled.  This
         supports dependency tracking, but only at a coarse
-        granularity.
+        granularity.  Compilers that record the headers each object
+        was built from (see '_depfile_name()') additionally skip any
+        source whose object is newer than the source, 'depends', and
+        all of those headers, unless 'force' is set.  As the headers say
+        nothing of the command that built the object, they only do so
+        with a 'build_state' to rebuild objects whose command changed.
+
+        'precompiled_header', if given, names a header (a path, or a name
+        found on the include path) that every source includes first.
+        Compilers that support it precompile the header once for these
+        options under 'output_dir' and have each source use that instead
+        of parsing the header again; see '_precompile_header()'.  Others
+        compile the sources as usual.
+
+        Sources are compiled 'parallel' at a time; see '_build_objects()'.
 
         Raises CompileError on failure.
         """
@@ -654,22 +1143,221 @@ class Compiler:
             output_dir, macros, include_dirs, sources, depends, extra_postargs
         )
         cc_args = self._get_cc_args(pp_opts, debug, extra_preargs)
+        self._check_build_state(sources, objects, build, cc_args, extra_postargs)
+        lang_args = (
+            self._precompile_header(
+                precompiled_header,
+                output_dir,
+                [src for src, _ in build.values()],
+                cc_args,
+                extra_postargs,
+            )
+            if precompiled_header and build
+            else {}
+        )
 
-        for obj in objects:
-            try:
-                src, ext = build[obj]
-            except KeyError:
-                continue
-            self._compile(obj, src, ext, cc_args, extra_postargs, pp_opts)
+        planned = self.executor is not None and self._compile_jobs(
+            objects, build, cc_args, extra_postargs, pp_opts, lang_args
+        )
+        if planned:
+            jobs.run(planned, self.executor)
+        else:
+            self._build_objects(
+                objects, build, cc_args, extra_postargs, pp_opts, lang_args
+            )
+        if self.build_state is not None:
+            self.build_state.commit(build)
 
         # Return *all* object filenames, not just the ones we just built.
         return objects
 
+    def plan_compile(
+        self,
+        sources: Sequence[str | os.PathLike[str]],
+        output_dir: str | None = None,
+        macros: list[_Macro] | None = None,
+        include_dirs: list[str] | tuple[str, ...] | None = None,
+        debug: bool = False,
+        extra_preargs: list[str] | None = None,
+        extra_postargs: list[str] | None = None,
+        depends: list[str] | tuple[str, ...] | None = None,
+    ) -> list[Job]:
+        """Return the jobs 'compile()' would run for these arguments,
+        without running them (see 'compilers.C.jobs').
+
+        As with 'compile()', sources whose objects are up to date are left
+        out.  The jobs don't use an object cache or batches, and there's no
+        precompiled header, as building one means running the compiler.
+        Once they've run, pass them to 'commit_jobs()'.
+
+        Raises NotImplementedError for compilers that can't describe their
+        compiles as commands, or that override 'compile()'.
+        """
+        return self._plan_compile(
+            sources,
+            output_dir,
+            macros,
+            include_dirs,
+            debug,
+            extra_preargs,
+            extra_postargs,
+            depends,
+        )[1]
+
+    def _plan_compile(
+        self,
+        sources,
+        output_dir,
+        macros,
+        include_dirs,
+        debug,
+        extra_preargs,
+        extra_postargs,
+        depends,
+    ) -> tuple[list[str], list[Job]]:
+        """Return all the objects for 'sources', and the jobs to build the
+        ones that aren't up to date, as for 'plan_compile()'.
+        """
+        if type(self).compile is not Compiler.compile:
+            # what a subclass's own 'compile()' does isn't known
+            raise NotImplementedError(f"{type(self).__name__} can't plan compiles")
+        macros, objects, extra_postargs, pp_opts, build = self._setup_compile(
+            output_dir, macros, include_dirs, sources, depends, extra_postargs
+        )
+        cc_args = self._get_cc_args(pp_opts, debug, extra_preargs)
+        self._check_build_state(sources, objects, build, cc_args, extra_postargs)
+        planned = self._compile_jobs(objects, build, cc_args, extra_postargs, pp_opts)
+        if planned is None:
+            raise NotImplementedError(f"{type(self).__name__} can't plan compiles")
+        return objects, planned
+
+    async def acompile(
+        self,
+        sources: Sequence[str | os.PathLike[str]],
+        output_dir: str | None = None,
+        macros: list[_Macro] | None = None,
+        include_dirs: list[str] | tuple[str, ...] | None = None,
+        debug: bool = False,
+        extra_preargs: list[str] | None = None,
+        extra_postargs: list[str] | None = None,
+        depends: list[str] | tuple[str, ...] | None = None,
+    ) -> list[str]:
+        """Compile as 'compile()' does, but from the running event loop.
+
+        The compiles are run as subprocesses of the loop (see
+        'plan_compile()'), at most 'parallel' at a time, counting those of
+        other 'acompile()' and 'alink()' calls on this compiler in the same
+        loop.  Compilers that can't plan their compiles run 'compile()' in
+        a thread instead.
+
+        Raises CompileError on failure.
+        """
+        try:
+            objects, planned = self._plan_compile(
+                sources,
+                output_dir,
+                macros,
+                include_dirs,
+                debug,
+                extra_preargs,
+                extra_postargs,
+                depends,
+            )
+        except NotImplementedError:
+            return await asyncio.to_thread(
+                self.compile,
+                sources,
+                output_dir,
+                macros,
+                include_dirs,
+                debug,
+                extra_preargs,
+                extra_postargs,
+                depends,
+            )
+        await jobs.arun(planned, self._async_slots())
+        self.commit_jobs(planned)
+        return objects
+
+    def _thread_slots(self) -> threading.Semaphore:
+        """Return the semaphore bounding this compiler's concurrent
+        compiles across threads to 'parallel'.
+        """
+        limit = self._parallel_limit()
+        with _slots_lock:
+            if self._slots is None or self._slots[0] != limit:
+                self._slots = (limit, threading.Semaphore(limit))
+            return self._slots[1]
+
+    def _async_slots(self) -> asyncio.Semaphore:
+        """Return the semaphore bounding this compiler's subprocesses in
+        the running event loop to 'parallel'.
+        """
+        limit = self._parallel_limit()
+        loop = asyncio.get_running_loop()
+        slots = self._loop_slots.get(loop)
+        if slots is None or slots[0] != limit:
+            slots = self._loop_slots[loop] = (limit, asyncio.Semaphore(limit))
+        return slots[1]
+
+    def _compile_jobs(
+        self, objects, build, cc_args, extra_postargs, pp_opts, lang_args=None
+    ) -> list[Job] | None:
+        """
+        Return the jobs compiling each of 'objects' listed in 'build' (see
+        '_build_objects()'), or None if any can't be planned.
+        """
+        lang_args = lang_args or {}
+        planned = []
+        for obj in objects:
+            if obj not in build:
+                continue
+            src, ext = build[obj]
+            args = cc_args + lang_args.get(self.detect_language(src), [])
+            job = self._compile_job(obj, src, ext, args, extra_postargs, pp_opts)
+            if job is None:
+                return None
+            planned.append(job)
+        return planned
+
     def _compile(self, obj, src, ext, cc_args, extra_postargs, pp_opts):
         """Compile 'src' to product 'obj'."""
         # A concrete compiler class that does not override compile()
         # should implement _compile().
 
+    def _compile_job(
+        self, obj, src, ext, cc_args, extra_postargs, pp_opts
+    ) -> Job | None:
+        """Return the job '_compile()' runs to produce 'obj' from 'src'.
+
+        Compilers that can't describe a compile as a single command return
+        None.
+        """
+        return None
+
+    def _job(self, cmd: Sequence[str], *, launch: bool = False, **fields) -> Job:
+        """Describe running 'cmd' as 'call()' would (see 'jobs.Job')."""
+        if launch and self.launcher:
+            cmd = [*self.launcher, *cmd]
+        env = macos.inject_ver(None)
+        return jobs.Job(
+            tuple(cmd),
+            env=None if env is None else tuple(sorted(env.items())),
+            **fields,
+        )
+
+    def _precompile_header(
+        self, header, output_dir, sources, cc_args, extra_postargs
+    ) -> dict[str, list[str]]:
+        """
+        Precompile 'header' for compiling 'sources' with 'cc_args' and
+        'extra_postargs', unless an up-to-date build of it exists, and
+        return the extra compile arguments that use it, by language.
+
+        Compilers without precompiled headers return an empty mapping.
+        """
+        return {}
+
     def create_static_lib(
         self,
         objects: list[str] | tuple[str, ...],
@@ -767,6 +1455,80 @@ class Compiler:
         """
         raise NotImplementedError
 
+    def plan_link(
+        self,
+        target_desc: str,
+        objects: list[str] | tuple[str, ...],
+        output_filename: str,
+        output_dir: str | None = None,
+        libraries: list[str] | tuple[str, ...] | None = None,
+        library_dirs: list[str] | tuple[str, ...] | None = None,
+        runtime_library_dirs: list[str] | tuple[str, ...] | None = None,
+        export_symbols: Iterable[str] | None = None,
+        debug: bool = False,
+        extra_preargs: list[str] | None = None,
+        extra_postargs: list[str] | None = None,
+        build_temp: str | os.PathLike[str] | None = None,
+        target_lang: str | None = None,
+        *,
+        after: Iterable[Job] = (),
+    ) -> list[Job]:
+        """Return the jobs 'link()' would run for these arguments, without
+        running them (see 'compilers.C.jobs'): none if the output is newer
+        than 'objects' (and 'build_state' has it built the same way).
+        Objects that are missing, or outputs of the jobs 'after' (planned to
+        run first), are taken to be newer.  Once they've run, pass them to
+        'commit_jobs()', which records the link in 'build_temp' as 'link()'
+        does.
+
+        Raises NotImplementedError for compilers that can't describe their
+        links as commands.
+        """
+        raise NotImplementedError
+
+    async def alink(
+        self,
+        target_desc: str,
+        objects: list[str] | tuple[str, ...],
+        output_filename: str,
+        output_dir: str | None = None,
+        libraries: list[str] | tuple[str, ...] | None = None,
+        library_dirs: list[str] | tuple[str, ...] | None = None,
+        runtime_library_dirs: list[str] | tuple[str, ...] | None = None,
+        export_symbols: Iterable[str] | None = None,
+        debug: bool = False,
+        extra_preargs: list[str] | None = None,
+        extra_postargs: list[str] | None = None,
+        build_temp: str | os.PathLike[str] | None = None,
+        target_lang: str | None = None,
+    ) -> None:
+        """Link as 'link()' does, but from the running event loop, like
+        'acompile()'.
+
+        Raises LinkError on failure.
+        """
+        args = (
+            target_desc,
+            objects,
+            output_filename,
+            output_dir,
+            libraries,
+            library_dirs,
+            runtime_library_dirs,
+            export_symbols,
+            debug,
+            extra_preargs,
+            extra_postargs,
+            build_temp,
+        )
+        try:
+            planned = self.plan_link(*args, target_lang=target_lang)
+        except NotImplementedError:
+            await asyncio.to_thread(self.link, *args, target_lang=target_lang)
+            return
+        await jobs.arun(planned, self._async_slots())
+        self.commit_jobs(planned)
+
     # Old 'link_*()' methods, rewritten to use the new 'link()' method.
 
     def link_shared_lib(
@@ -910,6 +1672,8 @@ class Compiler:
         # the necessary logic should just be inlined?
         import tempfile
 
+        if includes is None and include_dirs is None:
+            return self.has_functions([funcname], libraries, library_dirs)[funcname]
         if includes is None:
             includes = []
         else:
@@ -951,15 +1715,16 @@ int main (int argc, char **argv) {{
 """
             )
 
+        prober = self._prober()
         try:
-            objects = self.compile([fname], include_dirs=include_dirs)
+            objects = prober.compile([fname], include_dirs=include_dirs)
         except CompileError:
             return False
         finally:
             os.remove(fname)
 
         try:
-            self.link_executable(
+            prober.link_executable(
                 objects, "a.out", libraries=libraries, library_dirs=library_dirs
             )
         except (LinkError, TypeError):
@@ -973,6 +1738,200 @@ int main (int argc, char **argv) {{
                 os.remove(fn)
         return True
 
+    def has_functions(
+        self,
+        funcnames: Iterable[str],
+        libraries: list[str] | None = None,
+        library_dirs: list[str] | tuple[str, ...] | None = None,
+    ) -> dict[str, bool]:
+        """Return whether each of 'funcnames' is provided as a symbol on
+        the current platform, as 'has_function()' does, but in fewer steps.
+
+        All the functions are tried in one test program; see '_probe()'.
+        Outcomes are keyed on the compiler, its configuration, 'libraries'
+        and 'library_dirs'.
+        """
+        libraries = list(libraries or [])
+        library_dirs = list(library_dirs or [])
+        identity = self._probe_identity()
+        keys = {
+            name: cache.digest(
+                'function', name, identity, repr(libraries), repr(library_dirs)
+            )
+            for name in funcnames
+        }
+        prober = self._prober()
+        return self._probe(
+            keys, lambda names: prober._try_functions(names, libraries, library_dirs)
+        )
+
+    def supports_flags(self, flags: Iterable[str], lang: str = 'c') -> list[str]:
+        """Return those of the compiler options 'flags' that the compiler
+        accepts for compiling sources in 'lang' ("c", "c++" or "objc").
+
+        The flags are tried together, compiling a minimal source with
+        warnings made errors (see '_try_flags()'), and split up only if
+        that fails; see '_probe()'.  Outcomes are keyed on the compiler
+        (including its version) and its configuration.  Only compiling is
+        tried, so this is meant for compiler, not linker, options.
+        """
+        identity = self._probe_identity()
+        keys = {flag: cache.digest('flag', flag, lang, identity) for flag in flags}
+        prober = self._prober()
+        supported = self._probe(keys, lambda flags: prober._try_flags(flags, lang))
+        return [flag for flag in keys if supported[flag]]
+
+    def _probe(
+        self, keys: dict[str, str], attempt: Callable[[list[str]], bool]
+    ) -> dict[str, bool]:
+        """Find out which of the names in 'keys' pass 'attempt'.
+
+        'attempt' is first given all names at once; should it fail, they're
+        split in halves and tried again, until the failing ones are found.
+        With a 'probe_cache', outcomes are looked up there first, by the
+        key each name maps to, and recorded there afterwards.
+        """
+        results = {}
+        if self.probe_cache is not None:
+            for name, key in keys.items():
+                found = self.probe_cache.get(key)
+                if isinstance(found, bool):
+                    results[name] = found
+
+        def probe(names):
+            if attempt(names):
+                return dict.fromkeys(names, True)
+            if len(names) == 1:
+                return {names[0]: False}
+            middle = len(names) // 2
+            return {**probe(names[:middle]), **probe(names[middle:])}
+
+        missing = [name for name in keys if name not in results]
+        if missing:
+            probed = probe(missing)
+            results.update(probed)
+            if self.probe_cache is not None:
+                self.probe_cache.update({
+                    keys[name]: found for name, found in probed.items()
+                })
+        return {name: results[name] for name in keys}
+
+    def _prober(self) -> Self:
+        """
+        Return a copy of this compiler to build probes with, so their
+        throwaway objects and programs stay out of 'build_state' and
+        'object_cache'.
+        """
+        prober = copy.copy(self)
+        prober.build_state = prober.object_cache = None
+        return prober
+
+    def _try_functions(self, funcnames, libraries, library_dirs) -> bool:
+        """Build a test program calling each of 'funcnames'."""
+        import tempfile
+
+        # Use "char func(void);" as the prototype to follow what
+        # autoconf does; see 'has_function()'.
+        prototypes = ''.join(f"char {name}(void);\n" for name in funcnames)
+        calls = ''.join(f"    {name}();\n" for name in funcnames)
+        tmp_dir = tempfile.mkdtemp(prefix='has_functions-')
+        try:
+            fname = os.path.join(tmp_dir, 'probe.c')
+            with open(fname, 'w', encoding='utf-8') as f:
+                f.write(
+                    f"""\
+#ifdef __cplusplus
+extern "C" {{
+#endif
+{prototypes}#ifdef __cplusplus
+}}
+#endif
+int main (int argc, char **argv) {{
+{calls}    return 0;
+}}
+"""
+                )
+            # the compiler's complaints about what's missing aren't news
+            with _buffered_output() as results:
+                try:
+                    objects = self.compile([fname], output_dir=tmp_dir)
+                    self.link_executable(
+                        objects,
+                        "a.out",
+                        output_dir=tmp_dir,
+                        libraries=libraries,
+                        library_dirs=library_dirs,
+                    )
+                except (CompileError, LinkError, TypeError):
+                    return False
+                finally:
+                    results.clear()
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return True
+
+    _probe_extensions: ClassVar[dict[str, str]] = {
+        'c': '.c',
+        'c++': '.cpp',
+        'objc': '.m',
+    }
+
+    _flag_probe_args: ClassVar[list[str]] = []
+    """
+    Options that make the compiler fail on the flags it doesn't support,
+    where it would otherwise only warn about them.
+    """
+
+    def _try_flags(self, flags, lang) -> bool:
+        """Compile a minimal 'lang' source with 'flags'."""
+        import tempfile
+
+        tmp_dir = tempfile.mkdtemp(prefix='supports_flags-')
+        try:
+            fname = os.path.join(tmp_dir, 'probe' + self._probe_extensions[lang])
+            with open(fname, 'w', encoding='utf-8') as f:
+                f.write("int main (void) { return 0; }\n")
+            with _buffered_output() as results:
+                try:
+                    self.compile(
+                        [fname],
+                        output_dir=tmp_dir,
+                        extra_postargs=[*flags, *self._flag_probe_args],
+                    )
+                except CompileError:
+                    return False
+                finally:
+                    results.clear()
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return True
+
+    def _probe_identity(self) -> str:
+        """
+        Describe the configuration the outcome of a probe depends on:
+        the executables (and their binaries) and the compile and link
+        settings.
+        """
+        executables = {
+            name: getattr(self, name, None) for name in sorted(self.executables)
+        }
+        binaries = sorted({
+            cache.compiler_identity(cmd[0])
+            for cmd in executables.values()
+            if isinstance(cmd, list) and cmd
+        })
+        return repr((
+            self.compiler_type,
+            executables,
+            binaries,
+            self.macros,
+            self.include_dirs,
+            self.libraries,
+            self.library_dirs,
+            self.runtime_library_dirs,
+            self.objects,
+        ))
+
     def find_library_file(
         self, dirs: Iterable[str], lib: str, debug: bool = False
     ) -> str | None:
@@ -1166,11 +2125,85 @@ int main (int argc, char **argv) {{
         cmd: MutableSequence[bytes | str | os.PathLike[str]],
         *,
         env: _ENV | None = None,
+        launch: bool = False,
+        kind: str = 'command',
+        target: str | None = None,
+        **kwargs,
+    ) -> None:
+        """Run 'cmd' in a subprocess, letting subprocess exceptions propagate.
+
+        If 'launch' is true, 'cmd' runs through the 'launcher', if any.
+        'kind' ("compile", "preprocess", "link", "archive" or "command") and
+        'target' (the file the command produces) describe the command to
+        the hooks of 'compilers.C.usage', if any, which are told what it
+        used.
+        """
+        if launch and self.launcher:
+            cmd = [*self.launcher, *cmd]
+        log.info(subprocess.list2cmdline(cmd))
+        results = getattr(_captured, 'results', None)
+        if usage.active():
+            result = usage.run(
+                cmd,
+                kind=kind,
+                target=target,
+                capture_output=results is not None,
+                env=macos.inject_ver(env),
+                **kwargs,
+            )
+            if results is not None:
+                results.append(result)
+            result.check_returncode()
+            return
+        if results is None:
+            subprocess.check_call(cmd, env=macos.inject_ver(env), **kwargs)
+            return
+        result = subprocess.run(
+            cmd, env=macos.inject_ver(env), capture_output=True, check=False, **kwargs
+        )
+        results.append(result)
+        result.check_returncode()
+
+    async def acall(
+        self,
+        cmd: MutableSequence[bytes | str | os.PathLike[str]],
+        *,
+        env: _ENV | None = None,
+        launch: bool = False,
+        kind: str = 'command',
+        target: str | None = None,
         **kwargs,
     ) -> None:
-        """Run 'cmd' in a subprocess, letting subprocess exceptions propagate."""
+        """Run 'cmd' as 'call()' does, as a subprocess of the running event
+        loop.  Its output is collected and shown when it exits, so that of
+        concurrent commands isn't interleaved.
+        """
+        if launch and self.launcher:
+            cmd = [*self.launcher, *cmd]
         log.info(subprocess.list2cmdline(cmd))
-        subprocess.check_call(cmd, env=macos.inject_ver(env), **kwargs)
+        if usage.active():
+            result = await usage.arun(
+                cmd,
+                kind=kind,
+                target=target,
+                capture_output=True,
+                env=macos.inject_ver(env),
+                **kwargs,
+            )
+            _replay([result])
+            result.check_returncode()
+            return
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            env=macos.inject_ver(env),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            **kwargs,
+        )
+        stdout, stderr = await process.communicate()
+        result = subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+        _replay([result])
+        result.check_returncode()
 
     def spawn(
         self,
@@ -1279,11 +2312,53 @@ def get_compilers() -> dict[str, type[Compiler]]:
     }
 
 
+# Configured compilers, by class and configuration key, that
+# 'new_compiler(configure=True)' hands out copies of.
+_configured: dict[tuple[type[Compiler], str], Compiler] = {}
+_configured_lock = threading.Lock()
+
+
+def _binary_stamps(state: dict) -> dict[str, list]:
+    """Resolve the programs named by the command lines in 'state' and note
+    their modification times.
+    """
+    stamps = {}
+    for value in state.values():
+        if not (isinstance(value, list) and value and isinstance(value[0], str)):
+            continue
+        path = shutil.which(value[0]) or value[0]
+        try:
+            stamps[value[0]] = [path, os.stat(path).st_mtime_ns]
+        except OSError:
+            stamps[value[0]] = [path, None]
+    return stamps
+
+
+def _read_snapshot(path: str, key: str) -> dict | None:
+    """Return the state recorded in the snapshot 'path' if it was taken for
+    'key' and the programs it names are the same, else None.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            snapshot = json.load(f)
+        if snapshot['key'] != key:
+            return None
+        state = snapshot['state']
+        if _binary_stamps(state) != snapshot['binaries']:
+            return None
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+    return state
+
+
 def new_compiler(
     plat: str | None = None,
     compiler: str | None = None,
     verbose: bool = False,
     force: bool = False,
+    *,
+    configure: bool | Callable[[Compiler], None] = False,
+    snapshot_dir: str | None = None,
 ) -> Compiler:
     """Generate an instance of some Compiler subclass for the supplied
     platform/compiler combination.  'plat' defaults to 'os.name'
@@ -1294,6 +2369,19 @@ def new_compiler(
     possible to ask for a Unix compiler object under Windows, and a
     Microsoft compiler object under Unix -- if you supply a value for
     'compiler', 'plat' is ignored.
+
+    If 'configure' is true, the compiler comes configured from the system
+    (see 'Compiler.configure_system()').  Configuring is done once per
+    process for a given interpreter, build configuration, and environment,
+    and each caller gets its own copy of the result; if 'snapshot_dir' is
+    given, the result is also recorded there and restored by later runs,
+    as long as the compiler binaries are unchanged.
+
+    Each copy is then handed to 'configure', if it's a function, or else
+    to 'sysconfig.customize_compiler()', so a replacement for that (or a
+    wrapper, as the commands may be given) still applies to every
+    compiler.  'configure_system()' has nothing left to do for a copy
+    configured for the current system.
     """
     if plat is None:
         plat = os.name
@@ -1311,7 +2399,24 @@ def new_compiler(
     # XXX The None is necessary to preserve backwards compatibility
     # with classes that expect verbose to be the first positional
     # argument.
-    return cls(None, force=force)
+    if not configure:
+        return cls(None, force=force)
+
+    with _configured_lock:
+        key = (cls, cls._config_key())
+        prototype = _configured.get(key)
+        if prototype is None:
+            prototype = cls(None)
+            prototype._configure(snapshot_dir)
+            _configured[key] = prototype
+    configured = copy.deepcopy(prototype)
+    configured.force = force
+    if not callable(configure):
+        from ... import sysconfig as dist_sysconfig
+
+        configure = dist_sysconfig.customize_compiler
+    configure(configured)
+    return configured
 
 
 def gen_preprocess_options(
@@ -0,0 +1,442 @@
+"""A content-addressed cache of compiled objects.
+
+Compilers consult the cache set as ``Compiler.object_cache`` before
+compiling a source: the key hashes the preprocessed source, the compiler
+command line, the compiler binary, and the Python ABI, so an identical
+translation unit is compiled once and then restored from the cache, e.g.
+after a ``git clean`` or in another checkout of the same commit. A cache
+may be backed by a shared remote (see 'HTTPBackend' and the reference
+server in ``compilers.C.cache_server``) to reuse objects across machines.
+'ProbeCache' similarly remembers the outcomes of configuration probes.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import contextlib
+import functools
+import hashlib
+import http.client
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import sysconfig
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+import zipfile
+from collections.abc import Callable, Iterable, Sequence
+
+from ..logging import get_logger
+
+log = get_logger(__name__)
+
+
+def digest(*parts: bytes | str) -> str:
+    """
+    Hash 'parts' into a key, keeping their boundaries distinct.
+
+    >>> digest('a', 'bc') == digest('ab', 'c')
+    False
+    """
+    hash = hashlib.sha256()
+    for part in parts:
+        data = (
+            part.encode('utf-8', 'surrogateescape') if isinstance(part, str) else part
+        )
+        hash.update(len(data).to_bytes(8, 'little'))
+        hash.update(data)
+    return hash.hexdigest()
+
+
+def file_digest(path: str | os.PathLike[str]) -> str:
+    """Return the SHA-256 hex digest of the contents of 'path'."""
+    hash = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(2**16), b''):
+            hash.update(chunk)
+    return hash.hexdigest()
+
+
+@functools.lru_cache
+def _version(path: str, mtime: int) -> str:
+    try:
+        result = subprocess.run(
+            [path, '--version'], capture_output=True, check=False, timeout=60
+        )
+    except (OSError, subprocess.SubprocessError):
+        return ''
+    return result.stdout.decode(errors='replace')
+
+
+def compiler_identity(executable: str) -> str:
+    """
+    Identify the compiler binary 'executable' by its resolved path, its
+    modification time, and what it reports for ``--version``.
+    """
+    path = shutil.which(executable) or executable
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return path
+    return f'{path}\n{mtime}\n{_version(path, mtime)}'
+
+
+def python_abi() -> str:
+    """Identify the ABI of the running interpreter that objects target."""
+    return '\n'.join(
+        map(
+            str,
+            (
+                sys.implementation.cache_tag,
+                sysconfig.get_config_var('EXT_SUFFIX'),
+                sysconfig.get_config_var('SOABI'),
+                sys.version,
+            ),
+        )
+    )
+
+
+class ObjectCache:
+    """A directory of compiled objects, keyed by the content they were built from.
+
+    Each entry holds the files a compile produced (the object, plus any
+    side files such as a dependency file) and the diagnostics the compiler
+    printed, which are replayed when the entry is restored. Once the entries
+    exceed 'max_size' bytes, the least recently used are evicted, down to
+    'low_water' of it, so that a full cache isn't pruned on every store.
+
+    If 'hardlink' is true, entries are restored by hard link where the
+    filesystem allows (copied otherwise). Objects restored that way share
+    their data with the cache, so they must be replaced rather than
+    rewritten in place; the compilers remove a stale object before
+    recompiling it.
+
+    If 'remote' is given (see 'HTTPBackend'), entries missing locally are
+    fetched from it, and new entries are uploaded to it in the background,
+    so machines sharing the remote reuse each other's objects.
+    """
+
+    low_water = 0.9
+
+    def __init__(
+        self,
+        directory: str | os.PathLike[str],
+        max_size: int = 5 * 2**30,
+        hardlink: bool = False,
+        remote: HTTPBackend | None = None,
+    ) -> None:
+        self.directory = os.fspath(directory)
+        self.max_size = max_size
+        self.hardlink = hardlink
+        self.remote = remote
+        self.hits = 0
+        self.misses = 0
+        self.remote_hits = 0
+        self._size: int | None = None
+        self._lock = threading.Lock()
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def restore(self, key: str, paths: Sequence[str]) -> bytes | None:
+        """
+        Restore the files cached under 'key' to 'paths' and return the
+        diagnostics recorded with them, or return None on a miss.
+        """
+        output = self._restore(key, paths)
+        remote_hit = False
+        if output is None and self.remote is not None:
+            data = self.remote.get(key)
+            if data is not None and self._unpack(key, data):
+                output = self._restore(key, paths)
+                remote_hit = output is not None
+        with self._lock:
+            self.hits += output is not None
+            self.misses += output is None
+            self.remote_hits += remote_hit
+        if output is not None:
+            log.debug("restored %s from object cache", paths[0])
+        return output
+
+    def _restore(self, key: str, paths: Sequence[str]) -> bytes | None:
+        entry = self._entry(key)
+        try:
+            for index, path in enumerate(paths):
+                stored = os.path.join(entry, str(index))
+                if os.path.exists(stored):
+                    self._place(stored, path)
+            with open(os.path.join(entry, 'output'), 'rb') as f:
+                output = f.read()
+            os.utime(entry)
+        except OSError:
+            return None
+        return output
+
+    def _place(self, stored: str, path: str) -> None:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+        if self.hardlink:
+            with contextlib.suppress(OSError):
+                os.link(stored, path)
+        if not os.path.exists(path):
+            shutil.copyfile(stored, path)
+        # a hard link keeps the time the entry was stored; make the file as
+        # new as a compiled one, or what it's linked into looks up to date
+        os.utime(path)
+
+    def store(self, key: str, paths: Sequence[str], output: bytes) -> None:
+        """Record the files at 'paths' and the compiler 'output' under 'key'."""
+
+        def fill(staging):
+            for index, path in enumerate(paths):
+                if os.path.exists(path):
+                    shutil.copyfile(path, os.path.join(staging, str(index)))
+            with open(os.path.join(staging, 'output'), 'wb') as f:
+                f.write(output)
+
+        if self._add(key, fill) and self.remote is not None:
+            self.remote.put_async(key, self._pack(key))
+
+    def _add(self, key: str, fill: Callable[[str], object]) -> bool:
+        """
+        Create the entry for 'key' by calling 'fill' on a staging directory
+        that then atomically becomes the entry. Return whether it was added.
+        """
+        entry = self._entry(key)
+        if os.path.exists(entry):
+            return False
+        try:
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            staging = tempfile.mkdtemp(prefix='.tmp-', dir=os.path.dirname(entry))
+        except OSError:
+            return False
+        try:
+            fill(staging)
+            size = _tree_size(staging)
+            os.rename(staging, entry)
+        except (OSError, ValueError, zipfile.BadZipFile):
+            # another process stored the same entry first, the cache is
+            # unwritable, or the data was corrupt; either way the build
+            # goes on without it
+            shutil.rmtree(staging, ignore_errors=True)
+            return False
+        with self._lock:
+            if self._size is not None:
+                self._size += size
+            over = self.size > self.max_size
+        if over:
+            self.prune(int(self.max_size * self.low_water))
+        return True
+
+    def _pack(self, key: str) -> bytes:
+        """Serialize the entry for 'key' for transfer."""
+        buffer = io.BytesIO()
+        entry = self._entry(key)
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            for name in sorted(os.listdir(entry)):
+                archive.write(os.path.join(entry, name), name)
+        return buffer.getvalue()
+
+    def _unpack(self, key: str, data: bytes) -> bool:
+        """Add the entry for 'key' from the output of '_pack()'."""
+
+        def fill(staging):
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                for name in archive.namelist():
+                    if name != 'output' and not name.isdigit():
+                        raise ValueError(f"unexpected member {name!r}")
+                    with open(os.path.join(staging, name), 'wb') as f:
+                        f.write(archive.read(name))
+
+        return self._add(key, fill)
+
+    @property
+    def size(self) -> int:
+        """The total size in bytes of all entries."""
+        if self._size is None:
+            self._size = sum(size for _, _, size in self._entries())
+        return self._size
+
+    def _entries(self) -> Iterable[tuple[str, float, int]]:
+        """Yield the path, last use, and size of each entry."""
+        try:
+            shards = os.scandir(self.directory)
+        except OSError:
+            return
+        with shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if entry.name.startswith('.tmp-'):
+                        continue
+                    yield entry.path, entry.stat().st_mtime, _tree_size(entry.path)
+
+    def prune(self, max_size: int | None = None) -> int:
+        """
+        Evict the least recently used entries until the cache fits in
+        'max_size' bytes (by default, its own 'max_size'). Return the
+        number of entries removed; ``prune(0)`` empties the cache.
+        """
+        limit = self.max_size if max_size is None else max_size
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        removed = 0
+        for path, _, size in entries:
+            if total <= limit:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        with self._lock:
+            self._size = total
+        return removed
+
+    def stats(self) -> dict[str, int]:
+        """Report the hits (local or remote) and misses so far and the size."""
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            remote_hits=self.remote_hits,
+            size=self.size,
+        )
+
+    def close(self) -> None:
+        """Wait for any uploads to the remote to finish."""
+        if self.remote is not None:
+            self.remote.close()
+
+
+class ProbeCache:
+    """A file of the outcomes of configuration probes.
+
+    Probes such as 'Compiler.has_functions()' compile and link test
+    programs; their outcomes are recorded here under keys that hash
+    everything the probe depends on (see 'digest()'), so later builds
+    answer them without running the compiler.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self.path = os.fspath(path)
+        self._results: dict[str, object] | None = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict[str, object]:
+        if self._results is None:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    results = json.load(f)
+            except (OSError, ValueError):
+                results = {}
+            self._results = results if isinstance(results, dict) else {}
+        return self._results
+
+    def get(self, key: str) -> object:
+        """Return the outcome recorded for 'key', or None."""
+        with self._lock:
+            return self._load().get(key)
+
+    def update(self, results: dict[str, object]) -> None:
+        """Record the outcomes in 'results', by key."""
+        with self._lock:
+            self._load().update(results)
+            # if it can't be written, the outcomes are just not remembered
+            dump_json(self.path, self._results)
+
+
+def dump_json(path: str, data: object) -> bool:
+    """
+    Write 'data' as JSON to 'path', replacing it atomically, so concurrent
+    readers see either the old or the new contents. Return whether it was
+    written.
+    """
+    try:
+        os.makedirs(os.path.dirname(path) or os.curdir, exist_ok=True)
+        fd, staging = tempfile.mkstemp(
+            prefix='.tmp-', dir=os.path.dirname(path) or None
+        )
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(staging, path)
+    except OSError:
+        return False
+    return True
+
+
+class HTTPBackend:
+    """A remote object cache, spoken to with plain HTTP.
+
+    Entries are fetched with ``GET <url>/<key>`` (404 for a miss) and
+    uploaded with ``PUT <url>/<key>``; ``compilers.C.cache_server`` is a
+    reference server. Uploads happen on a background thread. The first
+    time the server can't be reached, the backend logs a warning and stops
+    using it, so an unavailable cache never fails or stalls the build.
+    """
+
+    def __init__(self, url: str, timeout: float = 10) -> None:
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.available = True
+        self._uploads: concurrent.futures.ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _request(self, key: str, method: str = 'GET', data: bytes | None = None):
+        request = urllib.request.Request(f'{self.url}/{key}', data, method=method)
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def _disable(self, exc: Exception) -> None:
+        if self.available:
+            log.warning("remote object cache %s unavailable: %s", self.url, exc)
+        self.available = False
+
+    def get(self, key: str) -> bytes | None:
+        """Return the data stored under 'key', or None if there's none."""
+        if not self.available:
+            return None
+        try:
+            with self._request(key) as response:
+                return response.read()
+        except urllib.error.HTTPError as exc:
+            if exc.code != 404:
+                self._disable(exc)
+        except (OSError, http.client.HTTPException) as exc:
+            self._disable(exc)
+        return None
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store 'data' under 'key'."""
+        if not self.available:
+            return
+        try:
+            self._request(key, 'PUT', data).close()
+        except (OSError, http.client.HTTPException) as exc:
+            self._disable(exc)
+
+    def put_async(self, key: str, data: bytes) -> None:
+        """Store 'data' under 'key' in the background."""
+        with self._lock:
+            if self._uploads is None:
+                self._uploads = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=2, thread_name_prefix='object-cache-upload'
+                )
+            self._uploads.submit(self.put, key, data)
+
+    def close(self) -> None:
+        """Wait for pending uploads."""
+        with self._lock:
+            uploads, self._uploads = self._uploads, None
+        if uploads is not None:
+            uploads.shutdown(wait=True)
+
+
+def _tree_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
@@ -0,0 +1,109 @@
+"""A reference server for a shared remote object cache.
+
+Serves the protocol 'cache.HTTPBackend' speaks: ``GET /<key>`` returns the
+data stored under the key (404 if none) and ``PUT /<key>`` stores it. Data
+is kept as one file per key in a directory. Run it with::
+
+    python -m distutils.compilers.C.cache_server DIRECTORY [--port PORT]
+
+It's meant for trusted networks (and for tests on localhost): there's no
+authentication, so anyone who can reach it can add objects to the cache.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.server
+import os
+import re
+import tempfile
+import threading
+
+_key_re = re.compile(r'/([0-9a-f]{64})')
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    server: Server
+
+    def _path(self) -> str | None:
+        match = _key_re.fullmatch(self.path)
+        if match is None:
+            return None
+        return os.path.join(self.server.directory, match.group(1))
+
+    def do_GET(self) -> None:
+        path = self._path()
+        try:
+            if path is None:
+                raise FileNotFoundError
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_PUT(self) -> None:
+        path = self._path()
+        length = int(self.headers.get('Content-Length', 0))
+        if path is None or length > self.server.max_entry_size:
+            self.send_error(400)
+            return
+        data = self.rfile.read(length)
+        fd, staging = tempfile.mkstemp(dir=self.server.directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(staging, path)
+        self.send_response(201)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class Server(http.server.ThreadingHTTPServer):
+    """Serve the entries stored in 'directory' at 'address'."""
+
+    def __init__(
+        self,
+        directory: str | os.PathLike[str],
+        address: tuple[str, int] = ('127.0.0.1', 0),
+        max_entry_size: int = 2**30,
+        verbose: bool = False,
+    ) -> None:
+        self.directory = os.fspath(directory)
+        self.max_entry_size = max_entry_size
+        self.verbose = verbose
+        os.makedirs(self.directory, exist_ok=True)
+        super().__init__(address, _Handler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> threading.Thread:
+        """Serve on a daemon thread; stop with 'shutdown()'."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('directory', help="where to store cached objects")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args(argv)
+    with Server(args.directory, (args.host, args.port), verbose=True) as server:
+        print(f"serving object cache {args.directory} at {server.url}")
+        server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -108,7 +108,7 @@ class Compiler(unix.Compiler):
         if ext in ('.rc', '.res'):
             # gcc needs '.res' and '.rc' compiled to object files !!!
             try:
-                self.call(["windres", "-i", src, "-o", obj])
+                self.call(["windres", "-i", src, "-o", obj], kind='compile', target=obj)
             except (subprocess.CalledProcessError, OSError) as msg:
                 raise CompileError(msg)
         else:  # for other files use the C-compiler
@@ -118,11 +118,17 @@ class Compiler(unix.Compiler):
                         self.compiler_so_cxx
                         + cc_args
                         + [src, '-o', obj]
-                        + extra_postargs
+                        + extra_postargs,
+                        launch=True,
+                        kind='compile',
+                        target=obj,
                     )
                 else:
                     self.call(
-                        self.compiler_so + cc_args + [src, '-o', obj] + extra_postargs
+                        self.compiler_so + cc_args + [src, '-o', obj] + extra_postargs,
+                        launch=True,
+                        kind='compile',
+                        target=obj,
                     )
             except (subprocess.CalledProcessError, OSError) as msg:
                 raise CompileError(msg)
@@ -0,0 +1,253 @@
+"""Farm compiles out to worker processes, on this or other machines.
+
+A coordinator (a compiler with 'Compiler.compile_workers' set) preprocesses
+each source locally, so workers need neither the sources nor the headers,
+and sends the preprocessed translation unit and the rest of the command
+line to a worker, which compiles it and sends back the object. Should no
+worker be reachable, or a compile fail on the worker, the source is
+compiled locally instead. Run a worker with::
+
+    python -m distutils.compilers.C.distributed [--host HOST] [--port PORT]
+
+The protocol is a single exchange per connection. Each message is a 4-byte
+big-endian length, that many bytes of a JSON header, and then the blobs
+whose lengths the header lists under ``"blobs"``. The request's header
+holds the command line (``"argv"``) and the language of the source
+(``"lang"``, a value for ``-x``), and its one blob is the source; the
+reply's header holds the ``"returncode"``, and its blobs are the standard
+output, standard error, and the object.
+
+Like distcc, a worker runs the command lines it's sent (only for compilers
+it recognizes, see 'Worker'), so it's meant for trusted networks: anyone
+who can reach it can run those compilers there with options of their
+choosing.
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import itertools
+import json
+import os
+import re
+import shutil
+import socket
+import socketserver
+import subprocess
+import tempfile
+import threading
+from collections.abc import Iterable
+from typing import BinaryIO
+
+from ..logging import get_logger
+
+log = get_logger(__name__)
+
+languages = {
+    'c': 'cpp-output',
+    'c++': 'c++-cpp-output',
+    'objc': 'objective-c-cpp-output',
+}
+"""The ``-x`` language of each preprocessed source language."""
+
+_suffixes = {
+    'cpp-output': '.i',
+    'c++-cpp-output': '.ii',
+    'objective-c-cpp-output': '.mi',
+}
+
+_compiler_re = re.compile(
+    r'([\w.+]+-)*(cc|c\+\+|gcc|g\+\+|clang|clang\+\+)(-[0-9.]+)?', re.ASCII
+)
+
+
+def send(stream: BinaryIO, header: dict, *blobs: bytes) -> None:
+    """Write a message of 'header' and 'blobs' to 'stream'."""
+    data = json.dumps({**header, 'blobs': [len(blob) for blob in blobs]}).encode()
+    stream.write(len(data).to_bytes(4, 'big'))
+    stream.write(data)
+    stream.writelines(blobs)
+    stream.flush()
+
+
+def receive(stream: BinaryIO) -> tuple[dict, list[bytes]]:
+    """Read a message from 'stream', and return its header and blobs."""
+    header = json.loads(_read_exactly(stream, int.from_bytes(_read_exactly(stream, 4))))
+    return header, [_read_exactly(stream, size) for size in header['blobs']]
+
+
+def _read_exactly(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("connection closed mid-message")
+    return data
+
+
+@dataclasses.dataclass(frozen=True)
+class Compiled:
+    """What a worker sent back for a compile."""
+
+    result: subprocess.CompletedProcess
+    """the compiler's exit status and output"""
+
+    object: bytes
+    """the object, if the compile succeeded"""
+
+
+class Workers:
+    """The compile workers at 'addresses' (``"host:port"`` strings).
+
+    Compiles are spread over the workers in turn. A worker that can't be
+    reached within 'connect_timeout' seconds, or doesn't follow the
+    protocol, isn't tried again; one that's reached gets 'timeout' seconds
+    to compile.
+    """
+
+    def __init__(
+        self,
+        addresses: Iterable[str],
+        timeout: float = 600,
+        connect_timeout: float = 5,
+    ) -> None:
+        self.addresses = [_parse_address(address) for address in addresses]
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._next = itertools.count()
+        self._down: set[tuple[str, int]] = set()
+        self._lock = threading.Lock()
+
+    def _candidates(self) -> list[tuple[str, int]]:
+        with self._lock:
+            start = next(self._next)
+            up = [address for address in self.addresses if address not in self._down]
+        if not up:
+            return []
+        start %= len(up)
+        return up[start:] + up[:start]
+
+    def _disable(self, address: tuple[str, int], exc: Exception) -> None:
+        with self._lock:
+            self._down.add(address)
+        log.warning("compile worker %s:%d unavailable: %s", *address, exc)
+
+    def compile(self, argv: list[str], lang: str, source: bytes) -> Compiled | None:
+        """
+        Have a worker compile the preprocessed 'source' of language 'lang'
+        (a key of 'languages') with 'argv', the command line lacking the
+        source and output, and return what it sent back, or None if no
+        worker could be reached.
+        """
+        for address in self._candidates():
+            try:
+                with socket.create_connection(address, self.connect_timeout) as sock:
+                    sock.settimeout(self.timeout)
+                    with sock.makefile('wb') as stream:
+                        send(stream, {'argv': argv, 'lang': languages[lang]}, source)
+                    with sock.makefile('rb') as stream:
+                        header, (stdout, stderr, obj) = receive(stream)
+                returncode = int(header['returncode'])
+            except (OSError, ValueError, KeyError, TypeError) as exc:
+                self._disable(address, exc)
+                continue
+            result = subprocess.CompletedProcess(argv, returncode, stdout, stderr)
+            return Compiled(result, obj)
+        return None
+
+
+def _parse_address(address: str) -> tuple[str, int]:
+    """
+    >>> _parse_address('build7:3632')
+    ('build7', 3632)
+    """
+    host, _, port = address.rpartition(':')
+    return host, int(port)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: Worker
+
+    def handle(self) -> None:
+        try:
+            header, (source,) = receive(self.rfile)
+            argv, lang = list(map(str, header['argv'])), str(header['lang'])
+        except (ValueError, KeyError, TypeError):
+            return
+        executable = self.server.resolve(argv)
+        if executable is None or lang not in _suffixes:
+            message = f"refusing to run {argv[:1]} for {lang!r}\n".encode()
+            send(self.wfile, {'returncode': -1}, b'', message, b'')
+            return
+        with tempfile.TemporaryDirectory(prefix='compile-worker-') as tmp:
+            src = os.path.join(tmp, 'source' + _suffixes[lang])
+            obj = os.path.join(tmp, 'source.o')
+            with open(src, 'wb') as f:
+                f.write(source)
+            try:
+                result = subprocess.run(
+                    [executable, *argv[1:], '-x', lang, src, '-o', obj],
+                    cwd=tmp,
+                    capture_output=True,
+                    check=False,
+                )
+            except OSError as exc:
+                result = subprocess.CompletedProcess(argv, -1, b'', f"{exc}\n".encode())
+            data = b''
+            if result.returncode == 0:
+                with open(obj, 'rb') as f:
+                    data = f.read()
+        send(
+            self.wfile,
+            {'returncode': result.returncode},
+            result.stdout,
+            result.stderr,
+            data,
+        )
+
+
+class Worker(socketserver.ThreadingTCPServer):
+    """Compile what coordinators send to 'address'.
+
+    Only command lines running one of the usual C and C++ compiler drivers
+    (``cc``, ``gcc``, ``clang++``, ``x86_64-linux-gnu-gcc-12``, ...), named
+    without a directory and found on the worker's PATH, are run.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: tuple[str, int] = ('127.0.0.1', 0)) -> None:
+        super().__init__(address, _Handler)
+
+    def resolve(self, argv: list[str]) -> str | None:
+        """Return the compiler driver on PATH that 'argv' runs, or None if
+        it doesn't run one.
+        """
+        if not argv or _compiler_re.fullmatch(argv[0]) is None:
+            return None
+        return shutil.which(argv[0])
+
+    @property
+    def address(self) -> str:
+        host, port = self.server_address[:2]
+        return f'{host}:{port}'
+
+    def start(self) -> threading.Thread:
+        """Serve on a daemon thread; stop with 'shutdown()'."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3632)
+    args = parser.parse_args(argv)
+    with Worker((args.host, args.port)) as worker:
+        print(f"compile worker serving at {worker.address}")
+        worker.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
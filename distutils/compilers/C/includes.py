@@ -0,0 +1,150 @@
+"""Find the headers C and C++ sources include, without a preprocessor.
+
+The scan reads the ``#include`` directives of each file and resolves them
+the way the compiler would: ``"..."`` against the including file's
+directory, then the include directories, and ``<...>`` against the include
+directories only.  Headers that can't be found there (system headers) are
+left out.  Conditional compilation is ignored, so the result may name
+headers a particular build doesn't use, but won't miss one it does (short
+of computed ``#include MACRO`` directives).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from collections.abc import Iterable
+
+_include_re = re.compile(
+    rb'^[ \t]*#[ \t]*include[ \t]*([<"])([^>"\r\n]+)[>"]', re.MULTILINE
+)
+
+
+def directives(data: bytes) -> list[tuple[str, str]]:
+    """
+    Return the delimiter and name of each ``#include`` in 'data'.
+
+    >>> directives(b'#include <Python.h>\\n  # include "foo/bar.h" // x\\n')
+    [('<', 'Python.h'), ('"', 'foo/bar.h')]
+    """
+    return [
+        (delim.decode(), name.decode('utf-8', 'surrogateescape'))
+        for delim, name in _include_re.findall(data)
+    ]
+
+
+class Scanner:
+    """Compute the transitive headers of sources.
+
+    The directives found in each file are remembered, keyed by the file's
+    modification time and size, and if 'cache_file' is given, kept there
+    across runs (see 'save()'), so only files changed since are read again.
+    What one scanner read can be handed to another with 'take()' and
+    'merge()', e.g. from a worker process to the one saving the file.
+    """
+
+    def __init__(self, cache_file: str | os.PathLike[str] | None = None) -> None:
+        self.cache_file = cache_file
+        self._memo: dict[str, tuple[int, int, list[tuple[str, str]]]] | None = None
+        self._dirty = False
+        self._fresh: dict[str, tuple[int, int, list[tuple[str, str]]]] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict[str, tuple[int, int, list[tuple[str, str]]]]:
+        if self._memo is None:
+            memo = {}
+            if self.cache_file is not None:
+                try:
+                    with open(self.cache_file, encoding='utf-8') as f:
+                        memo = {
+                            path: (mtime, size, [tuple(d) for d in found])
+                            for path, (mtime, size, found) in json.load(f).items()
+                        }
+                except (OSError, ValueError, TypeError):
+                    pass
+            self._memo = memo
+        return self._memo
+
+    def _directives(self, path: str) -> list[tuple[str, str]]:
+        st = os.stat(path)
+        # compile threads scan concurrently
+        with self._lock:
+            entry = self._load().get(path)
+        if entry is not None and entry[:2] == (st.st_mtime_ns, st.st_size):
+            return entry[2]
+        with open(path, 'rb') as f:
+            found = directives(f.read())
+        with self._lock:
+            self._load()[path] = self._fresh[path] = (
+                st.st_mtime_ns,
+                st.st_size,
+                found,
+            )
+            self._dirty = True
+        return found
+
+    def take(self) -> dict[str, tuple[int, int, list[tuple[str, str]]]]:
+        """Return what was read from files since the last 'take()'."""
+        with self._lock:
+            fresh, self._fresh = self._fresh, {}
+        return fresh
+
+    def merge(self, read: dict[str, tuple[int, int, list[tuple[str, str]]]]) -> None:
+        """Remember what another scanner 'take()'s, to 'save()' it."""
+        if read:
+            with self._lock:
+                self._load().update(read)
+                self._dirty = True
+
+    def headers(
+        self, sources: Iterable[str], include_dirs: Iterable[str] = ()
+    ) -> list[str]:
+        """
+        Return the headers 'sources' include, directly or through other
+        headers, searching 'include_dirs', in the order first found.
+        """
+        include_dirs = list(include_dirs)
+        seen = set()
+        found = []
+        pending = list(sources)
+        while pending:
+            path = pending.pop()
+            try:
+                includes = self._directives(os.path.abspath(path))
+            except OSError:
+                continue
+            here = os.path.dirname(path)
+            for delim, name in includes:
+                dirs = [here, *include_dirs] if delim == '"' else include_dirs
+                header = _resolve(name, dirs)
+                if header is None or header in seen:
+                    continue
+                seen.add(header)
+                found.append(header)
+                pending.append(header)
+        return found
+
+    def save(self) -> None:
+        """Write what was learned to 'cache_file', if it changed."""
+        if self.cache_file is None or not self._dirty:
+            return
+        with self._lock:
+            try:
+                os.makedirs(
+                    os.path.dirname(self.cache_file) or os.curdir, exist_ok=True
+                )
+                with open(self.cache_file, 'w', encoding='utf-8') as f:
+                    json.dump(self._memo, f)
+            except OSError:
+                return
+            self._dirty = False
+
+
+def _resolve(name: str, dirs: Iterable[str]) -> str | None:
+    for dir in dirs:
+        path = os.path.normpath(os.path.join(dir, name))
+        if os.path.isfile(path):
+            return path
+    return None
@@ -0,0 +1,280 @@
+"""Compiler invocations described as data, and a way to run them.
+
+'Compiler.plan_compile()' and 'Compiler.plan_link()' return the commands
+'compile()' and 'link()' would run as 'Job' objects, without running them.
+Jobs are immutable and compare by value, so identical work planned in
+several places (e.g. a source shared by two extensions) can be recognized,
+and 'run()' hands them to any ``concurrent.futures`` executor: the
+'SerialExecutor' here, a ``ThreadPoolExecutor``, a ``ProcessPoolExecutor``,
+or one of the caller's own.  'arun()' runs them from an asyncio event loop
+instead.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import contextlib
+import dataclasses
+import os
+import subprocess
+from collections.abc import Callable, Iterable
+
+from ..logging import get_logger
+from . import usage
+from .errors import CompileError
+
+log = get_logger(__name__)
+
+
+@dataclasses.dataclass(frozen=True)
+class Job:
+    """One command to run, and the files it reads and writes."""
+
+    argv: tuple[str, ...]
+    """the command line, launcher included"""
+
+    inputs: tuple[str, ...] = ()
+    """the files the command is run on (e.g. sources or objects)"""
+
+    outputs: tuple[str, ...] = ()
+    """the files the command produces"""
+
+    depends: tuple[str, ...] = ()
+    """other files the outputs depend on (e.g. headers)"""
+
+    env: tuple[tuple[str, str], ...] | None = None
+    """the environment to run the command in, or None to inherit it"""
+
+    kind: str = 'compile'
+    """what the command does, as for 'Compiler.call()'"""
+
+    error: type[Exception] = CompileError
+    """the exception to raise should the command fail"""
+
+    build_temp: str | None = None
+    """for a link, where to record what it linked once it has run (see
+    'Compiler.commit_jobs()'), or None"""
+
+
+def execute(job: Job) -> subprocess.CompletedProcess:
+    """Run 'job', capturing its output, after creating its output dirs."""
+    for output in job.outputs:
+        os.makedirs(os.path.dirname(output) or os.curdir, exist_ok=True)
+    env = None if job.env is None else dict(job.env)
+    if usage.active():
+        return usage.run(
+            job.argv,
+            kind=job.kind,
+            target=next(iter(job.outputs), None),
+            capture_output=True,
+            env=env,
+        )
+    return subprocess.run(job.argv, env=env, capture_output=True, check=False)
+
+
+class SerialExecutor(concurrent.futures.Executor):
+    """Run each submitted call right away, in the calling thread."""
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:  # noqa: BLE001 # handed to the caller
+            future.set_exception(exc)
+        return future
+
+
+def run(
+    jobs: Iterable[Job],
+    executor: concurrent.futures.Executor | None = None,
+    *,
+    keep_going: bool = False,
+) -> list:
+    """
+    Run 'jobs' on 'executor' (by default, one after the other) and return
+    the result of each distinct job, in order.
+
+    Identical jobs are run once. A job starts only after the jobs producing
+    its inputs and dependencies have succeeded. Each job's output is shown
+    as it finishes; once a job fails, no more are started, and when the
+    running ones are done, the first failure raises the job's 'error'.
+
+    With 'keep_going', a failure only stops the jobs that (directly or not)
+    depend on the failed one, and nothing is raised: the result of a failed
+    job is its 'error', and of a job kept from running, None.
+    """
+    jobs = list(dict.fromkeys(jobs))
+    if executor is None:
+        executor = SerialExecutor()
+    waiting = _prerequisites(jobs)
+    results: dict[Job, subprocess.CompletedProcess | Exception | None] = {}
+    running: dict[concurrent.futures.Future, Job] = {}
+    failure: Exception | None = None
+    while True:
+        if keep_going:
+            _skip_blocked(waiting, results)
+        for job in _ready(waiting, results) if failure is None else ():
+            log.info(subprocess.list2cmdline(job.argv))
+            running[executor.submit(execute, job)] = job
+        if not running:
+            break
+        done, _ = concurrent.futures.wait(
+            running, return_when=concurrent.futures.FIRST_COMPLETED
+        )
+        for future in done:
+            job = running.pop(future)
+            outcome = _outcome(job, future)
+            if isinstance(outcome, Exception) and not keep_going:
+                failure = failure or outcome
+            else:
+                results[job] = outcome
+    if failure is not None:
+        raise failure
+    if waiting:
+        raise ValueError("jobs depend on each other")
+    return [results[job] for job in jobs]
+
+
+async def arun(
+    jobs: Iterable[Job], slots: asyncio.Semaphore | None = None
+) -> list[subprocess.CompletedProcess]:
+    """
+    Run 'jobs' as 'run()' does, as subprocesses of the running event loop,
+    holding one of 'slots' (if given) each.
+    """
+    jobs = list(dict.fromkeys(jobs))
+    needs = _prerequisites(jobs)
+    pending = {job: set(prerequisites) for job, prerequisites in needs.items()}
+    while _ready(pending, dict.fromkeys(needs.keys() - pending.keys())):
+        pass
+    if pending:
+        raise ValueError("jobs depend on each other")
+    tasks: dict[Job, asyncio.Task] = {}
+    failures: list[Exception] = []
+
+    async def run_one(job):
+        if needs[job]:
+            await asyncio.wait([tasks[need] for need in needs[job]])
+        async with slots or contextlib.nullcontext():
+            if failures:
+                return None
+            outcome = await _aoutcome(job)
+        if isinstance(outcome, Exception):
+            failures.append(outcome)
+        return outcome
+
+    for job in jobs:
+        tasks[job] = asyncio.ensure_future(run_one(job))
+    outcomes = await asyncio.gather(*tasks.values())
+    for outcome in outcomes:
+        if isinstance(outcome, Exception):
+            raise outcome
+    return outcomes
+
+
+async def aexecute(job: Job) -> subprocess.CompletedProcess:
+    """Run 'job' as 'execute()' does, without blocking the event loop."""
+    for output in job.outputs:
+        os.makedirs(os.path.dirname(output) or os.curdir, exist_ok=True)
+    env = None if job.env is None else dict(job.env)
+    if usage.active():
+        return await usage.arun(
+            job.argv,
+            kind=job.kind,
+            target=next(iter(job.outputs), None),
+            capture_output=True,
+            env=env,
+        )
+    process = await asyncio.create_subprocess_exec(
+        *job.argv,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+    return subprocess.CompletedProcess(job.argv, process.returncode, stdout, stderr)
+
+
+async def _aoutcome(job: Job) -> subprocess.CompletedProcess | Exception:
+    """Run 'job' and return its result, or its 'error' if it failed."""
+    log.info(subprocess.list2cmdline(job.argv))
+    try:
+        result = await aexecute(job)
+    except OSError as exc:
+        return job.error(exc)
+    return _checked(job, result)
+
+
+def _prerequisites(jobs: list[Job]) -> dict[Job, set[Job]]:
+    """Map each of 'jobs' to those producing its inputs and dependencies."""
+    producers = {output: job for job in jobs for output in job.outputs}
+    return {
+        job: {
+            producers[path]
+            for path in (*job.inputs, *job.depends)
+            if producers.get(path, job) is not job
+        }
+        for job in jobs
+    }
+
+
+def _ready(waiting: dict[Job, set[Job]], done: dict[Job, object]) -> list[Job]:
+    """Take the jobs whose prerequisites are all 'done' out of 'waiting'."""
+    ready = [job for job, needs in waiting.items() if needs <= done.keys()]
+    for job in ready:
+        del waiting[job]
+    return ready
+
+
+def _skip_blocked(waiting: dict[Job, set[Job]], results: dict[Job, object]) -> None:
+    """
+    Take the jobs needing one that failed or was skipped out of 'waiting',
+    recording them as skipped (None) in 'results'.
+    """
+    while True:
+        blocked = [
+            job
+            for job, needs in waiting.items()
+            if any(
+                need in results
+                and not isinstance(results[need], subprocess.CompletedProcess)
+                for need in needs
+            )
+        ]
+        if not blocked:
+            return
+        for job in blocked:
+            del waiting[job]
+            results[job] = None
+
+
+def _outcome(
+    job: Job, future: concurrent.futures.Future
+) -> subprocess.CompletedProcess | Exception:
+    """Show the output of the finished 'job' and return its result, or
+    its 'error' if it failed.
+    """
+    try:
+        result = future.result()
+    except OSError as exc:
+        return job.error(exc)
+    return _checked(job, result)
+
+
+def _checked(
+    job: Job, result: subprocess.CompletedProcess
+) -> subprocess.CompletedProcess | Exception:
+    """Show the output of 'job' and return its 'result', or its 'error' if
+    it failed.
+    """
+    from .base import _replay
+
+    _replay([result])
+    if result.returncode:
+        return job.error(
+            subprocess.CalledProcessError(
+                result.returncode, result.args, result.stdout, result.stderr
+            )
+        )
+    return result
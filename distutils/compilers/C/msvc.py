@@ -429,7 +429,7 @@ class Compiler(base.Compiler):
             },
         }
 
-    def compile(  # noqa: C901
+    def compile(
         self,
         sources,
         output_dir=None,
@@ -439,7 +439,10 @@ class Compiler(base.Compiler):
         extra_preargs=None,
         extra_postargs=None,
         depends=None,
+        precompiled_header=None,
     ):
+        # precompiled headers (/Yc and /Yu) aren't supported yet, so
+        # 'precompiled_header' is accepted and the sources compiled as usual
         if not self.initialized:
             self.initialize()
         compile_info = self._setup_compile(
@@ -447,81 +450,83 @@ class Compiler(base.Compiler):
         )
         macros, objects, extra_postargs, pp_opts, build = compile_info
 
-        compile_opts = extra_preargs or []
+        compile_opts = list(extra_preargs or [])
         compile_opts.append('/c')
         if debug:
             compile_opts.extend(self.compile_options_debug)
+            # pass the full pathname to MSVC in debug mode,
+            # this allows the debugger to find the source file
+            # without asking the user to browse for it
+            build = {
+                obj: (os.path.abspath(src), ext) for obj, (src, ext) in build.items()
+            }
         else:
             compile_opts.extend(self.compile_options)
 
+        self._build_objects(objects, build, compile_opts, extra_postargs, pp_opts)
+
+        return objects
+
+    def _compile(self, obj, src, ext, cc_args, extra_postargs, pp_opts):
         add_cpp_opts = False
 
-        for obj in objects:
+        if ext in self._c_extensions:
+            input_opt = f"/Tc{src}"
+        elif ext in self._cpp_extensions:
+            input_opt = f"/Tp{src}"
+            add_cpp_opts = True
+        elif ext in self._rc_extensions:
+            # compile .RC to .RES file
+            input_opt = src
+            output_opt = "/fo" + obj
             try:
-                src, ext = build[obj]
-            except KeyError:
-                continue
-            if debug:
-                # pass the full pathname to MSVC in debug mode,
-                # this allows the debugger to find the source file
-                # without asking the user to browse for it
-                src = os.path.abspath(src)
-
-            if ext in self._c_extensions:
-                input_opt = f"/Tc{src}"
-            elif ext in self._cpp_extensions:
-                input_opt = f"/Tp{src}"
-                add_cpp_opts = True
-            elif ext in self._rc_extensions:
-                # compile .RC to .RES file
-                input_opt = src
-                output_opt = "/fo" + obj
-                try:
-                    self.call([self.rc] + pp_opts + [output_opt, input_opt])
-                except (subprocess.CalledProcessError, OSError) as msg:
-                    raise CompileError(msg)
-                continue
-            elif ext in self._mc_extensions:
-                # Compile .MC to .RC file to .RES file.
-                #   * '-h dir' specifies the directory for the
-                #     generated include file
-                #   * '-r dir' specifies the target directory of the
-                #     generated RC file and the binary message resource
-                #     it includes
-                #
-                # For now (since there are no options to change this),
-                # we use the source-directory for the include file and
-                # the build directory for the RC file and message
-                # resources. This works at least for win32all.
-                h_dir = os.path.dirname(src)
-                rc_dir = os.path.dirname(obj)
-                try:
-                    # first compile .MC to .RC and .H file
-                    self.call([self.mc, '-h', h_dir, '-r', rc_dir, src])
-                    base, _ = os.path.splitext(os.path.basename(src))
-                    rc_file = os.path.join(rc_dir, base + '.rc')
-                    # then compile .RC to .RES file
-                    self.call([self.rc, "/fo" + obj, rc_file])
-
-                except (subprocess.CalledProcessError, OSError) as msg:
-                    raise CompileError(msg)
-                continue
-            else:
-                # how to handle this file?
-                raise CompileError(f"Don't know how to compile {src} to {obj}")
-
-            args = [self.cc] + compile_opts + pp_opts
-            if add_cpp_opts:
-                args.append('/EHsc')
-            args.extend((input_opt, "/Fo" + obj))
-            args.extend(extra_postargs)
-
+                self.call(
+                    [self.rc] + pp_opts + [output_opt, input_opt],
+                    kind='compile',
+                    target=obj,
+                )
+            except (subprocess.CalledProcessError, OSError) as msg:
+                raise CompileError(msg)
+            return
+        elif ext in self._mc_extensions:
+            # Compile .MC to .RC file to .RES file.
+            #   * '-h dir' specifies the directory for the
+            #     generated include file
+            #   * '-r dir' specifies the target directory of the
+            #     generated RC file and the binary message resource
+            #     it includes
+            #
+            # For now (since there are no options to change this),
+            # we use the source-directory for the include file and
+            # the build directory for the RC file and message
+            # resources. This works at least for win32all.
+            h_dir = os.path.dirname(src)
+            rc_dir = os.path.dirname(obj)
             try:
-                self.call(args)
+                # first compile .MC to .RC and .H file
+                self.call([self.mc, '-h', h_dir, '-r', rc_dir, src], kind='compile')
+                base, _ = os.path.splitext(os.path.basename(src))
+                rc_file = os.path.join(rc_dir, base + '.rc')
+                # then compile .RC to .RES file
+                self.call([self.rc, "/fo" + obj, rc_file], kind='compile', target=obj)
+
             except (subprocess.CalledProcessError, OSError) as msg:
                 raise CompileError(msg)
+            return
+        else:
+            # how to handle this file?
+            raise CompileError(f"Don't know how to compile {src} to {obj}")
 
-        return objects
+        args = [self.cc] + cc_args + pp_opts
+        if add_cpp_opts:
+            args.append('/EHsc')
+        args.extend((input_opt, "/Fo" + obj))
+        args.extend(extra_postargs)
+
+        try:
+            self.call(args, launch=True, kind='compile', target=obj)
+        except (subprocess.CalledProcessError, OSError) as msg:
+            raise CompileError(msg)
 
     def create_static_lib(
         self,
@@ -542,7 +547,7 @@ class Compiler(base.Compiler):
                 pass  # XXX what goes here?
             try:
                 log.debug('Executing "%s" %s', self.lib, ' '.join(lib_args))
-                self.call([self.lib] + lib_args)
+                self.call([self.lib] + lib_args, kind='archive', target=output_filename)
             except (subprocess.CalledProcessError, OSError) as msg:
                 raise LibError(msg)
         else:
@@ -612,7 +617,12 @@ class Compiler(base.Compiler):
             try:
                 log.debug('Executing "%s" %s', self.linker, ' '.join(ld_args))
                 with _wrap_link_command(self.linker, *ld_args) as cmd:
-                    self.call(cmd)
+                    self.call(
+                        cmd,
+                        launch=self.launch_link,
+                        kind='link',
+                        target=output_filename,
+                    )
             except (subprocess.CalledProcessError, OSError) as msg:
                 raise LinkError(msg)
         else:
@@ -0,0 +1,98 @@
+"""Remember what each output of a build was built with.
+
+Timestamps tell when an input changed, but not when the command changed
+(other options, macros, ``CFLAGS``, or a different compiler). With a
+'BuildState' set as ``Compiler.build_state``, the compiler records a
+signature of the command behind each object and link, and rebuilds an
+output whose signature differs from the recorded one (or has none), even
+when it's newer than its inputs.
+
+A signature is recorded in two steps: 'changed()' notes the one an output
+is about to be built with, and 'commit()' records it once the output was
+built, so a failed build leaves the output stale.
+
+The file has a single writer: a worker process building part of a build
+(see build_ext --process-pool) sets 'defer', and hands what it recorded
+('take()') to the parent, which 'merge()'s it.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections.abc import Iterable
+
+from .cache import dump_json
+
+
+class BuildState:
+    """The signatures of the outputs of a build, kept in the file 'path'."""
+
+    defer = False
+    """Whether 'commit()' keeps the records for 'take()' rather than
+    writing them."""
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self.path = os.fspath(path)
+        self._recorded: dict[str, str] | None = None
+        self._expected: dict[str, str] = {}
+        self._deferred: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict[str, str]:
+        if self._recorded is None:
+            self._recorded = self._read()
+        return self._recorded
+
+    def _read(self) -> dict[str, str]:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                recorded = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return recorded if isinstance(recorded, dict) else {}
+
+    def changed(self, output: str, signature: str) -> bool:
+        """
+        Return whether 'output' was last built with something else than
+        'signature', or isn't known to have been built, and expect it to be
+        built with 'signature'.
+        """
+        output = os.path.abspath(output)
+        with self._lock:
+            self._expected[output] = signature
+            return self._load().get(output) != signature
+
+    def commit(self, outputs: Iterable[str]) -> None:
+        """Record that 'outputs' were built as expected."""
+        with self._lock:
+            recorded = self._load()
+            updates = {
+                output: self._expected.pop(output)
+                for output in map(os.path.abspath, outputs)
+                if output in self._expected
+            }
+            if not updates or all(recorded.get(k) == v for k, v in updates.items()):
+                return
+            recorded.update(updates)
+            if self.defer:
+                self._deferred.update(updates)
+                return
+            # if it can't be written, the outputs are just rebuilt next time
+            dump_json(self.path, recorded)
+
+    def take(self) -> dict[str, str]:
+        """Return the records 'commit()' kept back, and forget them."""
+        with self._lock:
+            deferred, self._deferred = self._deferred, {}
+        return deferred
+
+    def merge(self, records: dict[str, str]) -> None:
+        """Record and write 'records' taken from another 'BuildState'."""
+        with self._lock:
+            recorded = self._load()
+            if all(recorded.get(k) == v for k, v in records.items()):
+                return
+            recorded.update(records)
+            dump_json(self.path, recorded)
@@ -1,10 +1,13 @@
 import platform
+import sys
 import sysconfig
 import textwrap
+import threading
 
 import pytest
 
 from .. import base, cygwin, msvc, unix
+from ..cache import ProbeCache
 
 pytestmark = pytest.mark.usefixtures('suppress_path_mangle')
 
@@ -88,6 +91,43 @@ def test_has_function_prototype():
         )
 
 
+def test_has_functions(tmp_path, monkeypatch):
+    compiler = base.new_compiler()
+    compiler.probe_cache = ProbeCache(tmp_path / 'probes.json')
+    tries = []
+    orig_try = compiler._try_functions
+
+    def try_functions(names, *args):
+        tries.append(names)
+        return orig_try(names, *args)
+
+    monkeypatch.setattr(compiler, '_try_functions', try_functions)
+    names = ['abort', 'exit', 'setuptools_does_not_exist', 'free', 'malloc']
+    assert compiler.has_functions(names) == {
+        'abort': True,
+        'exit': True,
+        'setuptools_does_not_exist': False,
+        'free': True,
+        'malloc': True,
+    }
+    # the first try fails, then the halves find the culprit
+    assert tries[0] == names
+    assert len(tries) < 2 * len(names) - 1
+
+    # the outcomes are remembered, also by another compiler
+    tries.clear()
+    assert not compiler.has_function('setuptools_does_not_exist')
+    other = base.new_compiler()
+    other.probe_cache = ProbeCache(tmp_path / 'probes.json')
+    monkeypatch.setattr(other, '_try_functions', try_functions)
+    assert other.has_functions(['abort', 'free'])['free']
+    assert not tries
+
+    # but not when linking other libraries
+    assert compiler.has_functions(['abort'], libraries=['m']) == {'abort': True}
+    assert tries == [['abort']]
+
+
 def test_include_dirs_after_multiple_compile_calls(c_file):
     """
     Calling compile multiple times should not change the include dirs
@@ -100,3 +140,52 @@ def test_include_dirs_after_multiple_compile_calls(c_file):
     assert compiler.include_dirs == [python]
     compiler.compile([c_file])
     assert compiler.include_dirs == [python]
+
+
+def test_compile_parallel_raises_first_failure(monkeypatch):
+    compiler = unix.Compiler()
+    compiler.parallel = 4
+
+    def _compile(obj, src, *args):
+        if src in ('b.c', 'c.c'):
+            raise base.CompileError(src)
+
+    monkeypatch.setattr(compiler, '_compile', _compile)
+    with pytest.raises(base.CompileError, match='b.c'):
+        compiler.compile(['a.c', 'b.c', 'c.c', 'd.c'])
+
+
+def test_compile_parallel_follows_changes(monkeypatch):
+    """
+    Changing 'parallel' between compiles changes how many run at once.
+    """
+    compiler = unix.Compiler()
+    barrier = None
+
+    def _compile(obj, src, *args):
+        barrier.wait()
+
+    monkeypatch.setattr(compiler, '_compile', _compile)
+    for parallel in (2, 4):
+        compiler.parallel = parallel
+        barrier = threading.Barrier(parallel, timeout=5)
+        compiler.compile(['a.c', 'b.c', 'c.c', 'd.c'])
+
+
+def test_compile_parallel_buffers_output(monkeypatch, capfd):
+    """
+    Output of sources compiled in parallel is replayed one source at a time.
+    """
+    compiler = unix.Compiler()
+    compiler.parallel = 3
+    script = 'import sys, time; [print(sys.argv[1], i) or time.sleep(0.01) for i in range(3)]'
+
+    def _compile(obj, src, *args):
+        compiler.call([sys.executable, '-c', script, src])
+
+    monkeypatch.setattr(compiler, '_compile', _compile)
+    compiler.compile(['a.c', 'b.c', 'c.c'])
+    lines = capfd.readouterr().out.splitlines()
+    assert sorted(lines) == [f'{src}.c {i}' for src in 'abc' for i in range(3)]
+    order = [line.split()[0] for line in lines]
+    assert order == [src for src in dict.fromkeys(order) for _ in range(3)]
@@ -0,0 +1,126 @@
+import os
+import shutil
+
+import pytest
+
+from .. import base, cache_server, unix
+from ..cache import HTTPBackend, ObjectCache, digest
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'foo.h').write_text('#define FOO 1\n', encoding='utf-8')
+    (tmp_path / 'foo.c').write_text(
+        '#include "foo.h"\n#warning from foo\nint foo(void) { return FOO; }\n',
+        encoding='utf-8',
+    )
+    return ['foo.c']
+
+
+@pytest.mark.skipif('platform.system() == "Windows"')
+def test_restores_identical_translation_unit(sources, tmp_path, capfd):
+    cache = ObjectCache(tmp_path / 'cache')
+    compiler = unix.Compiler(force=True)
+    compiler.object_cache = cache
+
+    (obj,) = compiler.compile(sources, output_dir='build')
+    assert 'from foo' in capfd.readouterr().err
+    assert cache.stats()['misses'] == 1
+    with open(obj, 'rb') as f:
+        built = f.read()
+
+    os.remove(obj)
+    compiler.compile(sources, output_dir='build')
+    assert cache.stats()['hits'] == 1
+    # the warning is replayed with the object
+    assert 'from foo' in capfd.readouterr().err
+    with open(obj, 'rb') as f:
+        assert f.read() == built
+
+    # a header edit changes the preprocessed source, and so the key
+    (tmp_path / 'foo.h').write_text('#define FOO 2\n', encoding='utf-8')
+    compiler.compile(sources, output_dir='build')
+    assert cache.stats()['misses'] == 2
+
+
+@pytest.mark.skipif('platform.system() == "Windows"')
+def test_hardlinked_objects_relink(tmp_path, monkeypatch):
+    import ctypes
+
+    monkeypatch.chdir(tmp_path)
+    compiler = unix.Compiler()
+    compiler.object_cache = ObjectCache(tmp_path / 'cache', hardlink=True)
+    # back to the first version: its object, restored from the cache,
+    # must still be linked in place of the second
+    for index, answer in enumerate([12345, 54321, 12345]):
+        (tmp_path / 'a.c').write_text(
+            f'int a(void) {{ return {answer}; }}\n', encoding='utf-8'
+        )
+        objects = compiler.compile(['a.c'], output_dir='build', extra_preargs=['-fPIC'])
+        compiler.link(base.Compiler.SHARED_OBJECT, objects, 'liba.so')
+        # a copy, as a library loaded once isn't reloaded from the same path
+        loaded = shutil.copy('liba.so', f'liba{index}.so')
+        assert ctypes.CDLL(os.path.abspath(loaded)).a() == answer
+    assert compiler.object_cache.stats()['hits'] == 1
+
+
+def test_prune(tmp_path):
+    cache = ObjectCache(tmp_path / 'cache', max_size=19)
+    for index, key in enumerate(['aa1', 'bb2', 'cc3', 'dd4']):
+        path = tmp_path / f'{key}.o'
+        path.write_bytes(b'x' * 6)
+        cache.store(key, [str(path)], b'')
+        entry = tmp_path / 'cache' / key[:2] / key
+        os.utime(entry, (index, index))
+    # storing over the limit evicted the least recently used entries, down
+    # to the low-water mark (17 bytes) rather than just to the limit
+    assert cache.restore('aa1', [str(tmp_path / 'out.o')]) is None
+    assert cache.restore('bb2', [str(tmp_path / 'out.o')]) is None
+    assert cache.restore('dd4', [str(tmp_path / 'out.o')]) == b''
+    assert cache.prune(0) == 2
+    assert cache.stats() == dict(hits=1, misses=2, remote_hits=0, size=0)
+
+
+@pytest.fixture
+def server(tmp_path):
+    with cache_server.Server(tmp_path / 'remote') as server:
+        server.start()
+        yield server
+        server.shutdown()
+
+
+def test_remote_shares_entries(server, tmp_path):
+    obj = tmp_path / 'foo.o'
+    obj.write_bytes(b'object')
+    key = digest('foo')
+
+    runner1 = ObjectCache(tmp_path / 'runner1', remote=HTTPBackend(server.url))
+    runner1.store(key, [str(obj)], b'warning: foo\n')
+    runner1.close()
+
+    runner2 = ObjectCache(tmp_path / 'runner2', remote=HTTPBackend(server.url))
+    restored = tmp_path / 'restored.o'
+    assert runner2.restore(key, [str(restored)]) == b'warning: foo\n'
+    assert restored.read_bytes() == b'object'
+    assert runner2.stats()['remote_hits'] == 1
+    assert runner2.restore(digest('bar'), [str(restored)]) is None
+    assert runner2.remote.available
+
+
+def test_remote_unavailable(server, tmp_path, caplog):
+    url = server.url
+    server.shutdown()
+    server.server_close()
+    remote = HTTPBackend(url, timeout=1)
+    cache = ObjectCache(tmp_path / 'cache', remote=remote)
+    obj = tmp_path / 'foo.o'
+    obj.write_bytes(b'object')
+
+    assert cache.restore(digest('foo'), [str(obj)]) is None
+    assert not remote.available
+    assert 'unavailable' in caplog.text
+    # the local cache keeps working
+    cache.store(digest('foo'), [str(obj)], b'')
+    cache.close()
+    assert cache.restore(digest('foo'), [str(obj)]) == b''
@@ -0,0 +1,111 @@
+import io
+import os
+
+import pytest
+
+from .. import distributed, unix
+
+
+@pytest.fixture
+def worker():
+    with distributed.Worker() as worker:
+        worker.start()
+        yield worker
+        worker.shutdown()
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'include').mkdir()
+    (tmp_path / 'include' / 'answer.h').write_text(
+        '#define ANSWER 42\n', encoding='utf-8'
+    )
+    for name in 'ab':
+        (tmp_path / f'{name}.c').write_text(
+            f'#include "answer.h"\nint {name}(void) {{ return ANSWER + OFFSET; }}\n',
+            encoding='utf-8',
+        )
+    return ['a.c', 'b.c']
+
+
+def test_protocol_round_trip():
+    stream = io.BytesIO()
+    distributed.send(stream, {'argv': ['cc', '-c']}, b'int x;\n', b'')
+    stream.seek(0)
+    header, blobs = distributed.receive(stream)
+    assert header['argv'] == ['cc', '-c']
+    assert blobs == [b'int x;\n', b'']
+
+
+@pytest.mark.skipif('platform.system() == "Windows"')
+def test_compiles_on_worker(worker, sources, monkeypatch):
+    workers = distributed.Workers([worker.address])
+    sent = []
+    compile = workers.compile
+    monkeypatch.setattr(
+        workers,
+        'compile',
+        lambda argv, *args: sent.append(argv) or compile(argv, *args),
+    )
+    compiler = unix.Compiler()
+    compiler.compile_workers = workers
+    objects = compiler.compile(
+        sources, output_dir='build', include_dirs=['include'], macros=[('OFFSET', '1')]
+    )
+    assert len(sent) == 2
+    # the worker gets neither the headers nor the macros, only the result
+    assert not any(arg.startswith(('-I', '-D')) for arg in sent[0])
+    assert all(os.path.getsize(obj) for obj in objects)
+    assert os.path.exists(os.path.join('build', 'a.d'))
+
+    # the worker refuses to run anything but a compiler
+    compiled = workers.compile(['sh', '-c', 'true'], 'c', b'')
+    assert compiled.result.returncode and b'refusing' in compiled.result.stderr
+
+
+@pytest.mark.parametrize(
+    'name',
+    ['/tmp/evil-gcc', '../../bin/anything-cc', 'sh -c x-cc', 'gcc;sh', 'sh', ''],
+)
+def test_worker_refuses(worker, name, monkeypatch):
+    monkeypatch.setattr(distributed.shutil, 'which', lambda name: '/usr/bin/' + name)
+    assert worker.resolve([name, '-c']) is None
+
+
+def test_worker_resolves_on_path(worker, monkeypatch):
+    found = {'gcc': '/usr/bin/gcc', 'x86_64-linux-gnu-gcc-12': '/opt/bin/gcc'}
+    monkeypatch.setattr(distributed.shutil, 'which', found.get)
+    assert worker.resolve(['gcc', '-c']) == '/usr/bin/gcc'
+    assert worker.resolve(['x86_64-linux-gnu-gcc-12']) == '/opt/bin/gcc'
+    assert worker.resolve(['clang']) is None
+
+
+@pytest.mark.skipif('platform.system() == "Windows"')
+def test_falls_back_to_local(worker, sources, caplog):
+    address = worker.address
+    worker.shutdown()
+    worker.server_close()
+    compiler = unix.Compiler()
+    compiler.compile_workers = workers = distributed.Workers([address], timeout=1)
+    objects = compiler.compile(
+        sources, output_dir='build', include_dirs=['include'], macros=[('OFFSET', '1')]
+    )
+    assert all(os.path.getsize(obj) for obj in objects)
+    assert 'unavailable' in caplog.text
+    assert workers.compile(['cc', '-c'], 'c', b'') is None
+
+
+def test_connect_timeout(monkeypatch, caplog):
+    timeouts = []
+
+    def unreachable(address, timeout):
+        timeouts.append(timeout)
+        raise TimeoutError("timed out")
+
+    monkeypatch.setattr(distributed.socket, 'create_connection', unreachable)
+    workers = distributed.Workers(['build7:3632'])
+    # a host dropping packets is given up on quickly, not after 'timeout'
+    assert workers.compile(['cc', '-c'], 'c', b'') is None
+    assert timeouts == [workers.connect_timeout] and workers.connect_timeout < 60
+    assert 'unavailable' in caplog.text
@@ -0,0 +1,73 @@
+import json
+import os
+import threading
+import time
+
+from .. import includes
+from ..includes import Scanner
+
+
+def test_headers(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'src').mkdir()
+    (tmp_path / 'include').mkdir()
+    (tmp_path / 'src' / 'foo.c').write_text(
+        '#include <stdio.h>\n#include "local.h"\n#include <api.h>\n',
+        encoding='utf-8',
+    )
+    (tmp_path / 'src' / 'local.h').write_text('#include "api.h"\n', encoding='utf-8')
+    (tmp_path / 'include' / 'api.h').write_text(
+        '#ifdef X\n#  include "detail.h"\n#endif\n', encoding='utf-8'
+    )
+    (tmp_path / 'include' / 'detail.h').write_text('', encoding='utf-8')
+
+    cache_file = tmp_path / 'build' / 'includes.json'
+    scanner = Scanner(cache_file)
+    headers = scanner.headers([os.path.join('src', 'foo.c')], ['include'])
+    assert sorted(headers) == [
+        os.path.join('include', 'api.h'),
+        os.path.join('include', 'detail.h'),
+        os.path.join('src', 'local.h'),
+    ]
+    scanner.save()
+    assert cache_file.exists()
+
+    # a new scanner reuses what was recorded, until a file changes
+    scanner = Scanner(cache_file)
+    (tmp_path / 'include' / 'detail.h').write_text(
+        '#include "more.h"\n', encoding='utf-8'
+    )
+    (tmp_path / 'include' / 'more.h').write_text('', encoding='utf-8')
+    headers = scanner.headers([os.path.join('src', 'foo.c')], ['include'])
+    assert os.path.join('include', 'more.h') in headers
+    assert scanner._dirty
+
+
+def test_concurrent_scans(tmp_path, monkeypatch):
+    """
+    Scans from several threads at once all end up in the memo, even while
+    the cache file is still being read.
+    """
+    cache_file = tmp_path / 'includes.json'
+    cache_file.write_text('{}', encoding='utf-8')
+    load = json.load
+
+    def slow_load(f):
+        time.sleep(0.05)
+        return load(f)
+
+    monkeypatch.setattr(includes.json, 'load', slow_load)
+    sources = []
+    for name in 'abcd':
+        sources.append(str(tmp_path / f'{name}.c'))
+        (tmp_path / f'{name}.c').write_text('', encoding='utf-8')
+    scanner = Scanner(cache_file)
+    threads = [
+        threading.Thread(target=scanner.headers, args=([source],)) for source in sources
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    scanner.save()
+    assert sorted(json.loads(cache_file.read_text(encoding='utf-8'))) == sources
@@ -0,0 +1,68 @@
+import concurrent.futures
+import sys
+
+import pytest
+
+from .. import jobs
+from ..errors import CompileError, LinkError
+
+
+def copy_job(src, dst, **kwargs):
+    code = 'import shutil, sys; shutil.copyfile(sys.argv[1], sys.argv[2])'
+    return jobs.Job(
+        (sys.executable, '-c', code, src, dst), inputs=(src,), outputs=(dst,), **kwargs
+    )
+
+
+@pytest.mark.parametrize(
+    'executor',
+    [
+        jobs.SerialExecutor,
+        lambda: concurrent.futures.ThreadPoolExecutor(2),
+        lambda: concurrent.futures.ProcessPoolExecutor(2),
+    ],
+    ids=['serial', 'threads', 'processes'],
+)
+def test_run(tmp_path, monkeypatch, executor):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'a').write_text('data', encoding='utf-8')
+    # listed out of order, with a duplicate
+    planned = [
+        copy_job('out/b', 'out/c'),
+        copy_job('a', 'out/b'),
+        copy_job('out/b', 'out/c'),
+    ]
+    with executor() as pool:
+        results = jobs.run(planned, pool)
+    assert len(results) == 2
+    assert (tmp_path / 'out' / 'c').read_text(encoding='utf-8') == 'data'
+
+
+def test_run_failure(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    planned = [
+        copy_job('missing', 'b', error=LinkError),
+        copy_job('b', 'c'),
+    ]
+    with pytest.raises(LinkError):
+        jobs.run(planned)
+    assert not (tmp_path / 'c').exists()
+
+    with pytest.raises(CompileError):
+        jobs.run([jobs.Job(('no-such-program',))])
+
+
+def test_run_keep_going(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'a').write_text('data', encoding='utf-8')
+    planned = [
+        copy_job('missing', 'b'),
+        copy_job('b', 'c'),
+        copy_job('c', 'd'),
+        copy_job('a', 'e'),
+    ]
+    failed, *skipped, copied = jobs.run(planned, keep_going=True)
+    assert isinstance(failed, CompileError)
+    assert skipped == [None, None]
+    assert copied.returncode == 0
+    assert (tmp_path / 'e').exists()
@@ -1,8 +1,10 @@
 """Tests for distutils.unixccompiler."""
 
 import os
+import subprocess
 import sys
 import sysconfig
+import time
 from unittest import mock
 
 import pytest
@@ -10,7 +12,10 @@ from test.support import os_helper
 
 from ... import errors
 from ...platform import macos
-from .. import unix
+from .. import jobs, unix
+from ..cache import ObjectCache, ProbeCache
+from ..errors import CompileError
+from ..state import BuildState
 
 
 @pytest.fixture(autouse=True)
@@ -29,6 +34,20 @@ def compiler_wrapper(request):
     request.instance.cc = CompilerWrapper()
 
 
+@pytest.fixture
+def calls(monkeypatch):
+    """The commands run through 'Compiler.call()', in order."""
+    calls = []
+    call = unix.Compiler.call
+
+    def record(self, cmd, **kwargs):
+        calls.append(cmd)
+        return call(self, cmd, **kwargs)
+
+    monkeypatch.setattr(unix.Compiler, 'call', record)
+    return calls
+
+
 class TestUnixCCompiler:
     @pytest.mark.skipif('platform.system == "Windows"')
     def test_runtime_libdir_option(self):  # noqa: C901
@@ -409,3 +428,512 @@ class TestUnixCCompiler:
             compiler.find_library_file(reversed(dirs), 'abc').replace('\\', '/')
             == '/foo/bar/existing/libabc.a'
         )
+
+    @pytest.mark.skipif('sys.platform in ("cygwin", "darwin", "win32")')
+    def test_find_library_file_index(self, tmp_path, monkeypatch):
+        """
+        Library directories are listed once, until they change.
+        """
+        compiler = unix.Compiler()
+        (tmp_path / 'libabc.a').touch()
+        assert compiler.find_library_file([tmp_path], 'abc') == str(
+            tmp_path / 'libabc.a'
+        )
+
+        def scandir(path):
+            raise AssertionError("listed again")
+
+        with monkeypatch.context() as m:
+            m.setattr(os, 'scandir', scandir)
+            assert compiler.find_library_file([tmp_path], 'xyz') is None
+            assert compiler.find_library_file([tmp_path], 'abc')
+
+        (tmp_path / 'libabc.so').touch()
+        os.utime(tmp_path, ns=(0, 0))
+        assert compiler.find_library_file([tmp_path], 'abc') == str(
+            tmp_path / 'libabc.so'
+        )
+
+    @pytest.mark.skipif('platform.system == "Windows"')
+    def test_compile_skips_up_to_date_objects(self, calls, tmp_path, monkeypatch):
+        """
+        Only sources whose recorded headers changed are recompiled, and
+        only with a build state to tell whether the command changed.
+        """
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'a.h').write_text('#define A 1\n', encoding='utf-8')
+        (tmp_path / 'a.c').write_text(
+            '#include "a.h"\nint a(void) { return A; }\n', encoding='utf-8'
+        )
+        (tmp_path / 'b.c').write_text('int b(void) { return 2; }\n', encoding='utf-8')
+        compiler = unix.Compiler()
+        compiler.build_state = BuildState(tmp_path / 'state.json')
+        objects = compiler.compile(['a.c', 'b.c'], output_dir='build')
+        assert len(calls) == 2
+        assert os.path.exists(os.path.join('build', 'a.d'))
+
+        calls.clear()
+        assert compiler.compile(['a.c', 'b.c'], output_dir='build') == objects
+        assert not calls
+
+        # without a build state, the command may have changed
+        state, compiler.build_state = compiler.build_state, None
+        compiler.compile(['a.c'], output_dir='build', macros=[('A', '2')])
+        assert [cmd[-3] for cmd in calls] == ['a.c']
+        compiler.build_state = state
+
+        calls.clear()
+        mtime = os.path.getmtime(objects[0]) + 10
+        os.utime('a.h', (mtime, mtime))
+        compiler.compile(['a.c', 'b.c'], output_dir='build')
+        assert [cmd[-3] for cmd in calls] == ['a.c']
+
+    @pytest.mark.skipif('platform.system == "Windows"')
+    def test_launcher(self, monkeypatch):
+        """
+        The launcher wraps compiles, and links only if asked to, without
+        affecting how the compiler itself is recognized.
+        """
+        monkeypatch.setenv('CC_LAUNCHER', 'ccache --quiet')
+        compiler = unix.Compiler()
+        assert compiler.launcher == ['ccache', '--quiet']
+        compiler.set_executables(compiler_so='gcc', linker_so='gcc -shared')
+        assert compiler._is_gcc()
+        calls = []
+        monkeypatch.setattr(
+            unix.base.subprocess, 'check_call', lambda cmd, **kw: calls.append(cmd)
+        )
+        monkeypatch.setattr(compiler, 'mkpath', lambda name: None)
+
+        compiler.compile(['a.c'], output_dir='build')
+        compiler.link_shared_object(['build/a.o'], 'a.so')
+        compile_cmd, link_cmd = calls
+        assert compile_cmd[:3] == ['ccache', '--quiet', 'gcc']
+        assert link_cmd[0] == 'gcc'
+
+        calls.clear()
+        compiler.launch_link = True
+        compiler.link_shared_object(['build/a.o'], 'a.so')
+        assert calls[0][:2] == ['ccache', '--quiet']
+
+    @pytest.mark.skipif('platform.system == "Windows"')
+    def test_precompiled_header(self, calls, tmp_path, monkeypatch):
+        """
+        The header is precompiled once per set of options and included
+        in every source.
+        """
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'big.h').write_text('#define A 1\n', encoding='utf-8')
+        for name in 'ab':
+            (tmp_path / f'{name}.c').write_text(
+                f'#include "big.h"\nint {name}(void) {{ return A; }}\n',
+                encoding='utf-8',
+            )
+        compiler = unix.Compiler()
+        compiler.build_state = BuildState(tmp_path / 'state.json')
+        compiler.compile(['a.c', 'b.c'], output_dir='build', precompiled_header='big.h')
+        pch_cmd, *compile_cmds = calls
+        (gch,) = tmp_path.glob('build/pch/*/big.h.gch')
+        assert pch_cmd[pch_cmd.index('-o') + 1] == os.path.join(
+            'build', 'pch', gch.parent.name, 'big.h.gch'
+        )
+        assert all('-include' in cmd for cmd in compile_cmds)
+
+        calls.clear()
+        compiler.compile(['a.c', 'b.c'], output_dir='build', precompiled_header='big.h')
+        assert not calls
+
+        compiler.force = True
+        compiler.compile(
+            ['a.c', 'b.c'],
+            output_dir='build',
+            macros=[('B', '1')],
+            precompiled_header='big.h',
+        )
+        assert len(calls) == 3
+        assert len(list(tmp_path.glob('build/pch/*/big.h.gch'))) == 2
+
+        # so do extra compile arguments (e.g. from extra_compile_args)
+        compiler.compile(
+            ['a.c', 'b.c'],
+            output_dir='build',
+            macros=[('B', '1')],
+            extra_postargs=['-std=c99'],
+            precompiled_header='big.h',
+        )
+        assert len(list(tmp_path.glob('build/pch/*/big.h.gch'))) == 3
+
+    @pytest.mark.skipif('platform.system == "Windows"')
+    def test_compile_batch(self, calls, tmp_path, monkeypatch):
+        """
+        Sources are compiled together, and a failing batch is retried one
+        source at a time to report the culprit.
+        """
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'include').mkdir()
+        (tmp_path / 'include' / 'a.h').write_text('#define A 1\n', encoding='utf-8')
+        for name in 'abc':
+            (tmp_path / f'{name}.c').write_text(
+                f'#include "a.h"\nint {name}(void) {{ return A; }}\n',
+                encoding='utf-8',
+            )
+        compiler = unix.Compiler()
+        compiler.batch_size = 8
+        objects = compiler.compile(
+            ['a.c', 'b.c', 'c.c'], output_dir='build', include_dirs=['include']
+        )
+        assert len(calls) == 1
+        assert all(os.path.exists(obj) for obj in objects)
+        assert os.path.exists(os.path.join('build', 'b.d'))
+        assert not [name for name in os.listdir('build') if name.startswith('.')]
+
+        calls.clear()
+        compiler.force = True
+        (tmp_path / 'b.c').write_text('int b(void) { return }\n', encoding='utf-8')
+        with pytest.raises(CompileError):
+            compiler.compile(
+                ['a.c', 'b.c', 'c.c'],
+                output_dir='build',
+                include_dirs=['include'],
+            )
+        assert [cmd[-3] for cmd in calls[1:]] == ['a.c', 'b.c']
+
+    @pytest.mark.skipif('platform.system == "Windows"')
+    def test_link_signature(self, calls, tmp_path, monkeypatch):
+        """
+        Objects that are newer but unchanged since the last link don't
+        cause a relink.
+        """
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'a.c').write_text('int a(void) { return 1; }\n', encoding='utf-8')
+        compiler = unix.Compiler()
+        (obj,) = compiler.compile(['a.c'], output_dir='build')
+        calls.clear()
+
+        def link():
+            compiler.link_shared_object([obj], 'liba.so', build_temp='build')
+
+        def age(path):
+            os.utime(path, (0, 0))
+
+        link()
+        assert len(calls) == 1
+
+        calls.clear()
+        age('liba.so')
+        link()
+        assert not calls
+        assert os.path.getmtime('liba.so') >= os.path.getmtime(obj)
+
+        age('liba.so')
+        with open(obj, 'ab') as f:
+            f.write(b'\0')
+        link()
+        assert len(calls) == 1
+
+    @pytest.mark.skipif('platform.system() != "Linux"')
+    @pytest.mark.parametrize('thin', [False, True])
+    def test_incremental_archive(self, calls, tmp_path, monkeypatch, thin):
+        """
+        Only the objects that changed are passed to ``ar``, unless the
+        members differ.
+        """
+        monkeypatch.chdir(tmp_path)
+        for name in 'ab':
+            (tmp_path / f'{name}.c').write_text(
+                f'int {name}(void) {{ return 1; }}\n', encoding='utf-8'
+            )
+        compiler = unix.Compiler()
+        compiler.incremental_archives = True
+        compiler.thin_archives = thin
+        objects = compiler.compile(['a.c', 'b.c'], output_dir='build')
+        compiler.create_static_lib(objects, 'x', output_dir='lib')
+        (lib,) = tmp_path.glob('lib/libx.a')
+        assert (lib.read_bytes()[:8] == b'!<thin>\n') is thin
+
+        os.utime(lib, (1, 1))
+        os.utime(objects[1], (0, 0))
+        compiler.create_static_lib(objects, 'x', output_dir='lib')
+        assert calls[-1][2:] == [str(lib.relative_to(tmp_path)), objects[0]]
+
+        compiler.force = True
+        compiler.create_static_lib(objects[:1], 'x', output_dir='lib')
+        assert calls[-1][2:] == [str(lib.relative_to(tmp_path)), objects[0]]
+        listed = subprocess.run(
+            ['ar', 't', str(lib)], capture_output=True, text=True, check=True
+        ).stdout.split()
+        assert len(listed) == 1
+
+    @pytest.mark.skipif('platform.system() == "Windows"')
+    def test_supports_flags(self, tmp_path, monkeypatch):
+        compiler = unix.Compiler()
+        compiler.probe_cache = ProbeCache(tmp_path / 'probes.json')
+        flags = ['-O2', '-fno-such-option', '-Wall', '-DX=1']
+        assert compiler.supports_flags(flags) == ['-O2', '-Wall', '-DX=1']
+        assert compiler.supports_flags(['-Wall'], lang='c++') == ['-Wall']
+
+        # warm queries don't run the compiler
+        monkeypatch.setattr(compiler, '_try_flags', None)
+        assert compiler.supports_flags(flags[:2]) == ['-O2']
+
+    @pytest.mark.skipif('platform.system() == "Windows"')
+    def test_probes_unrecorded(self, tmp_path):
+        """
+        What probes build stays out of the build state and object cache.
+        """
+        compiler = unix.Compiler()
+        compiler.build_state = BuildState(tmp_path / 'state.json')
+        compiler.object_cache = ObjectCache(tmp_path / 'cache')
+        assert compiler.supports_flags(['-Wall']) == ['-Wall']
+        assert compiler.has_functions(['exit', 'no_such_function']) == {
+            'exit': True,
+            'no_such_function': False,
+        }
+        assert not (tmp_path / 'state.json').exists()
+        assert compiler.object_cache.stats()['misses'] == 0
+
+    @pytest.mark.usefixtures('disable_macos_customization')
+    def test_configured_compiler_snapshot(self, tmp_path, monkeypatch):
+        from .. import base
+
+        monkeypatch.setattr(base, '_configured', {})
+        monkeypatch.setenv('CC', 'snapshot-cc')
+        configured = []
+        require_config_vars = unix._require_config_vars
+
+        def record(*names):
+            configured.append(names)
+            return require_config_vars(*names)
+
+        # count the configurations actually worked out
+        monkeypatch.setattr(unix, '_require_config_vars', record)
+
+        first = base.new_compiler(
+            compiler='unix', configure=True, snapshot_dir=str(tmp_path)
+        )
+        assert first.compiler[0] == 'snapshot-cc'
+        assert len(list(tmp_path.glob('compiler-*.json'))) == 1
+
+        # the pool hands out copies of the compiler configured once
+        second = base.new_compiler(compiler='unix', configure=True, force=True)
+        assert second.compiler == first.compiler and second.force
+        second.define_macro('X')
+        assert not first.macros
+        assert len(configured) == 1
+
+        # a later run restores the snapshot
+        monkeypatch.setattr(base, '_configured', {})
+        third = base.new_compiler(
+            compiler='unix', configure=True, snapshot_dir=str(tmp_path)
+        )
+        assert third.linker_so == first.linker_so
+        assert third.shared_lib_extension == first.shared_lib_extension
+        assert len(configured) == 1
+
+        # unless the environment changed
+        monkeypatch.setattr(base, '_configured', {})
+        monkeypatch.setenv('CC', 'other-cc')
+        fourth = base.new_compiler(
+            compiler='unix', configure=True, snapshot_dir=str(tmp_path)
+        )
+        assert fourth.compiler[0] == 'other-cc'
+        assert len(configured) == 2
+        assert len(list(tmp_path.glob('compiler-*.json'))) == 2
+
+    def test_configure_hooks(self, tmp_path, monkeypatch):
+        from .... import sysconfig
+        from ...platform import macos
+        from .. import base
+
+        monkeypatch.setattr(base, '_configured', {})
+        customized = []
+        monkeypatch.setattr(
+            macos, 'customize_compiler', lambda config_vars: customized.append(1)
+        )
+
+        def build(configure=sysconfig.customize_compiler):
+            return base.new_compiler(
+                compiler='unix', configure=configure, snapshot_dir=str(tmp_path)
+            )
+
+        build()
+        # a run restoring the snapshot still makes the macOS changes
+        monkeypatch.setattr(base, '_configured', {})
+        customized.clear()
+        build()
+        assert customized
+
+        # the launcher comes from the environment too
+        monkeypatch.setenv('CC_LAUNCHER', 'ccache')
+        assert build().launcher == ['ccache']
+
+        # a replaced 'customize_compiler()' runs for every compiler
+        def customize(compiler):
+            sysconfig.customize_compiler(compiler)
+            compiler.compiler_so.append('-DCUSTOM')
+
+        assert build(customize).compiler_so[-1] == '-DCUSTOM'
+        assert '-DCUSTOM' not in build().compiler_so
+        assert build(customize).compiler_so.count('-DCUSTOM') == 1
+
+    def test_use_linker(self, monkeypatch):
+        compiler = unix.Compiler()
+        compiler.use_linker = 'auto'
+        tried = []
+
+        def try_linker(linker, name):
+            tried.append(name)
+            return name == 'lld'
+
+        monkeypatch.setattr(compiler, '_try_linker', try_linker)
+        linker = ['cc', '-shared']
+        assert compiler._use_linker_args(linker) == ['-fuse-ld=lld']
+        assert tried == ['mold', 'lld']
+        assert compiler._use_linker_args(linker) == ['-fuse-ld=lld']
+        assert tried == ['mold', 'lld']
+
+        # an explicit choice in the linker command is left alone
+        assert compiler._use_linker_args([*linker, '-fuse-ld=bfd']) == []
+
+        compiler.use_linker = 'mold'
+        assert compiler._use_linker_args(linker) == []
+
+    @pytest.mark.skipif('platform.system() == "Windows"')
+    def test_use_linker_fallback(self, calls, tmp_path, monkeypatch):
+        """A linker the driver can't use leaves the default in place."""
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'a.c').write_text('int a(void) { return 1; }\n', encoding='utf-8')
+        compiler = unix.Compiler()
+        compiler.use_linker = 'no-such-linker'
+        (obj,) = compiler.compile(['a.c'], output_dir='build')
+        compiler.link_shared_object([obj], 'liba.so')
+        assert os.path.exists('liba.so')
+        assert '-fuse-ld=no-such-linker' not in calls[-1]
+
+    @pytest.mark.skipif('platform.system() == "Windows"')
+    def test_build_state(self, calls, tmp_path, monkeypatch):
+        """
+        Changing the compile or link command rebuilds what it built, even
+        though that's newer than its inputs; nothing else does.
+        """
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'a.c').write_text('int a(void) { return A; }\n', encoding='utf-8')
+        compiler = unix.Compiler()
+        compiler.build_state = BuildState(tmp_path / 'state.json')
+
+        def build(macro, link_args=()):
+            objects = compiler.compile(['a.c'], output_dir='build', macros=[macro])
+            compiler.link_shared_object(
+                objects, 'liba.so', extra_postargs=list(link_args)
+            )
+
+        def kinds():
+            return ['compile' if '-c' in cmd else 'link' for cmd in calls]
+
+        build(('A', '1'))
+        assert kinds() == ['compile', 'link']
+        # a fresh state, as in a later build
+        compiler.build_state = BuildState(tmp_path / 'state.json')
+        build(('A', '1'))
+        assert kinds() == ['compile', 'link']
+        build(('A', '2'))
+        assert kinds()[2:] == ['compile', 'link']
+        build(('A', '2'), ['-s'])
+        assert kinds()[4:] == ['link']
+
+    @pytest.mark.skipif('platform.system() == "Windows"')
+    def test_plan(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'a.c').write_text('int a(void) { return 1; }\n', encoding='utf-8')
+        (tmp_path / 'b.c').write_text('int b(void) { return 2; }\n', encoding='utf-8')
+        compiler = unix.Compiler()
+        compiler.build_state = BuildState(tmp_path / 'state.json')
+        compiler.launcher = ['env']
+        planned = compiler.plan_compile(['a.c', 'b.c'], output_dir='build')
+        assert [job.inputs for job in planned] == [('a.c',), ('b.c',)]
+        assert planned[0].argv[0] == 'env'
+        assert planned[0].outputs[0] == os.path.join('build', 'a.o')
+        assert not (tmp_path / 'build' / 'a.o').exists()
+
+        objects = [job.outputs[0] for job in planned]
+        # objects not built yet need linking, even into an existing output
+        (tmp_path / 'build' / 'libab.so').touch()
+        (link,) = compiler.plan_link(
+            unix.Compiler.SHARED_OBJECT, objects, 'libab.so', output_dir='build'
+        )
+        assert link.inputs == tuple(objects)
+        jobs.run([link, *planned])
+        compiler.commit_jobs([link, *planned])
+        assert (tmp_path / 'build' / 'libab.so').exists()
+
+        assert compiler.plan_compile(['a.c', 'b.c'], output_dir='build') == []
+        assert not compiler.plan_link(
+            unix.Compiler.SHARED_OBJECT, objects, 'libab.so', output_dir='build'
+        )
+        # nor do objects about to be rebuilt look older than the output
+        os.utime('a.c', (time.time() + 10,) * 2)
+        planned = compiler.plan_compile(['a.c', 'b.c'], output_dir='build')
+        assert compiler.plan_link(
+            unix.Compiler.SHARED_OBJECT,
+            objects,
+            'libab.so',
+            output_dir='build',
+            after=planned,
+        )
+
+        # compile() runs the plan on an executor
+        compiler.force = True
+        compiler.executor = jobs.SerialExecutor()
+        monkeypatch.setattr(compiler, '_build_objects', None)
+        assert compiler.compile(['a.c'], output_dir='build') == objects[:1]
+        (tmp_path / 'bad.c').write_text('int bad(void) {\n', encoding='utf-8')
+        with pytest.raises(CompileError):
+            compiler.compile(['bad.c'], output_dir='build')
+
+    def test_plan_compile_override(self, tmp_path, monkeypatch):
+        """
+        Compilers overriding 'compile()' don't plan compiles that would
+        leave the override out.
+        """
+        monkeypatch.chdir(tmp_path)
+
+        class Compiler(unix.Compiler):
+            def compile(self, sources, *args, **kwargs):
+                return super().compile(sources, *args, **kwargs)
+
+        with pytest.raises(NotImplementedError):
+            Compiler().plan_compile(['a.c'], output_dir='build')
+        assert not (tmp_path / 'build').exists()
+
+    @pytest.mark.skipif('platform.system() == "Windows"')
+    def test_async(self, tmp_path, monkeypatch, capfd):
+        import asyncio
+
+        monkeypatch.chdir(tmp_path)
+        sources = []
+        for name in 'abcd':
+            (tmp_path / f'{name}.c').write_text(
+                f'int {name}(void) {{ return 1; }}\n', encoding='utf-8'
+            )
+            sources.append(f'{name}.c')
+        compiler = unix.Compiler()
+        compiler.parallel = 2
+
+        async def build():
+            objects = await compiler.acompile(sources, output_dir='build')
+            await compiler.alink(
+                unix.Compiler.SHARED_OBJECT, objects, 'lib.so', output_dir='build'
+            )
+            await compiler.acall([sys.executable, '-c', 'print("hello")'])
+            return objects
+
+        objects = asyncio.run(build())
+        assert all(os.path.exists(obj) for obj in objects)
+        assert (tmp_path / 'build' / 'lib.so').exists()
+        assert 'hello' in capfd.readouterr().out
+
+        (tmp_path / 'bad.c').write_text('int bad(void) {\n', encoding='utf-8')
+        with pytest.raises(CompileError):
+            asyncio.run(compiler.acompile(['bad.c'], output_dir='build'))
+        with pytest.raises(subprocess.CalledProcessError):
+            asyncio.run(compiler.acall([sys.executable, '-c', 'raise SystemExit(1)']))
@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from .. import unix, usage
+
+
+def test_run():
+    with usage.collect() as records:
+        result = usage.run(
+            [sys.executable, '-c', 'print("out"); raise SystemExit(2)'],
+            kind='link',
+            target='x',
+            capture_output=True,
+        )
+    assert result.returncode == 2
+    assert result.stdout.strip() == b'out'
+    (record,) = records
+    assert (record.kind, record.target, record.returncode) == ('link', 'x', 2)
+    assert record.wall > 0
+    if hasattr(os, 'wait4'):
+        assert record.max_rss > 0
+        assert record.user >= 0
+
+    usage.run([sys.executable, '-c', 'pass'])
+    assert len(records) == 1
+    assert not usage.active()
+
+
+@pytest.mark.skipif('platform.system() == "Windows"')
+def test_compiler(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'a.c').write_text('int a(void) { return 1; }\n', encoding='utf-8')
+    compiler = unix.Compiler()
+    with usage.collect() as records:
+        (obj,) = compiler.compile(['a.c'], output_dir='build')
+        compiler.create_static_lib([obj], 'a', output_dir='build')
+        compiler.link_shared_object([obj], 'liba.so', output_dir='build')
+        with pytest.raises(subprocess.CalledProcessError):
+            compiler.call([sys.executable, '-c', 'raise SystemExit(1)'])
+    kinds = [(record.kind, record.target) for record in records]
+    assert kinds[0] == ('compile', obj)
+    assert ('archive', os.path.join('build', 'liba.a')) in kinds
+    assert kinds[-2:] == [
+        ('link', os.path.join('build', 'liba.so')),
+        ('command', None),
+    ]
+
+
+@pytest.mark.skipif('platform.system() == "Windows"')
+def test_async(tmp_path, monkeypatch):
+    import asyncio
+
+    from ....spawn import spawn_async
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'a.c').write_text('int a(void) { return 1; }\n', encoding='utf-8')
+    compiler = unix.Compiler()
+
+    async def build():
+        (obj,) = await compiler.acompile(['a.c'], output_dir='build')
+        await compiler.alink(
+            unix.Compiler.SHARED_OBJECT,
+            [obj],
+            'liba.so',
+            output_dir='build',
+            build_temp='build',
+        )
+        await compiler.acall([sys.executable, '-c', 'pass'], kind='link', target='x')
+        await spawn_async([sys.executable, '-c', 'pass'])
+        return obj
+
+    with usage.collect() as records:
+        obj = asyncio.run(build())
+    kinds = [(record.kind, record.target) for record in records]
+    assert kinds == [
+        ('compile', obj),
+        ('link', os.path.join('build', 'liba.so')),
+        ('link', 'x'),
+        ('command', None),
+    ]
+    if hasattr(os, 'wait4'):
+        assert all(record.max_rss > 0 for record in records)
@@ -15,13 +15,16 @@ the "typical" Unix-style command-line C compiler:
 
 from __future__ import annotations
 
+import contextlib
 import itertools
 import os
 import re
 import shlex
+import shutil
 import subprocess
 import sys
 import sysconfig
+import tempfile
 from collections.abc import Iterable
 from typing import ClassVar
 
@@ -31,7 +34,7 @@ from .._modified import newer
 from ..logging import get_logger
 from ..platform import macos
 from ..platform.macos import compiler_fixup
-from . import base
+from . import base, cache, distributed
 from .base import _Macro, gen_lib_options, gen_preprocess_options
 from .errors import CompileError, LibError, LinkError
 
@@ -184,6 +187,88 @@ class Compiler(base.Compiler):
         dylib_lib_extension = ".dll"
         dylib_lib_format = "cyg%s%s"
 
+    track_dependencies: bool = True
+    """
+    Whether '_compile()' asks the compiler for a dependency file (``-MMD``)
+    next to each object, so unchanged objects can be skipped on later
+    builds. Set to False for compilers that don't understand ``-MMD -MF``.
+    """
+
+    _flag_probe_args: ClassVar[list[str]] = ['-Werror']
+
+    _config_var_names: ClassVar[tuple[str, ...]] = (
+        'CC',
+        'CXX',
+        'CFLAGS',
+        'CCSHARED',
+        'LDSHARED',
+        'LDCXXSHARED',
+        'SHLIB_SUFFIX',
+        'AR',
+        'ARFLAGS',
+    )
+    _config_environ: ClassVar[tuple[str, ...]] = (
+        *base.Compiler._config_environ,
+        'CC',
+        'CXX',
+        'CPP',
+        'CFLAGS',
+        'CXXFLAGS',
+        'CPPFLAGS',
+        'LDFLAGS',
+        'LDSHARED',
+        'LDCXXSHARED',
+        'AR',
+        'ARFLAGS',
+        'RANLIB',
+        'PATH',
+        # read by the macOS fixups
+        'ARCHFLAGS',
+        'MACOSX_DEPLOYMENT_TARGET',
+        'SDKROOT',
+        '_PYTHON_HOST_PLATFORM',
+    )
+
+    incremental_archives: bool = False
+    """
+    Whether 'create_static_lib()' updates an existing archive by passing
+    ``ar`` only the objects that changed, provided it holds the same
+    members otherwise (if not, it's rebuilt from scratch).
+    """
+
+    thin_archives: bool = False
+    """
+    Whether 'create_static_lib()' makes thin archives (``ar T``), which
+    refer to the objects where they are instead of copying them in, and
+    are updated incrementally. They need GNU ar or llvm-ar and a linker
+    that reads them (not the macOS linker), and only work for as long as
+    the objects stay in place.
+    """
+
+    use_linker: str | None = None
+    """
+    Linker for the compiler driver to run in 'link()', by the name
+    ``-fuse-ld`` takes (e.g. "lld", "mold" or "gold"), or "auto" for the
+    first of 'fast_linkers' that works. Whether the driver can use it is
+    probed once (see '_probe()'); if it can't, the default linker is used.
+    """
+
+    fast_linkers: ClassVar[tuple[str, ...]] = ('mold', 'lld', 'gold')
+    """Linkers "auto" tries for 'use_linker', fastest first."""
+
+    def __init__(self, verbose: bool = False, force: bool = False) -> None:
+        super().__init__(verbose, force=force)
+
+        # '_chosen_linkers': the linker '_use_linker_args()' picked for each
+        # linker command and candidate names, None if none of them works
+        self._chosen_linkers: dict[
+            tuple[tuple[str, ...], tuple[str, ...]], str | None
+        ] = {}
+
+        # '_library_index': the modification time and names listed in each
+        # directory searched by '_library_names()'
+        self._library_index: dict[str, tuple[int, set[str]]] = {}
+
     def configure_system(self) -> None:
         """Configure this compiler from the interpreter's build configuration.
 
@@ -191,8 +276,15 @@ class Compiler(base.Compiler):
         sysconfig when it was built -- honoring the usual environment-variable
         overrides (CC, CXX, CFLAGS, LDSHARED, AR, RANLIB, …) -- so extensions
         build consistently with the interpreter.
+
+        A compiler already configured for the same configuration (see
+        '_config_key()'), such as a copy 'new_compiler()' handed out, is
+        left as it is.
         """
         macos.customize_compiler(sysconfig.get_config_vars())
+        key = self._config_key()
+        if self._configured_key == key:
+            return
 
         (
             cc,
@@ -204,17 +296,7 @@ class Compiler(base.Compiler):
             shlib_suffix,
             ar,
             ar_flags,
-        ) = _require_config_vars(
-            'CC',
-            'CXX',
-            'CFLAGS',
-            'CCSHARED',
-            'LDSHARED',
-            'LDCXXSHARED',
-            'SHLIB_SUFFIX',
-            'AR',
-            'ARFLAGS',
-        )
+        ) = _require_config_vars(*self._config_var_names)
 
         cxxflags = cflags
 
@@ -265,6 +347,7 @@ class Compiler(base.Compiler):
             self.set_executables(ranlib=os.environ['RANLIB'])
 
         self.shared_lib_extension = shlib_suffix  # type: ignore[misc] # Assigning to ClassVar
+        self._configured_key = key
 
     def _fix_lib_args(self, libraries, library_dirs, runtime_library_dirs):
         """Remove standard library path from rpath"""
@@ -313,21 +396,299 @@ class Compiler(base.Compiler):
             self.mkpath(os.path.dirname(output_file))
 
         try:
-            self.call(pp_args)
+            self.call(
+                pp_args,
+                kind='preprocess',
+                target=os.fspath(output_file) if output_file else None,
+            )
         except (subprocess.CalledProcessError, OSError) as msg:
             raise CompileError(msg)
 
+    def _depfile_args(self, obj, args):
+        """
+        Return the options that make the compiler record the headers
+        'obj' was built from, for the incremental checks in 'compile()'.
+
+        Universal builds (more than one ``-arch``) are left alone, as some
+        drivers refuse a single depfile for several architectures.
+
+        >>> Compiler()._depfile_args('build/foo.o', ['-O2'])
+        ['-MMD', '-MF', 'build/foo.d']
+        >>> Compiler()._depfile_args('foo.o', ['-arch', 'x86_64', '-arch', 'arm64'])
+        []
+        """
+        if not self.track_dependencies or args.count('-arch') > 1:
+            return []
+        return ['-MMD', '-MF', self._depfile_name(obj)]
+
+    def _compiler_for(self, src, cc_args, extra_postargs):
+        """Return the compiler command for 'src', fixed up for these args."""
+        compiler = (
+            self.compiler_so_cxx
+            if self.detect_language(src) == 'c++'
+            else self.compiler_so
+        )
+        return compiler_fixup(compiler, cc_args + extra_postargs)
+
+    def _compile_command(self, obj, src, cc_args, extra_postargs):
+        compiler = self._compiler_for(src, cc_args, extra_postargs)
+        dep_args = self._depfile_args(obj, compiler + cc_args + extra_postargs)
+        return compiler + cc_args + dep_args + [src, '-o', obj] + extra_postargs
+
     def _compile(self, obj, src, ext, cc_args, extra_postargs, pp_opts):
-        compiler_so = compiler_fixup(self.compiler_so, cc_args + extra_postargs)
-        compiler_so_cxx = compiler_fixup(self.compiler_so_cxx, cc_args + extra_postargs)
         try:
-            if self.detect_language(src) == 'c++':
-                self.call(compiler_so_cxx + cc_args + [src, '-o', obj] + extra_postargs)
-            else:
-                self.call(compiler_so + cc_args + [src, '-o', obj] + extra_postargs)
+            self.call(
+                self._compile_command(obj, src, cc_args, extra_postargs),
+                launch=True,
+                kind='compile',
+                target=obj,
+            )
         except (subprocess.CalledProcessError, OSError) as msg:
             raise CompileError(msg)
 
+    def _compile_job(self, obj, src, ext, cc_args, extra_postargs, pp_opts):
+        if type(self)._compile is not Compiler._compile:
+            # what a subclass's own '_compile()' runs isn't known
+            return None
+        cmd = self._compile_command(obj, src, cc_args, extra_postargs)
+        outputs = [obj]
+        if '-MF' in cmd:
+            outputs.append(self._depfile_name(obj))
+        return self._job(cmd, launch=True, inputs=(src,), outputs=tuple(outputs))
+
+    _path_options = ('-I', '-iquote', '-isystem', '-idirafter', '-include', '-imacros')
+
+    @classmethod
+    def _absolute_paths(cls, args):
+        """
+        Make the relative paths given to the search path and include
+        options in 'args' absolute, so they still apply from another
+        directory.
+
+        >>> Compiler._absolute_paths(['-I.', '-O2', '-include', 'x.h'])[1:3]
+        ['-O2', '-include']
+        >>> Compiler._absolute_paths(['-I.'])[0] == '-I' + os.path.abspath('.')
+        True
+        """
+        result = []
+        args = iter(args)
+        for arg in args:
+            option = next(
+                (opt for opt in cls._path_options if arg.startswith(opt)), None
+            )
+            if option is None:
+                result.append(arg)
+                continue
+            path = arg[len(option) :]
+            if not path:
+                result.append(arg)
+                path = next(args, '')
+                option = ''
+            if path and os.path.exists(path):
+                path = os.path.abspath(path)
+            result.append(option + path)
+        return result
+
+    def _compile_batch(self, jobs, extra_postargs, pp_opts):
+        """
+        Compile the sources in one process from a scratch directory next to
+        the first object (as ``cc -c`` without ``-o`` writes each object,
+        and dependency file, into the working directory), then move the
+        results into place.
+        """
+        if type(self)._compile is not Compiler._compile:
+            # subclasses with their own '_compile()' compile file by file
+            return False
+        obj, src, _, cc_args = jobs[0]
+        compiler = self._compiler_for(src, cc_args, extra_postargs)
+        dep_args = ['-MMD'] if self._depfile_args(obj, compiler + cc_args) else []
+        cmd = [
+            *compiler,
+            *self._absolute_paths(cc_args),
+            *dep_args,
+            *(os.path.abspath(src) for _, src, _, _ in jobs),
+            *self._absolute_paths(extra_postargs),
+        ]
+        self.mkpath(os.path.dirname(obj) or os.curdir)
+        workdir = tempfile.mkdtemp(prefix='.batch-', dir=os.path.dirname(obj) or None)
+        try:
+            with base._buffered_output() as results:
+                try:
+                    self.call(cmd, launch=True, kind='compile', cwd=workdir)
+                    for obj, src, _, _ in jobs:
+                        stem = os.path.join(
+                            workdir, os.path.splitext(os.path.basename(src))[0]
+                        )
+                        self.mkpath(os.path.dirname(obj) or os.curdir)
+                        os.replace(stem + self.obj_extension, obj)
+                        if dep_args:
+                            os.replace(stem + '.d', self._depfile_name(obj))
+                except (subprocess.CalledProcessError, OSError):
+                    log.info("batch failed; compiling its sources one by one")
+                    results.clear()
+                    return False
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        return True
+
+    def _precompile_header(self, header, output_dir, sources, cc_args, extra_postargs):
+        """
+        Build 'header' into a ``.gch`` for each of C and C++ among
+        'sources', and have the sources ``-include`` it.
+
+        Each build lives under ``<output_dir>/pch/<key>``, where the key
+        hashes the header and the full command line ('extra_postargs'
+        included), so changing a macro, include dir, or other option gets a
+        fresh build rather than a stale one. The build holds a stub that includes 'header', and the
+        compiler picks up the ``.gch`` next to it (or, should that not be
+        valid, parses the stub). It's rebuilt when the header, or anything
+        recorded in its dependency file, changes.
+
+        Universal builds (more than one ``-arch``) don't get one, as the
+        drivers can't precompile for several architectures at once.
+        """
+        if (cc_args + extra_postargs).count('-arch') > 1:
+            return {}
+        if os.path.isfile(header):
+            include = f'#include "{os.path.abspath(header)}"\n'
+        else:
+            include = f'#include <{header}>\n'
+        languages = {self.detect_language(src) for src in sources}
+        lang_args = {}
+        for lang in sorted(languages & {'c', 'c++'}):
+            compiler = compiler_fixup(
+                self.compiler_so_cxx if lang == 'c++' else self.compiler_so,
+                cc_args + extra_postargs,
+            )
+            command = compiler + cc_args + extra_postargs
+            key = cache.digest(include, lang, '\0'.join(command))[:16]
+            stub = os.path.join(
+                output_dir or os.curdir, 'pch', key, os.path.basename(header)
+            )
+            gch = stub + '.gch'
+            if self.force or not self._object_up_to_date(gch, stub, []):
+                self.mkpath(os.path.dirname(stub))
+                with open(stub, 'w', encoding='utf-8') as f:
+                    f.write(include)
+                args = ['-x', f'{lang}-header', stub, '-o', gch]
+                dep_args = self._depfile_args(gch, compiler + cc_args)
+                try:
+                    self.call(
+                        compiler + cc_args + dep_args + args + extra_postargs,
+                        launch=True,
+                        kind='compile',
+                        target=gch,
+                    )
+                except (subprocess.CalledProcessError, OSError) as msg:
+                    raise CompileError(msg)
+            lang_args[lang] = ['-include', stub]
+        return lang_args
+
+    def _cache_key(self, obj, src, ext, cc_args, extra_postargs):
+        """
+        Key the object cache on the source as preprocessed with the same
+        command line (so edits to any header count), plus that command line,
+        the compiler binary, and the Python ABI.
+        """
+        compiler = self._compiler_for(src, cc_args, extra_postargs)
+        preprocessed = self._preprocessed(compiler, src, cc_args, extra_postargs)
+        if preprocessed is None:
+            return None
+        return cache.digest(
+            preprocessed,
+            '\0'.join(compiler + cc_args + extra_postargs),
+            cache.compiler_identity(compiler[0]),
+            cache.python_abi(),
+        )
+
+    def _preprocessed(self, compiler, src, cc_args, extra_postargs):
+        """
+        Return 'src' as preprocessed by the command line that compiles it,
+        or None if that fails (leaving the compile itself to report it).
+        """
+        pp_args = [arg for arg in cc_args if arg != '-c']
+        try:
+            return subprocess.run(
+                compiler + pp_args + ['-E', src] + extra_postargs,
+                env=macos.inject_ver(None),
+                capture_output=True,
+                check=True,
+            ).stdout
+        except (subprocess.CalledProcessError, OSError):
+            return None
+
+    def _compile_remote(self, obj, src, cc_args, extra_postargs):
+        """
+        Preprocess 'src' here (writing its depfile as a compile would),
+        have one of 'compile_workers' compile the result with the rest of
+        the command line, and write the object it sends back.
+
+        Universal builds (more than one ``-arch``) are compiled here, as
+        they can't be preprocessed into a single translation unit, as are
+        sources of compilers overriding '_compile()'.
+        """
+        lang = self.detect_language(src) or 'c'
+        if (
+            type(self)._compile is not Compiler._compile
+            or lang not in distributed.languages
+            or cc_args.count('-arch') > 1
+        ):
+            return False
+        compiler = self._compiler_for(src, cc_args, extra_postargs)
+        dep_args = self._depfile_args(obj, compiler + cc_args + extra_postargs)
+        preprocessed = self._preprocessed(
+            compiler, src, cc_args + dep_args, extra_postargs
+        )
+        if preprocessed is None:
+            return False
+        # workers run the driver of that name found on their PATH
+        argv = [
+            os.path.basename(compiler[0]),
+            *compiler[1:],
+            *self._compile_only(cc_args + extra_postargs),
+        ]
+        compiled = self.compile_workers.compile(argv, lang, preprocessed)
+        if compiled is None:
+            return False
+        if compiled.result.returncode:
+            log.warning("compiling %s failed on a worker; compiling it here", src)
+            return False
+        log.info("%s (on a worker)", subprocess.list2cmdline([*argv, src, '-o', obj]))
+        self.mkpath(os.path.dirname(obj))
+        with open(obj, 'wb') as f:
+            f.write(compiled.object)
+        base._replay([compiled.result])
+        return True
+
+    @classmethod
+    def _compile_only(cls, args):
+        """
+        Drop the options only the preprocessor uses from 'args', as the
+        sources they'd apply to are already preprocessed.
+
+        >>> Compiler._compile_only(['-DX=1', '-I', 'inc', '-O2', '-U', 'Y', '-c'])
+        ['-O2', '-c']
+        """
+        result = []
+        args = iter(args)
+        for arg in args:
+            option = next(
+                (
+                    opt
+                    for opt in ('-D', '-U', *cls._path_options)
+                    if arg.startswith(opt)
+                ),
+                None,
+            )
+            if option is None:
+                result.append(arg)
+            elif arg == option:
+                next(args, None)
+        return result
+
+    def _cache_files(self, obj):
+        return [obj, self._depfile_name(obj)]
+
     def create_static_lib(
         self, objects, output_libname, output_dir=None, debug=False, target_lang=None
     ):
@@ -337,7 +698,17 @@ class Compiler(base.Compiler):
 
         if self._need_link(objects, output_filename):
             self.mkpath(os.path.dirname(output_filename))
-            self.call(self.archiver + [output_filename] + objects + self.objects)
+            archiver = self.archiver
+            members = objects + self.objects
+            if self.thin_archives and len(archiver) > 1:
+                archiver = [archiver[0], archiver[1] + 'T', *archiver[2:]]
+            if self.incremental_archives or self.thin_archives:
+                members = self._archive_updates(output_filename, members)
+            self.call(
+                archiver + [output_filename] + members,
+                kind='archive',
+                target=output_filename,
+            )
 
             # Not many Unices required ranlib anymore -- SunOS 4.x is, I
             # think the only major Unix that does.  Maybe we need some
@@ -346,12 +717,43 @@ class Compiler(base.Compiler):
             # it for us, hence the check for leading colon.
             if self.ranlib:
                 try:
-                    self.call(self.ranlib + [output_filename])
+                    self.call(
+                        self.ranlib + [output_filename],
+                        kind='archive',
+                        target=output_filename,
+                    )
                 except (subprocess.CalledProcessError, OSError) as msg:
                     raise LibError(msg)
         else:
             log.debug("skipping %s (up-to-date)", output_filename)
 
+    def _archive_updates(self, output_filename, members):
+        """
+        Return which of 'members' to pass ``ar`` to update the archive
+        'output_filename': those newer than it, if it already holds just
+        'members', in order; otherwise all of them, after removing it.
+        """
+        if self.thin_archives:
+            names = [os.path.abspath(member) for member in members]
+        else:
+            names = [os.path.basename(member) for member in members]
+        try:
+            listed = subprocess.run(
+                [self.archiver[0], 't', output_filename],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.splitlines()
+        except (subprocess.CalledProcessError, OSError):
+            listed = None
+        if self.thin_archives and listed is not None:
+            listed = [os.path.abspath(name) for name in listed]
+        if listed == names and len(set(names)) == len(names):
+            return [member for member in members if newer(member, output_filename)]
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(output_filename)
+        return members
+
     def link(
         self,
         target_desc,
@@ -368,6 +770,101 @@ class Compiler(base.Compiler):
         build_temp=None,
         target_lang=None,
     ):
+        cmd, objects, output_filename = self._link_command(
+            target_desc,
+            objects,
+            output_filename,
+            output_dir,
+            libraries,
+            library_dirs,
+            runtime_library_dirs,
+            debug,
+            extra_preargs,
+            extra_postargs,
+            target_lang,
+        )
+        if self._need_link(objects, output_filename, cmd, build_temp):
+            self.mkpath(os.path.dirname(output_filename))
+            try:
+                self.call(
+                    cmd, launch=self.launch_link, kind='link', target=output_filename
+                )
+            except (subprocess.CalledProcessError, OSError) as msg:
+                raise LinkError(msg)
+            self._record_link(objects, output_filename, cmd, build_temp)
+        else:
+            log.debug("skipping %s (up-to-date)", output_filename)
+
+    def plan_link(
+        self,
+        target_desc,
+        objects,
+        output_filename,
+        output_dir=None,
+        libraries=None,
+        library_dirs=None,
+        runtime_library_dirs=None,
+        export_symbols=None,
+        debug=False,
+        extra_preargs=None,
+        extra_postargs=None,
+        build_temp=None,
+        target_lang=None,
+        *,
+        after=(),
+    ):
+        if type(self).link is not Compiler.link:
+            raise NotImplementedError(f"{type(self).__name__} can't plan links")
+        cmd, objects, output_filename = self._link_command(
+            target_desc,
+            objects,
+            output_filename,
+            output_dir,
+            libraries,
+            library_dirs,
+            runtime_library_dirs,
+            debug,
+            extra_preargs,
+            extra_postargs,
+            target_lang,
+        )
+        built = {output for job in after for output in job.outputs}
+        pending = not built.isdisjoint(objects)
+        if not self._need_link(
+            objects, output_filename, cmd, build_temp, pending=pending
+        ):
+            return []
+        return [
+            self._job(
+                cmd,
+                launch=self.launch_link,
+                inputs=tuple(objects),
+                outputs=(output_filename,),
+                depends=tuple(self.objects),
+                kind='link',
+                error=LinkError,
+                build_temp=None if build_temp is None else os.fspath(build_temp),
+            )
+        ]
+
+    def _link_command(
+        self,
+        target_desc,
+        objects,
+        output_filename,
+        output_dir,
+        libraries,
+        library_dirs,
+        runtime_library_dirs,
+        debug,
+        extra_preargs,
+        extra_postargs,
+        target_lang,
+    ):
+        """
+        Return the command linking 'objects' as described to 'link()',
+        along with the fixed up objects and output filename.
+        """
         objects, output_dir = self._fix_object_args(objects, output_dir)
         fixed_args = self._fix_lib_args(libraries, library_dirs, runtime_library_dirs)
         libraries, library_dirs, runtime_library_dirs = fixed_args
@@ -378,43 +875,90 @@ class Compiler(base.Compiler):
         if output_dir is not None:
             output_filename = os.path.join(output_dir, output_filename)
 
-        if self._need_link(objects, output_filename):
-            ld_args = objects + self.objects + lib_opts + ['-o', output_filename]
-            if debug:
-                ld_args[:0] = ['-g']
-            if extra_preargs:
-                ld_args[:0] = extra_preargs
-            if extra_postargs:
-                ld_args.extend(extra_postargs)
-            self.mkpath(os.path.dirname(output_filename))
-            try:
-                # Select a linker based on context: linker_exe when
-                # building an executable or linker_so (with shared options)
-                # when building a shared library.
-                building_exe = target_desc == base.Compiler.EXECUTABLE
-                target_cxx = target_lang == "c++"
-                linker = (
-                    (self.linker_exe_cxx if target_cxx else self.linker_exe)
-                    if building_exe
-                    else (self.linker_so_cxx if target_cxx else self.linker_so)
-                )[:]
-
-                if target_cxx and self.compiler_cxx:
-                    env, linker_ne = _split_env(linker)
-                    aix, linker_na = _split_aix(linker_ne)
-                    _, compiler_cxx_ne = _split_env(self.compiler_cxx)
-                    _, linker_exe_ne = _split_env(self.linker_exe_cxx)
-
-                    params = _linker_params(linker_na, linker_exe_ne)
-                    linker = env + aix + compiler_cxx_ne + params
-
-                linker = compiler_fixup(linker, ld_args)
-
-                self.call(linker + ld_args)
-            except (subprocess.CalledProcessError, OSError) as msg:
-                raise LinkError(msg)
-        else:
-            log.debug("skipping %s (up-to-date)", output_filename)
+        ld_args = objects + self.objects + lib_opts + ['-o', output_filename]
+        if debug:
+            ld_args[:0] = ['-g']
+        if extra_preargs:
+            ld_args[:0] = extra_preargs
+        if extra_postargs:
+            ld_args.extend(extra_postargs)
+
+        # Select a linker based on context: linker_exe when
+        # building an executable or linker_so (with shared options)
+        # when building a shared library.
+        building_exe = target_desc == base.Compiler.EXECUTABLE
+        target_cxx = target_lang == "c++"
+        linker = (
+            (self.linker_exe_cxx if target_cxx else self.linker_exe)
+            if building_exe
+            else (self.linker_so_cxx if target_cxx else self.linker_so)
+        )[:]
+
+        if target_cxx and self.compiler_cxx:
+            env, linker_ne = _split_env(linker)
+            aix, linker_na = _split_aix(linker_ne)
+            _, compiler_cxx_ne = _split_env(self.compiler_cxx)
+            _, linker_exe_ne = _split_env(self.linker_exe_cxx)
+
+            params = _linker_params(linker_na, linker_exe_ne)
+            linker = env + aix + compiler_cxx_ne + params
+
+        linker += self._use_linker_args(linker)
+        linker = compiler_fixup(linker, ld_args)
+        return linker + ld_args, objects, output_filename
+
+    def _use_linker_args(self, linker: list[str]) -> list[str]:
+        """Return the ``-fuse-ld`` option selecting 'use_linker' for the
+        linker command 'linker', if the driver can use it.
+        """
+        if not self.use_linker or any(arg.startswith('-fuse-ld=') for arg in linker):
+            return []
+        names = self.fast_linkers if self.use_linker == 'auto' else [self.use_linker]
+        chosen = self._chosen_linkers
+        key = (tuple(linker), tuple(names))
+        if key not in chosen:
+            identity = self._probe_identity()
+            prober = self._prober()
+            chosen[key] = next(
+                (
+                    name
+                    for name in names
+                    if self._probe(
+                        {name: cache.digest('linker', name, repr(linker), identity)},
+                        lambda names: prober._try_linker(linker, names[0]),
+                    )[name]
+                ),
+                None,
+            )
+            if chosen[key] is None:
+                log.info("no linker of %s works; using the default", ', '.join(names))
+            else:
+                log.info("linking with %s", chosen[key])
+        return [f'-fuse-ld={chosen[key]}'] if chosen[key] else []
+
+    def _try_linker(self, linker: list[str], name: str) -> bool:
+        """Link a minimal program with 'linker' told to use 'name'."""
+        tmp_dir = tempfile.mkdtemp(prefix='use_linker-')
+        try:
+            fname = os.path.join(tmp_dir, 'probe.c')
+            with open(fname, 'w', encoding='utf-8') as f:
+                f.write("int main (void) { return 0; }\n")
+            output = os.path.join(tmp_dir, 'probe')
+            with base._buffered_output() as results:
+                try:
+                    objects = self.compile([fname], output_dir=tmp_dir)
+                    self.call(
+                        [*linker, f'-fuse-ld={name}', *objects, '-o', output],
+                        kind='link',
+                        target=output,
+                    )
+                except (CompileError, subprocess.CalledProcessError, OSError):
+                    return False
+                finally:
+                    results.clear()
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return True
 
     # -- Miscellaneous methods -----------------------------------------
     # These are all used by the 'gen_lib_options() function, in
@@ -513,16 +1057,51 @@ class Compiler(base.Compiler):
         assume that *all* Unix C compilers do,
         ignoring even GCC's "-static" option.
         """
-        lib_names = (
+        lib_names = [
             self.library_filename(lib, lib_type=type)
             for type in ('dylib', 'xcode_stub', 'shared', 'static')
-        )
+        ]
 
         roots = map(self._library_root, dirs)
 
-        searched = itertools.starmap(os.path.join, itertools.product(roots, lib_names))
-
-        found = filter(os.path.exists, searched)
+        searched = itertools.chain.from_iterable(
+            self._search_library_dir(root, lib_names) for root in roots
+        )
 
         # Return None if it could not be found in any dir.
-        return next(found, None)
+        return next(searched, None)
+
+    def _search_library_dir(self, root, lib_names):
+        """
+        Yield the paths of those of 'lib_names' that exist in 'root',
+        consulting the listing of 'root' (see '_library_names()') rather
+        than the filesystem where possible.
+        """
+        names = self._library_names(root)
+        for name in lib_names:
+            if names is not None and not os.path.dirname(name) and name not in names:
+                continue
+            path = os.path.join(root, name)
+            if os.path.exists(path):
+                yield path
+
+    def _library_names(self, root):
+        """
+        Return the names in the directory 'root', or None if it can't be
+        listed.  The listing is kept for later lookups (across all the
+        extensions built with this compiler) until the directory's
+        modification time changes.
+        """
+        index = self._library_index
+        try:
+            mtime = os.stat(root).st_mtime_ns
+        except OSError:
+            return None
+        cached = index.get(root)
+        if cached is None or cached[0] != mtime:
+            try:
+                with os.scandir(root) as entries:
+                    cached = index[root] = (mtime, {entry.name for entry in entries})
+            except OSError:
+                return None
+        return cached[1]
@@ -0,0 +1,172 @@
+"""Account for the resources used by the commands a build runs.
+
+While a hook is registered (see 'collect()' and 'add_hook()'), each command
+run by 'Compiler.call()' or ``distutils.spawn.spawn()`` (or their asyncio
+counterparts) in this process is measured: its wall time and, where ``os.wait4`` is available, the CPU time
+and peak memory of the process, reported to the hooks as a 'Usage' record
+tagged with the kind of command and the file it produces.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import dataclasses
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+
+_hooks: list[Callable[[Usage], object]] = []
+_hooks_lock = threading.Lock()
+
+
+@dataclasses.dataclass(frozen=True)
+class Usage:
+    """The resources one command used."""
+
+    argv: tuple[str, ...]
+    """the command line"""
+
+    kind: str
+    """what the command did: "compile", "preprocess", "link", "archive",
+    or "command" for anything else"""
+
+    target: str | None
+    """the file the command produced, if known"""
+
+    returncode: int
+    """the command's exit status"""
+
+    wall: float
+    """elapsed time, in seconds"""
+
+    user: float | None = None
+    """CPU time spent in user mode, in seconds, if measured"""
+
+    system: float | None = None
+    """CPU time spent in the kernel, in seconds, if measured"""
+
+    max_rss: int | None = None
+    """peak resident set size, in bytes, if measured"""
+
+
+def add_hook(hook: Callable[[Usage], object]) -> None:
+    """Have 'hook' called with the 'Usage' of each command run from now on,
+    from the thread that ran it.
+    """
+    with _hooks_lock:
+        _hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[Usage], object]) -> None:
+    """Stop calling 'hook'."""
+    with _hooks_lock:
+        _hooks.remove(hook)
+
+
+@contextlib.contextmanager
+def collect() -> Iterator[list[Usage]]:
+    """Collect the 'Usage' of the commands run within the block into the
+    list this yields.
+    """
+    records: list[Usage] = []
+    add_hook(records.append)
+    try:
+        yield records
+    finally:
+        remove_hook(records.append)
+
+
+def active() -> bool:
+    """Return whether any hook wants to know about commands."""
+    return bool(_hooks)
+
+
+def run(
+    cmd: Sequence[str | os.PathLike[str]],
+    *,
+    kind: str = 'command',
+    target: str | None = None,
+    capture_output: bool = False,
+    **kwargs,
+) -> subprocess.CompletedProcess:
+    """
+    Run 'cmd' as ``subprocess.run()`` would (without 'check'), and report
+    what it used to the hooks.
+
+    Output is captured through temporary files rather than pipes, so the
+    child can be waited for with ``os.wait4``, which gives its resource
+    usage.
+    """
+    with contextlib.ExitStack() as stack:
+        if capture_output:
+            kwargs['stdout'] = stack.enter_context(tempfile.TemporaryFile())
+            kwargs['stderr'] = stack.enter_context(tempfile.TemporaryFile())
+        start = time.perf_counter()
+        process = subprocess.Popen(cmd, **kwargs)
+        try:
+            rusage = _wait(process)
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        wall = time.perf_counter() - start
+        stdout = stderr = None
+        if capture_output:
+            stdout, stderr = (_read(kwargs[name]) for name in ('stdout', 'stderr'))
+    report(
+        Usage(
+            tuple(map(os.fsdecode, cmd)),
+            kind,
+            target,
+            process.returncode,
+            wall,
+            *rusage,
+        )
+    )
+    return subprocess.CompletedProcess(process.args, process.returncode, stdout, stderr)
+
+
+async def arun(
+    cmd: Sequence[str | os.PathLike[str]], **kwargs
+) -> subprocess.CompletedProcess:
+    """
+    Run 'cmd' as 'run()' does, from the running event loop.
+
+    The command runs on a thread, as ``os.wait4`` blocks, and the loop
+    would otherwise reap the child itself, losing its resource usage.
+    """
+    return await asyncio.to_thread(run, cmd, **kwargs)
+
+
+def _wait(process: subprocess.Popen) -> tuple:
+    """Wait for 'process' to exit, and return its CPU times and peak RSS
+    if the platform can tell.
+    """
+    if not hasattr(os, 'wait4'):
+        process.wait()
+        return ()
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in bytes on macOS, and in kilobytes elsewhere
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return rusage.ru_utime, rusage.ru_stime, rusage.ru_maxrss * scale
+
+
+def _read(file) -> bytes:
+    file.seek(0)
+    return file.read()
+
+
+def report(record: Usage) -> None:
+    """Hand 'record' to the hooks, e.g. for a command run in another
+    process.
+    """
+    with _hooks_lock:
+        hooks = list(_hooks)
+    for hook in hooks:
+        hook(record)
@@ -167,7 +167,12 @@ class Compiler(unix.Compiler):
         local_args.extend(cc_args)
 
         try:
-            self.call(compiler + local_args + [src, '-o', obj] + extra_postargs)
+            self.call(
+                compiler + local_args + [src, '-o', obj] + extra_postargs,
+                launch=True,
+                kind='compile',
+                target=obj,
+            )
         except (subprocess.CalledProcessError, OSError) as msg:
             raise CompileError(msg)
 
@@ -0,0 +1,45 @@
+"""Read the Make-style dependency files emitted by ``-MMD -MF``."""
+
+from __future__ import annotations
+
+import os
+import re
+
+_continuation_re = re.compile(r'\\\r?\n')
+_separator_re = re.compile(r'(?<!\\)\s+')
+
+
+def parse(text: str) -> list[str]:
+    r"""
+    Return the prerequisites named in the Make rules in ``text``.
+
+    >>> parse('foo.o: foo.c \\\n  include/foo.h bar\\ baz.h\n')
+    ['foo.c', 'include/foo.h', 'bar baz.h']
+    >>> parse('C:\\build\\foo.o: C:\\src\\foo.c\n')
+    ['C:\\src\\foo.c']
+    >>> parse('')
+    []
+    """
+    prereqs = []
+    for line in _continuation_re.sub(' ', text).splitlines():
+        _target, sep, rest = line.partition(': ')
+        if not sep:
+            continue
+        prereqs.extend(
+            word.replace('\\ ', ' ').replace('$$', '$')
+            for word in _separator_re.split(rest.strip())
+            if word
+        )
+    return prereqs
+
+
+def read(filename: str | os.PathLike[str]) -> list[str] | None:
+    """
+    Return the prerequisites recorded in the depfile ``filename``, or None
+    if it doesn't exist or can't be read.
+    """
+    try:
+        with open(filename, encoding='utf-8', errors='surrogateescape') as f:
+            return parse(f.read())
+    except OSError:
+        return None
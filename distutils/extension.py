@@ -128,6 +128,29 @@ class Extension:
     build process, but simply not install the failing extension.
     """
 
+    unity_build: bool = False
+    """
+    compile the C and C++ 'sources' in batches: generated files that each
+    #include up to 'unity_batch_size' of them, so a large number of small
+    sources costs a few compiler processes instead of one each
+    """
+
+    unity_batch_size: int = 16
+    """maximum number of sources included by each batch of a unity build"""
+
+    unity_exclude: list[str] = field(default_factory=list)
+    """
+    sources (or glob patterns matching them) to compile on their own in a
+    unity build, e.g. those defining static names that clash with others
+    """
+
+    precompiled_header: str | None = None
+    """
+    header (a path, or a name found on the include path, e.g. "Python.h")
+    that every source includes first; compilers that support it precompile
+    it once and reuse it for all of 'sources'
+    """
+
     def __post_init__(self):
         if not isinstance(self.name, str):
             raise TypeError("'name' must be a string")
@@ -6,6 +6,7 @@ specific functions for launching another program in a sub-process.
 
 from __future__ import annotations
 
+import asyncio
 import contextlib
 import os
 import subprocess
@@ -14,6 +15,7 @@ import warnings
 from collections.abc import MutableSequence
 
 from ._log import log
+from .compilers.C import usage
 from .errors import DistutilsExecError
 
 
@@ -42,7 +44,30 @@ def spawn(cmd: MutableSequence[bytes | str | os.PathLike[str]], **kwargs) -> Non
     """
     log.info(subprocess.list2cmdline(cmd))
     with _translate_errors(cmd):
-        subprocess.check_call(cmd, **kwargs)
+        if usage.active():
+            usage.run(cmd, **kwargs).check_returncode()
+        else:
+            subprocess.check_call(cmd, **kwargs)
+
+
+async def spawn_async(
+    cmd: MutableSequence[bytes | str | os.PathLike[str]], **kwargs
+) -> None:
+    """Run 'cmd' as 'spawn()' does, as a subprocess of the running event loop.
+
+    Any keyword arguments are passed through to
+    ``asyncio.create_subprocess_exec``.  Raise DistutilsExecError if running
+    the program fails in any way; just return on success.
+    """
+    log.info(subprocess.list2cmdline(cmd))
+    with _translate_errors(cmd):
+        if usage.active():
+            (await usage.arun(cmd, **kwargs)).check_returncode()
+            return
+        process = await asyncio.create_subprocess_exec(*cmd, **kwargs)
+        returncode = await process.wait()
+        if returncode:
+            raise subprocess.CalledProcessError(returncode, cmd)
 
 
 def find_executable(executable: str, path: str | None = None) -> str | None:
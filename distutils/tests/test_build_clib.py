@@ -132,3 +132,28 @@ class TestBuildCLib(support.TempdirManager):
 
         # let's check the result
         assert 'libfoo.a' in os.listdir(build_temp)
+
+    @pytest.mark.skipif('platform.system() == "Windows"')
+    def test_run_process_pool(self):
+        pkg_dir, dist = self.create_dist()
+        cmd = build_clib(dist)
+
+        shared_c = os.path.join(pkg_dir, 'shared.c')
+        self.write_file(shared_c, 'int shared(void) { return 0; }\n')
+        cmd.libraries = []
+        for name in ('foo', 'bar', 'baz'):
+            c_file = os.path.join(pkg_dir, f'{name}.c')
+            self.write_file(c_file, f'int {name}(void) {{ return 1; }}\n')
+            cmd.libraries.append((name, {'sources': [c_file, shared_c]}))
+
+        build_temp = os.path.join(pkg_dir, 'build')
+        cmd.build_temp = cmd.build_clib = build_temp
+        cmd.parallel = 2
+        cmd.process_pool = True
+
+        ccmd = missing_compiler_executable()
+        if ccmd is not None:
+            self.skipTest(f'The {ccmd!r} command is not found')
+
+        cmd.run()
+        assert {'libfoo.a', 'libbar.a', 'libbaz.a'} <= set(os.listdir(build_temp))
@@ -1,6 +1,9 @@
 import contextlib
 import glob
 import importlib
+import json
+import logging
+import multiprocessing
 import os.path
 import platform
 import re
@@ -12,11 +15,15 @@ import tempfile
 import textwrap
 import time
 from distutils import sysconfig
+from distutils.ccompiler import CCompiler, new_compiler
+from distutils.command import _processes
 from distutils.command.build_ext import build_ext
+from distutils.compilers.C import jobs
 from distutils.compilers.errors import PlatformError
 from distutils.core import Distribution
 from distutils.errors import (
     CompileError,
+    DistutilsExecError,
     DistutilsSetupError,
     UnknownFileError,
 )
@@ -88,6 +95,25 @@ def extension_redirect(mod, path):
     # TODO: can the file be scheduled for deletion?
 
 
+class failing_build_ext(build_ext):
+    """Fail to build extensions in ways a worker process can't report."""
+
+    def build_extension(self, ext):
+        if ext.name == 'crash':
+            os._exit(1)
+        if ext.name == 'unpicklable':
+            raise CompileError(lambda: None)
+        super().build_extension(ext)
+
+
+class macro_build_ext(build_ext):
+    """Configure the compiler further, as setup scripts commonly do."""
+
+    def build_extensions(self):
+        self.compiler.define_macro('FROM_SUBCLASS')
+        super().build_extensions()
+
+
 @pytest.mark.usefixtures('user_site_dir')
 class TestBuildExt(TempdirManager):
     def build_ext(self, *args, **kwargs):
@@ -388,6 +414,21 @@ class TestBuildExt(TempdirManager):
         cmd.ensure_finalized()
         assert cmd.get_source_files() == ['xxx']
 
+    def test_get_source_files_headers(self, monkeypatch):
+        monkeypatch.chdir(self.mkdtemp())
+        os.mkdir('src')
+        self.write_file(('src', 'foo.c'), '#include "foo.h"\n#include <Python.h>\n')
+        self.write_file(('src', 'foo.h'), '')
+        modules = [Extension('foo', [os.path.join('src', 'foo.c')])]
+        dist = Distribution({'name': 'xx', 'ext_modules': modules})
+        cmd = self.build_ext(dist)
+        cmd.ensure_finalized()
+        # project headers are listed, Python's aren't
+        assert cmd.get_source_files() == [
+            os.path.join('src', 'foo.c'),
+            os.path.join('src', 'foo.h'),
+        ]
+
     def test_unicode_module_names(self):
         modules = [
             Extension('foo', ['aaa'], optional=False),
@@ -488,6 +529,302 @@ class TestBuildExt(TempdirManager):
         lastdir = os.path.split(path)[-1]
         assert lastdir == 'bar'
 
+    def test_ext_cache(self, monkeypatch):
+        missing_compiler_executable()
+        tmp_dir = self.mkdtemp()
+        c_file = os.path.join(tmp_dir, 'foo.c')
+        self.write_file(c_file, 'void PyInit_foo(void) {}\n')
+        cache_dir = os.path.join(tmp_dir, 'cache')
+
+        def build(name, **ext_args):
+            ext = Extension('foo', [c_file], **ext_args)
+            dist = Distribution({'name': 'xx', 'ext_modules': [ext]})
+            cmd = self.build_ext(dist)
+            fixup_build_ext(cmd)
+            cmd.build_lib = os.path.join(tmp_dir, name, 'lib')
+            cmd.build_temp = os.path.join(tmp_dir, name, 'temp')
+            cmd.ext_cache = cache_dir
+            cmd.ensure_finalized()
+            cmd.run()
+            return cmd
+
+        built = build('first').get_outputs()[0]
+
+        def fail(*args, **kwargs):
+            raise AssertionError("cached extension was rebuilt")
+
+        with monkeypatch.context() as m:
+            m.setattr(CCompiler, 'compile', fail)
+            cmd = build('second')
+        # one cache for the run, which counts what it found
+        assert cmd._extension_cache.stats()['hits'] == 1
+        restored = cmd.get_outputs()[0]
+        with open(built, 'rb') as f1, open(restored, 'rb') as f2:
+            assert f1.read() == f2.read()
+
+        # any change to the spec misses the cache
+        cmd = build('third', define_macros=[('FOO', '1')])
+        assert cmd._extension_cache.stats()['misses'] == 1
+        assert len(glob.glob(os.path.join(cache_dir, '*', '*'))) == 2
+
+    def test_rebuild_on_settings_change(self, monkeypatch):
+        missing_compiler_executable()
+        tmp_dir = self.mkdtemp()
+        c_file = os.path.join(tmp_dir, 'foo.c')
+        self.write_file(c_file, 'void PyInit_foo(void) {}\n')
+        compiled = []
+        call = CCompiler.call
+
+        def record(self, cmd, *args, **kwargs):
+            if kwargs.get('kind') == 'compile':
+                compiled.append(cmd)
+            return call(self, cmd, *args, **kwargs)
+
+        monkeypatch.setattr(CCompiler, 'call', record)
+
+        def build(**ext_args):
+            ext = Extension('foo', [c_file], **ext_args)
+            dist = Distribution({'name': 'xx', 'ext_modules': [ext]})
+            cmd = self.build_ext(dist)
+            fixup_build_ext(cmd)
+            # scheduled builds run their jobs without 'call()'
+            cmd.parallel = None
+            cmd.build_lib = os.path.join(tmp_dir, 'lib')
+            cmd.build_temp = os.path.join(tmp_dir, 'temp')
+            cmd.ensure_finalized()
+            cmd.run()
+            return os.path.getmtime(cmd.get_outputs()[0])
+
+        built = build()
+        assert build() == built
+        assert len(compiled) == 1
+        build(define_macros=[('FOO', '1')])
+        assert len(compiled) == 2
+        build(define_macros=[('FOO', '1')], extra_link_args=['-s'])
+        assert len(compiled) == 2
+        assert os.path.exists(os.path.join(tmp_dir, 'temp', 'build-state.json'))
+
+    def test_shared_sources(self, monkeypatch):
+        missing_compiler_executable()
+        tmp_dir = self.mkdtemp()
+        helper = os.path.join(tmp_dir, 'helper.c')
+        self.write_file(helper, 'int helper(void) { return 0; }\n')
+        extensions = []
+        for name, macros in [('a', []), ('b', []), ('c', [('FOO', '1')])]:
+            c_file = os.path.join(tmp_dir, f'{name}.c')
+            self.write_file(c_file, f'void PyInit_{name}(void) {{}}\n')
+            extensions.append(Extension(name, [c_file, helper], define_macros=macros))
+        dist = Distribution({'name': 'xx', 'ext_modules': extensions})
+        cmd = self.build_ext(dist)
+        fixup_build_ext(cmd)
+        cmd.build_lib = os.path.join(tmp_dir, 'lib')
+        cmd.build_temp = os.path.join(tmp_dir, 'temp')
+        cmd.parallel = 3
+        compiled = []
+
+        def recording(method):
+            def record(self, sources, *args, **kwargs):
+                compiled.extend((source, kwargs['output_dir']) for source in sources)
+                return method(self, sources, *args, **kwargs)
+
+            return record
+
+        # with 'parallel', compiles may be planned rather than run directly
+        for name in ('compile', 'plan_compile'):
+            monkeypatch.setattr(CCompiler, name, recording(getattr(CCompiler, name)))
+        cmd.ensure_finalized()
+        cmd.run()
+        # once for 'a' and 'b', and once with the macro for 'c', elsewhere
+        output_dirs = [
+            output_dir for source, output_dir in compiled if source == helper
+        ]
+        assert len(set(output_dirs)) == 2
+        assert len(cmd.get_outputs()) == 3
+
+    def test_scheduled_build(self, monkeypatch):
+        missing_compiler_executable()
+        tmp_dir = self.mkdtemp()
+        sources = []
+        for name, code in [('a', 'void PyInit_good(void) {}'), ('b', 'int b;')]:
+            sources.append(os.path.join(tmp_dir, f'{name}.c'))
+            self.write_file(sources[-1], code + '\n')
+        broken = os.path.join(tmp_dir, 'broken.c')
+        self.write_file(broken, 'int broken(void) {\n')
+        extensions = [
+            Extension('good', sources),
+            Extension('broken', [broken], optional=True),
+        ]
+        dist = Distribution({'name': 'xx', 'ext_modules': extensions})
+        cmd = self.build_ext(dist)
+        fixup_build_ext(cmd)
+        cmd.build_lib = os.path.join(tmp_dir, 'lib')
+        cmd.build_temp = os.path.join(tmp_dir, 'temp')
+        cmd.parallel = 2
+        runs = []
+        run = jobs.run
+        monkeypatch.setattr(
+            jobs,
+            'run',
+            lambda planned, *args, **kwargs: (
+                runs.append(planned) or run(planned, *args, **kwargs)
+            ),
+        )
+        cmd.ensure_finalized()
+        cmd.run()
+        # every extension's compiles and links, in a single graph
+        (planned,) = runs
+        assert sorted(job.kind for job in planned) == ['compile'] * 3 + ['link'] * 2
+        good, broken = cmd.get_outputs()
+        assert os.path.exists(good)
+        assert not os.path.exists(broken)
+
+        # the links were recorded as 'link()' records them, so recompiling
+        # identical objects in a serial build doesn't relink
+        linked = []
+        call = CCompiler.call
+
+        def record(self, argv, *args, **kwargs):
+            if kwargs.get('kind') == 'link':
+                linked.append(argv)
+            return call(self, argv, *args, **kwargs)
+
+        monkeypatch.setattr(CCompiler, 'call', record)
+        future = time.time() + 10
+        os.utime(sources[0], (future, future))
+        cmd.parallel = None
+        cmd.compiler = cmd.compiler.compiler_type
+        cmd.run()
+        assert not linked
+
+    def test_process_pool(self, caplog):
+        missing_compiler_executable()
+        tmp_dir = self.mkdtemp()
+        helper = os.path.join(tmp_dir, 'helper.c')
+        self.write_file(helper, 'int helper(void) { return 0; }\n')
+        extensions = []
+        for name in 'ab':
+            c_file = os.path.join(tmp_dir, f'{name}.c')
+            self.write_file(c_file, f'void PyInit_{name}(void) {{}}\n')
+            extensions.append(Extension(name, [c_file, helper]))
+        broken = os.path.join(tmp_dir, 'broken.c')
+        self.write_file(broken, 'int broken(void) {\n')
+        extensions.append(Extension('broken', [broken], optional=True))
+        dist = Distribution({'name': 'xx', 'ext_modules': extensions})
+        cmd = self.build_ext(dist)
+        fixup_build_ext(cmd)
+        cmd.build_lib = os.path.join(tmp_dir, 'lib')
+        cmd.build_temp = os.path.join(tmp_dir, 'temp')
+        cmd.parallel = 2
+        cmd.process_pool = True
+        caplog.set_level(logging.INFO)
+        cmd.ensure_finalized()
+        cmd.run()
+        *built, broken_output = cmd.get_outputs()
+        assert all(os.path.exists(output) for output in built)
+        assert not os.path.exists(broken_output)
+        # the workers' logs, in order; 'b' waits for 'a' to compile 'helper.c'
+        messages = [record.getMessage() for record in caplog.records]
+        building = [message for message in messages if message.startswith('building')]
+        assert building == [
+            f"building '{name}' extension" for name in ('a', 'broken', 'b')
+        ]
+        # the parent kept what the workers learned
+        with open(os.path.join(cmd.build_temp, 'build-state.json')) as f:
+            recorded = json.load(f)
+        assert all(os.path.abspath(output) in recorded for output in built)
+        with open(os.path.join(cmd.build_temp, 'includes.json')) as f:
+            assert os.path.abspath(helper) in json.load(f)
+
+    def test_process_pool_not_forked(self, monkeypatch):
+        # the parent's compile threads may hold locks a fork would inherit
+        methods = []
+        get_context = multiprocessing.get_context
+        monkeypatch.setattr(
+            multiprocessing,
+            'get_context',
+            lambda method=None: methods.append(method) or get_context(method),
+        )
+        with _processes.pool(1):
+            pass
+        assert methods and None not in methods and 'fork' not in methods
+
+    @pytest.mark.parametrize('name', ['crash', 'unpicklable'])
+    def test_process_pool_failures(self, name):
+        tmp_dir = self.mkdtemp()
+        c_file = os.path.join(tmp_dir, 'foo.c')
+        self.write_file(c_file, 'void PyInit_foo(void) {}\n')
+        ext = Extension(name, [c_file], optional=True)
+        dist = Distribution({'name': 'xx', 'ext_modules': [ext]})
+        cmd = failing_build_ext(dist)
+        cmd.build_lib = os.path.join(tmp_dir, 'lib')
+        cmd.build_temp = os.path.join(tmp_dir, 'temp')
+        cmd.parallel = 2
+        cmd.process_pool = True
+        cmd.ensure_finalized()
+        # reported as the extension's failure, which is optional
+        cmd.run()
+        ext.optional = False
+        cmd.compiler = None
+        with pytest.raises(DistutilsExecError):
+            cmd.run()
+
+    def test_process_pool_compiler_changes(self):
+        missing_compiler_executable()
+        tmp_dir = self.mkdtemp()
+        extensions = []
+        for name in 'ab':
+            c_file = os.path.join(tmp_dir, f'{name}.c')
+            self.write_file(
+                c_file,
+                '#ifndef FROM_SUBCLASS\n#error not from the subclass\n#endif\n'
+                f'void PyInit_{name}(void) {{}}\n',
+            )
+            extensions.append(Extension(name, [c_file]))
+        dist = Distribution({'name': 'xx', 'ext_modules': extensions})
+        cmd = macro_build_ext(dist)
+        fixup_build_ext(cmd)
+        cmd.build_lib = os.path.join(tmp_dir, 'lib')
+        cmd.build_temp = os.path.join(tmp_dir, 'temp')
+        cmd.parallel = 2
+        cmd.process_pool = True
+        cmd.ensure_finalized()
+        # the workers compile with the macro the parent's compiler got
+        cmd.run()
+        assert all(os.path.exists(output) for output in cmd.get_outputs())
+
+    def test_unity_sources(self):
+        tmp_dir = self.mkdtemp()
+        sources = [os.path.join(tmp_dir, name) for name in 'abcde']
+        sources = [f'{name}.c' for name in sources] + ['f.cpp', 'g.rc']
+        ext = Extension(
+            'foo', sources, unity_build=True, unity_batch_size=2, unity_exclude=['*d.c']
+        )
+        dist = Distribution({'name': 'xx', 'ext_modules': [ext]})
+        cmd = self.build_ext(dist)
+        cmd.build_temp = tmp_dir
+        cmd.compiler = new_compiler()
+
+        batches = cmd.unity_sources(sources, ext)
+        unity_dir = os.path.join(tmp_dir, 'unity')
+        assert batches == [sources[3], 'g.rc'] + [
+            os.path.join(unity_dir, name)
+            for name in ['foo.unity0.c', 'foo.unity1.c', 'foo.unity2.cpp']
+        ]
+        with open(batches[2], encoding='utf-8') as f:
+            assert f.read().splitlines() == [
+                f'#include "{os.path.abspath(source).replace(os.sep, "/")}"'
+                for source in sources[:2]
+            ]
+
+        # unchanged batches are left alone, so they aren't recompiled
+        mtime = os.path.getmtime(batches[2])
+        os.utime(batches[2], (mtime - 10, mtime - 10))
+        assert cmd.unity_sources(sources, ext) == batches
+        assert os.path.getmtime(batches[2]) == mtime - 10
+
+        ext.unity_build = False
+        assert cmd.unity_sources(sources, ext) == sources
+
     def test_ext_fullpath(self):
         ext = sysconfig.get_config_var('EXT_SUFFIX')
         # building lxml.etree inplace
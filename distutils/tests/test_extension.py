@@ -112,6 +112,7 @@ class TestExtension:
 
         assert ext.language is None
         assert ext.optional is False
+        assert ext.precompiled_header is None
 
         # if there are unknown keyword options, warn about them
         msg = re.escape("unknown `Extension` options: 'chic'")
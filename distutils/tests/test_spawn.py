@@ -1,10 +1,11 @@
 """Tests for distutils.spawn."""
 
+import asyncio
 import os
 import stat
 import sys
 from distutils.errors import DistutilsExecError
-from distutils.spawn import find_executable, spawn
+from distutils.spawn import find_executable, spawn, spawn_async
 from distutils.tests import support
 from unittest import mock
 
@@ -137,3 +138,21 @@ class TestSpawn(support.TempdirManager):
         with pytest.raises(DistutilsExecError) as ctx:
             spawn(['does-not-exist'])
         assert "command 'does-not-exist' failed" in str(ctx.value)
+
+    def test_spawn_async(self):
+        asyncio.run(spawn_async([sys.executable, '-c', 'pass']))
+        with pytest.raises(DistutilsExecError) as ctx:
+            asyncio.run(spawn_async([sys.executable, '-c', 'raise SystemExit(3)']))
+        assert "failed with exit code 3" in str(ctx.value)
+        with pytest.raises(DistutilsExecError) as ctx:
+            asyncio.run(spawn_async(['does-not-exist']))
+        assert "command 'does-not-exist' failed" in str(ctx.value)
+
+    def test_spawn_usage(self):
+        from distutils.compilers.C import usage
+
+        with usage.collect() as records:
+            spawn([sys.executable, '-c', 'pass'])
+            with pytest.raises(DistutilsExecError):
+                spawn([sys.executable, '-c', 'raise SystemExit(1)'])
+        assert [record.returncode for record in records] == [0, 1]